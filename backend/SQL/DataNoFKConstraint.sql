@@ -12,7 +12,9 @@ CREATE TABLE Employee (
     Country VARCHAR(50) NOT NULL,
     Email VARCHAR(50) NOT NULL,
     Reporting_Manager INT,
-    Role INT NOT NULL
+    Role INT NOT NULL,
+    INDEX ix_employee_reporting_manager (Reporting_Manager),
+    INDEX ix_employee_dept_position_role (Dept, Position, Role)
     # CONSTRAINT FK_Reporting_Manager FOREIGN KEY (Reporting_Manager) REFERENCES Employee(Staff_ID)
 );
 
@@ -24,6 +26,7 @@ CREATE TABLE Request (
     Creation_Date DATE NOT NULL,
     Apply_Reason VARCHAR(100) NOT NULL,
     Reject_Reason VARCHAR(100),
+    INDEX ix_request_staff_id (Staff_ID),
     CONSTRAINT FK_Staff_ID FOREIGN KEY (Staff_ID)
     REFERENCES Employee(Staff_ID)
 );
@@ -38,6 +41,8 @@ CREATE TABLE Request_Dates (
     Request_Status VARCHAR(20) NOT NULL,
     Withdraw_Reason VARCHAR(100),
     Rescind_Reason VARCHAR(100),
+    INDEX ix_request_dates_request_id (Request_ID),
+    INDEX ix_request_dates_status_date (Request_Status, Request_Date),
     CONSTRAINT FK_Request_ID FOREIGN KEY (Request_ID)
     REFERENCES Request(Request_ID)
 );
@@ -0,0 +1,97 @@
+"""
+Times the NumPy attendance matrix behind /view_schedule/attendance_rates on a large org
+(100k staff x 150 days by default): building the matrix, marking approved WFH, and reducing
+it to office attendance rates per department and per team. Then times the endpoint itself,
+which also reads the employees and the daily_wfh_count rows from the database.
+
+python -m benchmarks.attendance_rates [num_staff] [wfh_days_per_staff]
+"""
+
+import sys
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+from attendance import AttendanceMatrix
+from benchmarks.common import create_schema, report, time_calls
+from database import db, DailyWfhCount, Employee
+from view_schedule import app as view_schedule_app, get_wfh_window
+
+DEPARTMENTS = ["Sales", "Finance", "Engineering", "HR", "IT", "Consultancy", "Solutioning"]
+
+
+def synthetic_org(num_staff, wfh_days):
+    """Staff ids, departments, managers and random WFH entries, as NumPy arrays."""
+    rng = np.random.default_rng(212)
+    staff_ids = np.arange(2, 2 + num_staff)
+    depts = np.array(DEPARTMENTS)[staff_ids % len(DEPARTMENTS)]
+    managers = 2 + (staff_ids - 2) // 10 * 10
+    wfh_staff = np.repeat(staff_ids, wfh_days)
+    wfh_offsets = rng.integers(0, 150, size=len(wfh_staff))
+    wfh_shifts = np.array(["AM", "PM", "Full"])[rng.integers(0, 3, size=len(wfh_staff))]
+    return staff_ids, depts, managers, wfh_staff, wfh_offsets, wfh_shifts
+
+
+def engine_only(start_date, staff_ids, depts, managers, wfh_staff, wfh_dates, wfh_shifts):
+    matrix = AttendanceMatrix(staff_ids, start_date, start_date + timedelta(days=149))
+    matrix.mark_wfh(wfh_staff, wfh_dates, wfh_shifts)
+    return matrix.breaches(depts, 0.5), matrix.breaches(managers, 0.5)
+
+
+if __name__ == "__main__":
+    num_staff = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    wfh_days = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    staff_ids, depts, managers, wfh_staff, wfh_offsets, wfh_shifts = synthetic_org(num_staff, wfh_days)
+    start_date, _ = get_wfh_window()
+    wfh_dates = [start_date + timedelta(days=int(offset)) for offset in wfh_offsets]
+
+    # Plain lists, as the endpoint gets them from the database
+    engine_args = (
+        start_date, staff_ids.tolist(), depts.tolist(), managers.tolist(),
+        wfh_staff.tolist(), wfh_dates, wfh_shifts.tolist(),
+    )
+    engine = time_calls(engine_only, [engine_args] * 5)
+    report(f"matrix {num_staff:,} staff x 150 days, dept + team rates", engine)
+
+    create_schema(view_schedule_app)
+    with view_schedule_app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(
+                insert(Employee),
+                [
+                    {
+                        "staff_id": int(staff_id), "staff_fname": "Staff", "staff_lname": str(staff_id),
+                        "dept": str(dept), "position": "Account Manager", "country": "Singapore",
+                        "email": f"{staff_id}@x.com", "role": 2, "reporting_manager": int(manager),
+                    }
+                    for staff_id, dept, manager in zip(staff_ids, depts, managers)
+                ],
+            )
+            # Fill daily_wfh_count directly from the synthetic entries
+            rows = {}
+            manager_of = dict(zip(staff_ids.tolist(), managers.tolist()))
+            dept_of = dict(zip(staff_ids.tolist(), depts.tolist()))
+            for staff_id, wfh_date, shift in zip(wfh_staff.tolist(), wfh_dates, wfh_shifts.tolist()):
+                key = (wfh_date, dept_of[staff_id], manager_of[staff_id], shift)
+                rows.setdefault(key, []).append(staff_id)
+            connection.execute(
+                insert(DailyWfhCount),
+                [
+                    {
+                        "wfh_date": wfh_date, "dept": dept, "reporting_manager": manager,
+                        "shift": shift, "wfh_count": len(ids), "staff_ids": sorted(ids),
+                    }
+                    for (wfh_date, dept, manager, shift), ids in rows.items()
+                ],
+            )
+
+    client = view_schedule_app.test_client()
+    report(
+        "GET attendance_rates?group_by=dept",
+        time_calls(lambda: client.get("/view_schedule/attendance_rates?group_by=dept"), [()] * 5),
+    )
+    report(
+        "GET attendance_rates?group_by=team",
+        time_calls(lambda: client.get("/view_schedule/attendance_rates?group_by=team"), [()] * 5),
+    )
@@ -0,0 +1,76 @@
+"""
+Compares the set-based /request_dates/auto_reject with the per-row loop it replaced, which
+loaded every date into the ORM and then updated the reason and logged the rejection once per
+request (over HTTP before; in-process here, so the old numbers are a lower bound). Also times
+the no-op call the frontend makes on every page load.
+
+python -m benchmarks.auto_reject [num_stale_requests]
+"""
+
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.common import create_schema, seed_employees, seed_requests
+from database import db, Request, RequestDates, StatusLog
+from request_dates import app as request_dates_app
+
+
+def per_row_auto_reject():
+    """The loop auto_reject ran before, minus the HTTP round trips."""
+    with request_dates_app.app_context():
+        stale = RequestDates.query.filter(
+            RequestDates.request_status == "Pending Approval",
+            RequestDates.request_date < date.today() - timedelta(days=60),
+        ).all()
+        request_ids = {request_date.request_id for request_date in stale}
+        for request_date in RequestDates.query.filter(
+            RequestDates.request_id.in_(request_ids)
+        ).all():
+            request_date.request_status = "Rejected"
+        db.session.commit()
+        for request_id in request_ids:
+            # update_reason and add_event each committed on their own
+            Request.query.filter_by(request_id=request_id).first().reject_reason = "auto"
+            db.session.commit()
+            db.session.add(StatusLog(request_id, "auto-rejected"))
+            db.session.commit()
+        return len(request_ids)
+
+
+def timed(fn):
+    statements = []
+    with request_dates_app.app_context():
+        engine = db.engine
+
+    def record(*args):
+        statements.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", record)
+    start = time.perf_counter()
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return (time.perf_counter() - start) * 1000, len(statements)
+
+
+if __name__ == "__main__":
+    num_stale = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    create_schema(request_dates_app)
+    seed_employees(request_dates_app, num_stale)
+    client = request_dates_app.test_client()
+    stale_date = date.today() - timedelta(days=70)
+
+    seed_requests(request_dates_app, range(2, 2 + num_stale), dates_per_request=3, start=stale_date)
+    elapsed, statements = timed(per_row_auto_reject)
+    print(f"per-row loop       stale requests={num_stale:<6} {elapsed:9.1f} ms  {statements} statements")
+
+    seed_requests(request_dates_app, range(2, 2 + num_stale), dates_per_request=3, start=stale_date)
+    elapsed, statements = timed(lambda: client.put("/request_dates/auto_reject"))
+    print(f"set-based          stale requests={num_stale:<6} {elapsed:9.1f} ms  {statements} statements")
+
+    elapsed, statements = timed(lambda: client.put("/request_dates/auto_reject"))
+    print(f"set-based, no-op   stale requests={0:<6} {elapsed:9.1f} ms  {statements} statements")
@@ -0,0 +1,57 @@
+"""
+Compares a manager clearing a backlog of pending requests one /request_dates/change_all_status
+call at a time, as ManagerActions.vue does, with a single /request_dates/bulk_transition call.
+
+python -m benchmarks.bulk_transition [backlog_size]
+"""
+
+import sys
+import time
+
+from benchmarks.common import create_schema, seed_employees, seed_requests
+import run
+
+BACKLOG_SIZES = [10, 50, 200]
+
+
+def timed(label, backlog_size, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<40} backlog={backlog_size:<5} {elapsed:9.1f} ms")
+
+
+if __name__ == "__main__":
+    max_backlog = int(sys.argv[1]) if len(sys.argv) > 1 else max(BACKLOG_SIZES)
+    create_schema(run.request_app)
+    seed_employees(run.request_app, max_backlog)
+    client = run.app.test_client()
+    staff_ids = range(2, 2 + max_backlog)
+
+    for backlog_size in [size for size in BACKLOG_SIZES if size <= max_backlog] or [max_backlog]:
+        request_ids = seed_requests(run.request_app, staff_ids[:backlog_size], dates_per_request=3)
+
+        def one_by_one():
+            for request_id in request_ids:
+                response = client.put(
+                    "/request_dates/change_all_status",
+                    json={"request_id": request_id, "status": "Approved"},
+                )
+                assert response.status_code == 200
+
+        timed("PUT change_all_status per request", backlog_size, one_by_one)
+
+        request_ids = seed_requests(run.request_app, staff_ids[:backlog_size], dates_per_request=3)
+
+        def in_one_call():
+            response = client.put(
+                "/request_dates/bulk_transition",
+                json={
+                    "transitions": [
+                        {"request_id": request_id, "status": "Approved"} for request_id in request_ids
+                    ]
+                },
+            )
+            assert response.get_json()["failed"] == 0
+
+        timed("PUT bulk_transition", backlog_size, in_one_call)
@@ -0,0 +1,108 @@
+"""
+Shared setup for the benchmark scripts.
+
+Run the benchmarks from the backend folder so the service modules can be imported, e.g.
+
+python -m benchmarks.service_dispatch
+
+The benchmarks write to a throwaway SQLite database unless BENCH_DATABASE_URL is set,
+so they never touch the database configured in DATABASE_URL.
+"""
+
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or "sqlite:///" + (
+    os.path.join(tempfile.mkdtemp(prefix="wfh_bench_"), "bench.db")
+)
+
+from werkzeug.serving import make_server
+from database import db, Employee, Request, RequestDates
+
+
+def free_port():
+    """Ask the OS for a port that nothing is listening on."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(service_app, port, latency_ms=0):
+    """Serve a Flask app over real HTTP on a background thread, like a split deployment.
+    latency_ms adds a delay to every response, to stand in for the network between hosts."""
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    def delayed_app(environ, start_response):
+        time.sleep(latency_ms / 1000)
+        return service_app(environ, start_response)
+
+    server = make_server("127.0.0.1", port, delayed_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_schema(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+
+def seed_employees(app, num_staff, manager_id=1, first_staff_id=2, dept="Sales"):
+    """Add one manager and num_staff employees reporting to them."""
+    with app.app_context():
+        employees = [
+            Employee(manager_id, "Manager", "One", dept, "Director", "Singapore", "m@x.com", 1)
+        ] + [
+            Employee(
+                staff_id, "Staff", str(staff_id), dept, "Account Manager",
+                "Singapore", f"{staff_id}@x.com", 2, reporting_manager=manager_id,
+            )
+            for staff_id in range(first_staff_id, first_staff_id + num_staff)
+        ]
+        db.session.add_all(employees)
+        db.session.commit()
+
+
+def seed_requests(app, staff_ids, dates_per_request=1, status="Pending Approval", start=None):
+    """Add one request per staff_id with consecutive dates; returns the request_ids."""
+    start = start or date.today() + timedelta(days=7)
+    with app.app_context():
+        new_requests = [Request(staff_id, date.today(), "Benchmark") for staff_id in staff_ids]
+        db.session.add_all(new_requests)
+        db.session.flush()
+        db.session.add_all(
+            [
+                RequestDates(req.request_id, start + timedelta(days=n), "Full", request_status=status)
+                for req in new_requests
+                for n in range(dates_per_request)
+            ]
+        )
+        db.session.commit()
+        return [req.request_id for req in new_requests]
+
+
+def time_calls(fn, args_list):
+    """Call fn once per item in args_list and return the latencies in milliseconds."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label, samples):
+    print(
+        f"{label:<50} n={len(samples):<6} p50={percentile(samples, 50):8.2f} ms"
+        f"  p99={percentile(samples, 99):8.2f} ms"
+    )
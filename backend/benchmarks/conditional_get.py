@@ -0,0 +1,48 @@
+"""
+Compares a full GET of /view_schedule/o_get_org_schedule with a revalidation that sends the
+ETag back in If-None-Match and gets a 304: time on the server, queries run and bytes sent.
+
+python -m benchmarks.conditional_get [num_staff] [wfh_days_per_staff]
+"""
+
+import sys
+
+from sqlalchemy import event
+
+from benchmarks.common import create_schema, report, seed_employees, time_calls
+from benchmarks.schedule_payload import DEPARTMENTS, seed_approved_wfh
+from database import db
+from view_schedule import app as view_schedule_app
+
+URL = "/view_schedule/o_get_org_schedule"
+
+
+if __name__ == "__main__":
+    num_staff = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    wfh_days = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    create_schema(view_schedule_app)
+    per_dept = num_staff // len(DEPARTMENTS)
+    for i, dept in enumerate(DEPARTMENTS):
+        seed_employees(
+            view_schedule_app, per_dept, manager_id=10_000 + i, first_staff_id=2 + i * per_dept, dept=dept
+        )
+    seed_approved_wfh(per_dept * len(DEPARTMENTS), wfh_days)
+    client = view_schedule_app.test_client()
+
+    statements = []
+    with view_schedule_app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    full = client.get(URL)
+    etag = full.headers["ETag"]
+    for label, headers in [("full GET", {}), ("If-None-Match", {"If-None-Match": etag})]:
+        statements.clear()
+        response = client.get(URL, headers=headers)
+        print(
+            f"{label}: HTTP {response.status_code}, {len(response.get_data()) / 1024:,.1f} KiB,"
+            f" {len(statements)} queries"
+        )
+        report(
+            f"{label}: GET o_get_org_schedule",
+            time_calls(lambda: client.get(URL, headers=headers), [()] * 10),
+        )
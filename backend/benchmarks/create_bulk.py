@@ -0,0 +1,65 @@
+"""
+Compares the throughput of /request/create, called once per request as HR had to before, with
+/request/create_bulk, in requests created per second. Both go through the run.py app with
+in-process dispatch between services.
+
+python -m benchmarks.create_bulk [num_requests]
+"""
+
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import create_schema, seed_employees
+import run
+
+DATES_PER_REQUEST = 5
+BATCH_SIZES = [100, 1000]
+
+
+def entries(staff_ids, first_day):
+    return [
+        {
+            "staff_id": staff_id,
+            "request_dates": {
+                (first_day + timedelta(days=n)).isoformat(): "Full" for n in range(DATES_PER_REQUEST)
+            },
+            "apply_reason": "Team arrangement",
+        }
+        for staff_id in staff_ids
+    ]
+
+
+def throughput(label, num_requests, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} n={num_requests:<6} {elapsed * 1000:9.1f} ms  {num_requests / elapsed:9.1f} requests/s")
+
+
+if __name__ == "__main__":
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    create_schema(run.request_app)
+    seed_employees(run.request_app, num_requests)
+    client = run.app.test_client()
+    staff_ids = list(range(2, 2 + num_requests))
+
+    # Each run books a different week, so none of them conflicts with the ones before
+    first_day = date.today() + timedelta(days=7)
+
+    def one_by_one():
+        for entry in entries(staff_ids, first_day):
+            assert client.post("/request/create", json=entry).status_code == 200
+
+    throughput("POST /request/create", num_requests, one_by_one)
+
+    for batch_size in BATCH_SIZES:
+        first_day += timedelta(days=7)
+
+        def in_batches():
+            batch = entries(staff_ids, first_day)
+            for start in range(0, len(batch), batch_size):
+                response = client.post("/request/create_bulk", json={"requests": batch[start:start + batch_size]})
+                assert response.get_json()["failed"] == 0
+
+        throughput(f"POST /request/create_bulk, {batch_size} per call", num_requests, in_batches)
@@ -0,0 +1,104 @@
+"""
+Compares request creation under concurrent load: the single-transaction
+request_creation.create_requests behind /request/create, against the path it replaced, which
+committed the request, posted its dates to /request_dates/create and logged the event
+separately, deleting the request again if the dates failed. Reports throughput, latency and
+database commits per request created.
+
+The calls run on a thread pool in this process, and the old path uses in-process dispatch
+instead of HTTP, so its numbers are a lower bound.
+
+python -m benchmarks.create_concurrency [num_requests] [num_threads]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from benchmarks.common import create_schema, percentile, seed_employees
+from config import Config
+from database import db, Request
+from invokes import invoke_http
+from request_creation import create_requests
+from status_log_writer import log_status_event
+import run
+
+REQUEST_DATES_URL = "http://localhost:5002/request_dates"
+
+
+def compensating_create(entry):
+    """The steps create_request took before, with its calls to other services in-process."""
+    new_request = Request(entry["staff_id"], date.today(), entry["apply_reason"])
+    db.session.add(new_request)
+    db.session.commit()
+    response = invoke_http(
+        f"{REQUEST_DATES_URL}/create",
+        method="POST",
+        json={
+            "request_id": new_request.request_id,
+            "request_dates": entry["request_dates"],
+            "staff_id": entry["staff_id"],
+        },
+    )
+    if response.get("code") != 200:
+        db.session.delete(new_request)
+        db.session.commit()
+        raise RuntimeError(response)
+    log_status_event(
+        request_id=new_request.request_id,
+        action="Request has been created by staff",
+        reason=entry["apply_reason"],
+    )
+
+
+def single_transaction_create(entry):
+    result = create_requests([entry])[0]
+    if result["code"] != 200:
+        raise RuntimeError(result)
+
+
+def run_load(label, create, entries, num_threads):
+    with run.request_app.app_context():
+        engine = db.engine
+    commits = []
+    listener = lambda connection: commits.append(1)
+    event.listen(engine, "commit", listener)
+
+    def timed(entry):
+        with run.request_app.app_context():
+            start = time.perf_counter()
+            create(entry)
+            return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(num_threads) as pool:
+        samples = list(pool.map(timed, entries))
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "commit", listener)
+    print(
+        f"{label:<22} threads={num_threads:<3} {len(entries) / elapsed:8.1f} requests/s"
+        f"  p50={percentile(samples, 50):8.2f} ms  p99={percentile(samples, 99):8.2f} ms"
+        f"  commits/request={len(commits) / len(entries):.2f}"
+    )
+
+
+if __name__ == "__main__":
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    num_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    create_schema(run.request_app)
+    seed_employees(run.request_app, num_requests)
+    # The write-behind status log would otherwise hide the old path's third write
+    Config.STATUS_LOG_WRITE_BEHIND = False
+
+    for week, (label, create) in enumerate(
+        [("compensating (old)", compensating_create), ("single transaction", single_transaction_create)]
+    ):
+        day = (date.today() + timedelta(days=7 * (week + 1))).isoformat()
+        entries = [
+            {"staff_id": staff_id, "request_dates": {day: "Full"}, "apply_reason": "Benchmark"}
+            for staff_id in range(2, 2 + num_requests)
+        ]
+        run_load(label, create, entries, num_threads)
@@ -0,0 +1,63 @@
+"""
+Compares the duplicate-date check of /request/create with the one it replaced, which fetched
+every request and request date the staff member ever made (over HTTP before; in-process here,
+so the old numbers are a lower bound) and scanned them once per requested date.
+
+python -m benchmarks.create_conflicts
+"""
+
+from datetime import date, timedelta
+
+from benchmarks.common import create_schema, report, seed_employees, seed_requests, time_calls
+from database import Request, RequestDates
+from input_validation import ACTIVE_STATUSES, first_conflict
+from request import app as request_app
+from request_creation import get_taken_shifts
+
+HISTORY_SIZES = [10, 100, 1000, 10_000]
+
+
+def has_existing_request(employee_requests, apply_date):
+    """The scan of the full history create_request ran once per requested date."""
+    for date, shift in apply_date.items():
+        for request in employee_requests:
+            if request["request_date"] == date and request["request_status"] in ACTIVE_STATUSES:
+                if request["request_shift"] == "Full" or shift == "Full":
+                    return date
+                if request["request_shift"] == shift:
+                    return date
+    return False
+
+
+def full_history_check(staff_id, request_dates):
+    """The check create_request ran before, minus the HTTP round trips."""
+    request_ids = [req.request_id for req in Request.query.filter_by(staff_id=staff_id).all()]
+    employee_requests = [
+        request_date.json()
+        for request_date in RequestDates.query.filter(RequestDates.request_id.in_(request_ids)).all()
+    ]
+    return has_existing_request(employee_requests, request_dates)
+
+
+def taken_shifts_check(staff_id, request_dates):
+    return first_conflict(get_taken_shifts(staff_id, request_dates), request_dates)
+
+
+if __name__ == "__main__":
+    create_schema(request_app)
+    seed_employees(request_app, 1)
+    # Two weeks of free dates, as a staff member would ask for
+    request_dates = {
+        (date.today() + timedelta(days=30 + n)).isoformat(): "AM" for n in range(10)
+    }
+    seeded = 0
+    for size in HISTORY_SIZES:
+        # Older requests of staff 2, one date each, all before the requested dates
+        seed_requests(
+            request_app, [2] * (size - seeded), status="Approved", start=date.today() - timedelta(days=60)
+        )
+        seeded = size
+        with request_app.app_context():
+            args = [(2, request_dates)] * 20
+            report(f"full history: {size} past requests", time_calls(full_history_check, args))
+            report(f"taken shifts: {size} past requests", time_calls(taken_shifts_check, args))
@@ -0,0 +1,33 @@
+"""
+Times the employee listing and lookup endpoints served from the in-memory directory, and the
+same calls when the directory has to be reloaded first, as after an employee change.
+
+python -m benchmarks.employee_directory [num_staff]
+"""
+
+import sys
+
+from benchmarks.common import create_schema, report, seed_employees, time_calls
+from employee import app as employee_app
+from employee_directory import invalidate_employee_directory
+
+URLS = [
+    "/employee/get_all_employees",
+    "/employee/get_all_employees_by_dept",
+    "/employee/get_details/2",
+]
+
+
+if __name__ == "__main__":
+    num_staff = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    create_schema(employee_app)
+    seed_employees(employee_app, num_staff)
+    client = employee_app.test_client()
+
+    def reload_and_get(url):
+        invalidate_employee_directory()
+        return client.get(url)
+
+    for url in URLS:
+        report(f"after a reload: GET {url}", time_calls(reload_and_get, [(url,)] * 10))
+        report(f"snapshot: GET {url}", time_calls(client.get, [(url,)] * 100))
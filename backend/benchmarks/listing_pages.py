@@ -0,0 +1,53 @@
+"""
+Compares fetching a whole request listing, as /view_requests/m_retrieve_requests and
+/request/get_all_requests did before they took limit and cursor, with fetching one page of it,
+as the tables grow. The last page is found by its cursor, so it should cost what the first does.
+
+python -m benchmarks.listing_pages [max_requests]
+"""
+
+import sys
+
+from benchmarks.common import create_schema, report, seed_employees, seed_requests, time_calls
+import run
+
+TABLE_SIZES = [1000, 10_000, 50_000]
+NUM_STAFF = 50
+PAGE_SIZE = 50
+
+
+def time_listing(client, label, url, max_request_id, num_calls):
+    def get(query_string):
+        response = client.get(url + query_string)
+        assert response.status_code == 200
+
+    report(f"{label}: whole listing", time_calls(get, [("",)] * num_calls))
+    report(f"{label}: first page", time_calls(get, [(f"?limit={PAGE_SIZE}",)] * 20))
+    last_cursor = max_request_id - PAGE_SIZE
+    report(
+        f"{label}: last page",
+        time_calls(get, [(f"?limit={PAGE_SIZE}&cursor={last_cursor}",)] * 20),
+    )
+
+
+if __name__ == "__main__":
+    max_requests = int(sys.argv[1]) if len(sys.argv) > 1 else max(TABLE_SIZES)
+    create_schema(run.request_app)
+    seed_employees(run.request_app, NUM_STAFF)
+    client = run.app.test_client()
+    staff_ids = range(2, 2 + NUM_STAFF)
+
+    seeded = 0
+    for size in [size for size in TABLE_SIZES if size <= max_requests] or [max_requests]:
+        # Three dates per request, spread over the staff reporting to manager 1
+        max_request_id = seed_requests(
+            run.request_app,
+            [staff_ids[n % NUM_STAFF] for n in range(size - seeded)],
+            dates_per_request=3,
+        )[-1]
+        seeded = size
+        print(f"{size} requests")
+        time_listing(
+            client, "m_retrieve_requests", "/view_requests/m_retrieve_requests/1", max_request_id, 3
+        )
+        time_listing(client, "get_all_requests", "/request/get_all_requests", max_request_id, 3)
@@ -0,0 +1,77 @@
+"""
+Compares the org hierarchy index with the recursive scan view_schedule used before, on a
+synthetic org chart. Everyone has up to branching reports, down to the given number of staff.
+
+python -m benchmarks.org_hierarchy [num_staff] [branching]
+"""
+
+import random
+import sys
+import time
+
+from org_hierarchy import OrgHierarchy
+
+
+def recursive_team_members(staff_id, data, visited=None, staff_details=None):
+    """The scan view_schedule.get_team_members did over /employee/get_all_employees."""
+    if visited is None:
+        visited = set()
+    if staff_details is None:
+        staff_details = {}
+    if staff_id in visited:
+        return staff_details
+    visited.add(staff_id)
+    for member in data:
+        if member["reporting_manager"] == staff_id:
+            staff_details[member["staff_id"]] = {
+                "staff_name": member["staff_name"],
+                "dept": member["dept"],
+                "position": member["position"],
+            }
+            recursive_team_members(member["staff_id"], data, visited, staff_details)
+    return staff_details
+
+
+def synthetic_org(num_staff, branching):
+    rows = [(1, 1, "CEO 1", "CEO", "MD")]
+    for staff_id in range(2, num_staff + 1):
+        manager = (staff_id - 2) // branching + 1
+        rows.append((staff_id, manager, f"Staff {staff_id}", f"Dept {manager % 8}", "Associate"))
+    return rows
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    num_staff = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    branching = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    rows = synthetic_org(num_staff, branching)
+    data = [
+        {"staff_id": s, "reporting_manager": m, "staff_name": n, "dept": d, "position": p}
+        for s, m, n, d, p in rows
+    ]
+
+    hierarchy, build_ms = timed(lambda: OrgHierarchy(rows))
+    print(f"index build for {num_staff} staff: {build_ms:.1f} ms")
+
+    random.seed(0)
+    managers = [staff_id for staff_id in hierarchy.children if staff_id != 1]
+    for label, staff_id in [
+        ("ceo", 1),
+        ("director", hierarchy.direct_reports(1)[0]),
+        ("senior manager", hierarchy.direct_reports(hierarchy.direct_reports(1)[0])[0]),
+        ("manager", hierarchy.direct_reports(hierarchy.direct_reports(hierarchy.direct_reports(1)[0])[0])[0]),
+        ("random manager", random.choice(managers)),
+    ]:
+        indexed, index_ms = timed(lambda: hierarchy.team_members(staff_id))
+        line = f"{label:<15} team={len(indexed):<6} index={index_ms:9.3f} ms"
+        # The recursive scan is O(staff x team size); skip it where it would run for minutes
+        if len(indexed) * num_staff <= 10**8:
+            scanned, scan_ms = timed(lambda: recursive_team_members(staff_id, data))
+            assert scanned.keys() == indexed.keys()
+            line += f"  recursive scan={scan_ms:10.1f} ms"
+        print(line)
@@ -0,0 +1,45 @@
+"""
+Compares /request/create with every weekday of the next three months sent as explicit
+request_dates, as NavBar.vue used to send recurring requests, against the same dates sent as
+a recurrence rule. Reports the request body size and the latency of each.
+
+python -m benchmarks.recurrence [num_calls]
+"""
+
+import json
+import sys
+from datetime import date, timedelta
+
+from benchmarks.common import create_schema, report, seed_employees, time_calls
+from recurrence import recurrence_dates
+import run
+
+
+if __name__ == "__main__":
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    create_schema(run.request_app)
+    seed_employees(run.request_app, num_calls * 2)
+    client = run.app.test_client()
+
+    start = date.today() + timedelta(days=1)
+    rule = {
+        "weekdays": [0, 1, 2, 3, 4],
+        "shift": "AM",
+        "start": start.isoformat(),
+        "until": (start + timedelta(days=88)).isoformat(),
+    }
+    bodies = {
+        "explicit request_dates": {"request_dates": recurrence_dates(rule)},
+        "recurrence rule": {"recurrence": rule},
+    }
+    for i, (label, body) in enumerate(bodies.items()):
+        staff_ids = range(2 + i * num_calls, 2 + (i + 1) * num_calls)
+        size = len(json.dumps({"staff_id": 2, "apply_reason": "Weekly WFH", **body}))
+
+        def create(staff_id):
+            response = client.post(
+                "/request/create", json={"staff_id": staff_id, "apply_reason": "Weekly WFH", **body}
+            )
+            assert response.status_code == 200, response.get_json()
+
+        report(f"{label} ({size} byte body)", time_calls(create, [(staff_id,) for staff_id in staff_ids]))
@@ -0,0 +1,62 @@
+"""
+Compares the ways /reject_requests/reject_request can run through the run.py app:
+
+- in one transaction, when request and request_dates run in the same process
+- the HTTP orchestration (update_reason and change_all_status) dispatched in-process
+- the same orchestration over loopback HTTP, as in a split deployment
+
+python -m benchmarks.reject_request [num_calls]
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+from benchmarks.common import (
+    create_schema,
+    free_port,
+    report,
+    seed_employees,
+    seed_requests,
+    serve_in_thread,
+    time_calls,
+)
+
+ports = {"REQUEST": free_port(), "REQUEST_DATES": free_port()}
+for service, port in ports.items():
+    os.environ[f"{service}_URL"] = f"http://127.0.0.1:{port}/{service.lower()}"
+
+import invokes
+import run
+
+
+def reject_all(label, client, request_ids):
+    samples = time_calls(
+        lambda request_id: client.put(
+            "/reject_requests/reject_request",
+            json={"request_id": request_id, "reason": "Benchmark"},
+        ),
+        [(request_id,) for request_id in request_ids],
+    )
+    report(label, samples)
+
+
+if __name__ == "__main__":
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    create_schema(run.request_app)
+    seed_employees(run.request_app, num_calls)
+    client = run.app.test_client()
+    staff_ids = range(2, 2 + num_calls)
+
+    reject_all("one transaction", client, seed_requests(run.request_app, staff_ids, 5))
+    with patch("reject_requests.is_local_service", return_value=False):
+        reject_all("orchestration, in-process", client, seed_requests(run.request_app, staff_ids, 5))
+
+    invokes.clear_local_services()
+    servers = [
+        serve_in_thread(run.request_app, ports["REQUEST"]),
+        serve_in_thread(run.request_dates_app, ports["REQUEST_DATES"]),
+    ]
+    reject_all("orchestration, http", client, seed_requests(run.request_app, staff_ids, 5))
+    for server in servers:
+        server.shutdown()
@@ -0,0 +1,44 @@
+"""
+Times repeated loads of /view_schedule/o_get_org_schedule and get_wfh_status_by_team with the
+response cache turned off and on, as when many managers open the same dashboard.
+
+python -m benchmarks.response_cache [num_staff] [wfh_days_per_staff]
+"""
+
+import sys
+from unittest.mock import patch
+
+from benchmarks.common import create_schema, report, seed_employees, time_calls
+from benchmarks.schedule_payload import DEPARTMENTS, seed_approved_wfh
+from config import Config
+from database import db
+from response_cache import get_response_cache
+from view_schedule import app as view_schedule_app
+from wfh_aggregate import rebuild_wfh_aggregate
+
+URLS = [
+    "/view_schedule/o_get_org_schedule",
+    "/view_schedule/get_wfh_status_by_team/10000",
+]
+
+
+if __name__ == "__main__":
+    num_staff = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    wfh_days = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    create_schema(view_schedule_app)
+    per_dept = num_staff // len(DEPARTMENTS)
+    for i, dept in enumerate(DEPARTMENTS):
+        seed_employees(
+            view_schedule_app, per_dept, manager_id=10_000 + i, first_staff_id=2 + i * per_dept, dept=dept
+        )
+    seed_approved_wfh(per_dept * len(DEPARTMENTS), wfh_days)
+    with view_schedule_app.app_context():
+        with db.engine.begin() as connection:
+            rebuild_wfh_aggregate(connection)
+    client = view_schedule_app.test_client()
+
+    for url in URLS:
+        with patch.object(Config, "RESPONSE_CACHE_ENABLED", False):
+            report(f"no cache: GET {url}", time_calls(lambda: client.get(url), [()] * 10))
+        report(f"cached: GET {url}", time_calls(lambda: client.get(url), [()] * 10))
+    print(get_response_cache().stats())
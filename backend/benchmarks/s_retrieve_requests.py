@@ -0,0 +1,69 @@
+"""
+Compares /view_requests/s_retrieve_requests with the one-query-per-request loop it replaced,
+for a staff member with many requests.
+
+python -m benchmarks.s_retrieve_requests [requests_per_staff]
+"""
+
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from benchmarks.common import (
+    create_schema,
+    report,
+    seed_employees,
+    seed_requests,
+    time_calls,
+)
+from database import db, Request, RequestDates
+from view_requests import app as view_requests_app
+
+
+def per_request_queries(s_staff_id):
+    """The loop s_retrieve_requests ran before: one RequestDates query per request."""
+    with view_requests_app.app_context():
+        requests = Request.query.filter_by(staff_id=s_staff_id).all()
+        return [
+            (req, RequestDates.query.filter_by(request_id=req.request_id).all())
+            for req in requests
+        ]
+
+
+@contextmanager
+def count_queries():
+    statements = []
+    with view_requests_app.app_context():
+        engine = db.engine
+
+    def record(*args):
+        statements.append(args[2])
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+if __name__ == "__main__":
+    num_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    create_schema(view_requests_app)
+    seed_employees(view_requests_app, 1)
+    seed_requests(view_requests_app, [2] * num_requests, dates_per_request=3)
+    client = view_requests_app.test_client()
+
+    with count_queries() as old_queries:
+        old = time_calls(per_request_queries, [(2,)] * 20)
+    with count_queries() as new_queries:
+        new = time_calls(
+            lambda: client.get("/view_requests/s_retrieve_requests/2"), [()] * 20
+        )
+    page = time_calls(
+        lambda: client.get("/view_requests/s_retrieve_requests/2?limit=20&status=Pending Approval"),
+        [()] * 20,
+    )
+    report(f"per-request queries ({len(old_queries) // 20} queries per call)", old)
+    report(f"s_retrieve_requests ({len(new_queries) // 20} queries per call)", new)
+    report("s_retrieve_requests, first page of 20", page)
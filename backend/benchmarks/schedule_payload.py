@@ -0,0 +1,64 @@
+"""
+Compares the nested and columnar (?format=columnar) responses of
+/view_schedule/o_get_org_schedule: payload size, time to build and serialize on the server,
+and time to parse on the client.
+
+python -m benchmarks.schedule_payload [num_staff] [wfh_days_per_staff]
+"""
+
+import json
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import create_schema, report, seed_employees, time_calls
+from database import db, Request, RequestDates
+from view_schedule import app as view_schedule_app
+
+DEPARTMENTS = ["Sales", "Finance", "Engineering", "HR", "IT"]
+
+
+def seed_approved_wfh(num_staff, wfh_days_per_staff):
+    """Spread each staff member's approved WFH days over the schedule window."""
+    first_day = date.today() - timedelta(days=60)
+    with view_schedule_app.app_context():
+        new_requests = [
+            Request(staff_id, date.today(), "Benchmark") for staff_id in range(2, 2 + num_staff)
+        ]
+        db.session.add_all(new_requests)
+        db.session.flush()
+        db.session.add_all(
+            [
+                RequestDates(
+                    req.request_id,
+                    first_day + timedelta(days=(req.staff_id * 7 + n * 5) % 150),
+                    ["AM", "PM", "Full"][(req.staff_id + n) % 3],
+                    request_status="Approved",
+                )
+                for req in new_requests
+                for n in range(wfh_days_per_staff)
+            ]
+        )
+        db.session.commit()
+
+
+if __name__ == "__main__":
+    num_staff = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    wfh_days = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    create_schema(view_schedule_app)
+    per_dept = num_staff // len(DEPARTMENTS)
+    for i, dept in enumerate(DEPARTMENTS):
+        seed_employees(
+            view_schedule_app, per_dept, manager_id=10_000 + i, first_staff_id=2 + i * per_dept, dept=dept
+        )
+    seed_approved_wfh(per_dept * len(DEPARTMENTS), wfh_days)
+    client = view_schedule_app.test_client()
+
+    for label, query_string in [("nested", ""), ("columnar", "?format=columnar")]:
+        url = f"/view_schedule/o_get_org_schedule{query_string}"
+        body = client.get(url).get_data()
+        server = time_calls(lambda: client.get(url), [()] * 10)
+        parse = time_calls(lambda: json.loads(body), [()] * 10)
+        print(f"{label}: {len(body) / 1024:,.1f} KiB")
+        report(f"{label}: GET o_get_org_schedule", server)
+        report(f"{label}: json.loads", parse)
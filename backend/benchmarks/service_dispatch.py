@@ -0,0 +1,77 @@
+"""
+Compares in-process service dispatch against loopback HTTP for the run.py monolith.
+
+Both modes go through the run.py app; only the calls between services change.
+In HTTP mode request and request_dates are served on local ports,
+as they would be in a split deployment.
+
+python -m benchmarks.service_dispatch [num_calls]
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+from benchmarks.common import (
+    create_schema,
+    free_port,
+    report,
+    seed_employees,
+    seed_requests,
+    serve_in_thread,
+    time_calls,
+)
+
+ports = {"REQUEST": free_port(), "REQUEST_DATES": free_port()}
+for service, port in ports.items():
+    os.environ[f"{service}_URL"] = f"http://127.0.0.1:{port}/{service.lower()}"
+
+import invokes
+import run
+
+
+def run_mode(label, client, num_calls, first_staff_id):
+    staff_ids = range(first_staff_id, first_staff_id + num_calls)
+    request_ids = seed_requests(run.request_app, staff_ids)
+    create_date = (date.today() + timedelta(days=30)).isoformat()
+
+    reject = time_calls(
+        lambda request_id: client.put(
+            "/reject_requests/reject_request",
+            json={"request_id": request_id, "reason": "Benchmark"},
+        ),
+        [(request_id,) for request_id in request_ids],
+    )
+    create = time_calls(
+        lambda staff_id: client.post(
+            "/request/create",
+            json={
+                "staff_id": staff_id,
+                "request_dates": {create_date: "Full"},
+                "apply_reason": "Benchmark",
+            },
+        ),
+        [(staff_id,) for staff_id in staff_ids],
+    )
+    report(f"{label}: PUT /reject_requests/reject_request", reject)
+    report(f"{label}: POST /request/create", create)
+
+
+if __name__ == "__main__":
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    create_schema(run.request_app)
+    seed_employees(run.request_app, num_calls * 2)
+    client = run.app.test_client()
+
+    run_mode("in-process", client, num_calls, first_staff_id=2)
+
+    invokes.clear_local_services()
+    servers = [
+        serve_in_thread(run.request_app, ports["REQUEST"]),
+        serve_in_thread(run.request_dates_app, ports["REQUEST_DATES"]),
+    ]
+    run_mode("http", client, num_calls, first_staff_id=2 + num_calls)
+    for host, pool in invokes.get_invoke_stats()["pools"].items():
+        print(f"{host}: {pool}")
+    for server in servers:
+        server.shutdown()
@@ -0,0 +1,83 @@
+"""
+Compares /request_dates/change_all_status, which changes the dates of a request with
+UPDATE ... RETURNING, with the loop it replaced, which loaded every date of the request,
+changed them one by one in the session and read them back after the commit. Reports latency
+and SQL statements per call for requests of a few sizes.
+
+python -m benchmarks.set_based_status [num_calls]
+"""
+
+import sys
+
+from sqlalchemy import event
+
+from benchmarks.common import create_schema, report, seed_employees, seed_requests, time_calls
+from database import db, RequestDates
+from wfh_aggregate import record_status_changes
+import request_dates
+import run
+
+DATES_PER_REQUEST = [1, 10, 60]
+
+
+def per_row_change(request_id, new_status):
+    """The steps change_all_status took before, minus the status log."""
+    dates = RequestDates.query.filter_by(request_id=request_id).all()
+    status_changes = []
+    for request_date in dates:
+        if request_date.request_status not in ("Withdrawn", "Pending Withdrawal"):
+            status_changes.append(
+                (
+                    request_id,
+                    request_date.request_date,
+                    request_date.request_shift,
+                    request_date.request_status,
+                    new_status,
+                )
+            )
+            request_date.request_status = new_status
+    record_status_changes(status_changes)
+    db.session.commit()
+    return [request_date.json() for request_date in dates]
+
+
+def set_based_change(request_id, new_status):
+    with run.request_dates_app.test_request_context(
+        "/request_dates/change_all_status",
+        method="PUT",
+        json={"request_id": request_id, "status": new_status},
+    ):
+        request_dates.change_all_status()
+
+
+def measure(label, change, request_ids):
+    with run.request_dates_app.app_context():
+        engine = db.engine
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    with run.request_dates_app.app_context():
+        samples = time_calls(change, [(request_id, "Approved") for request_id in request_ids])
+    event.remove(engine, "before_cursor_execute", listener)
+    report(f"{label} ({len(statements) / len(request_ids):.1f} statements/call)", samples)
+
+
+if __name__ == "__main__":
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    create_schema(run.request_app)
+    seed_employees(run.request_app, num_calls)
+    staff_ids = range(2, 2 + num_calls)
+    # Only the database work is compared
+    request_dates.log_status_event = lambda **log_data: None
+
+    for dates_per_request in DATES_PER_REQUEST:
+        measure(
+            f"per row: {dates_per_request} dates",
+            per_row_change,
+            seed_requests(run.request_app, staff_ids, dates_per_request),
+        )
+        measure(
+            f"set based: {dates_per_request} dates",
+            set_based_change,
+            seed_requests(run.request_app, staff_ids, dates_per_request),
+        )
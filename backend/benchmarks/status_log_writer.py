@@ -0,0 +1,42 @@
+"""
+Compares logging status events through /status_log/add_event, which commits one row per
+call, with queueing them on the write-behind StatusLogWriter, and times the bulk flush.
+
+python -m benchmarks.status_log_writer [num_events]
+"""
+
+import sys
+import time
+
+from benchmarks.common import create_schema, report, seed_employees, seed_requests, time_calls
+from status_log import app as status_log_app
+from status_log_writer import StatusLogWriter
+
+
+if __name__ == "__main__":
+    num_events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    create_schema(status_log_app)
+    seed_employees(status_log_app, 1)
+    [request_id] = seed_requests(status_log_app, [2])
+    client = status_log_app.test_client()
+
+    per_call = time_calls(
+        lambda: client.post(
+            "/status_log/add_event",
+            json={"request_id": request_id, "action": "Benchmark", "reason": "Benchmark"},
+        ),
+        [()] * num_events,
+    )
+    # Thresholds high enough that nothing is written until flush() below
+    writer = StatusLogWriter(status_log_app, batch_size=num_events + 1, max_age=3600)
+    queued = time_calls(
+        lambda: writer.log(request_id, "Benchmark", "Benchmark"), [()] * num_events
+    )
+    start = time.perf_counter()
+    writer.flush()
+    flush_ms = (time.perf_counter() - start) * 1000
+    writer.close()
+
+    report("POST /status_log/add_event (one commit per event)", per_call)
+    report("StatusLogWriter.log (queue append)", queued)
+    print(f"StatusLogWriter.flush: {num_events} events in one insert, {flush_ms:.1f} ms")
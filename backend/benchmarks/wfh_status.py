@@ -0,0 +1,117 @@
+"""
+Compares /view_schedule/get_wfh_status with the per-row loop it replaced, on a large request
+history (1M request_dates rows by default):
+
+- per-row loop: every request date in history, deduplicated with list membership checks
+- vectorized from request_dates: status and window filtered in SQL, then attendance.staff_by_day
+- get_wfh_status: the daily_wfh_count aggregate read through attendance.staff_by_day
+
+python -m benchmarks.wfh_status [num_request_dates] [num_staff]
+"""
+
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from attendance import staff_by_day
+from benchmarks.common import create_schema, report, seed_employees, time_calls
+from database import db, Employee, Request, RequestDates
+from view_schedule import app as view_schedule_app, get_wfh_window
+from wfh_aggregate import rebuild_wfh_aggregate
+
+STATUSES = ["Approved", "Approved", "Pending Approval", "Rejected", "Withdrawn"]
+
+
+def seed_history(num_request_dates, num_staff):
+    """One request per staff member, with dates spread over the last 3 years and next 3 months."""
+    random.seed(212)
+    first_day = date.today() - timedelta(days=3 * 365)
+    num_days = 3 * 365 + 90
+    with view_schedule_app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(
+                insert(Request),
+                [
+                    {
+                        "request_id": staff_id,
+                        "staff_id": staff_id,
+                        "creation_date": first_day,
+                        "apply_reason": "Benchmark",
+                    }
+                    for staff_id in range(2, 2 + num_staff)
+                ],
+            )
+            for chunk_start in range(0, num_request_dates, 50_000):
+                connection.execute(
+                    insert(RequestDates),
+                    [
+                        {
+                            "request_id": random.randrange(2, 2 + num_staff),
+                            "request_date": first_day + timedelta(days=random.randrange(num_days)),
+                            "request_shift": random.choice(["AM", "PM", "Full"]),
+                            "request_status": random.choice(STATUSES),
+                        }
+                        for _ in range(chunk_start, min(chunk_start + 50_000, num_request_dates))
+                    ],
+                )
+
+
+def per_row_loop():
+    """get_wfh_status before: all history, any status, O(n) list membership per row."""
+    with view_schedule_app.app_context():
+        results = (
+            db.session.query(Employee.staff_id, RequestDates.request_date)
+            .join(Request, Request.request_id == RequestDates.request_id)
+            .join(Employee, Employee.staff_id == Request.staff_id)
+            .all()
+        )
+    status = {}
+    for staff_id, request_date in results:
+        date_str = request_date.isoformat()
+        if date_str not in status:
+            status[date_str] = [staff_id]
+        elif staff_id not in status[date_str]:
+            status[date_str].append(staff_id)
+    return status
+
+
+def vectorized_from_request_dates():
+    with view_schedule_app.app_context():
+        start_date, end_date = get_wfh_window()
+        rows = (
+            db.session.query(RequestDates.request_date, Request.staff_id)
+            .join(Request, Request.request_id == RequestDates.request_id)
+            .filter(
+                RequestDates.request_status == "Approved",
+                RequestDates.request_date.between(start_date, end_date),
+            )
+            .all()
+        )
+    return staff_by_day([row[0] for row in rows], [row[1] for row in rows], start_date, end_date)
+
+
+if __name__ == "__main__":
+    num_request_dates = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    num_staff = int(sys.argv[2]) if len(sys.argv) > 2 else 5_000
+    create_schema(view_schedule_app)
+    seed_employees(view_schedule_app, num_staff)
+    start = time.perf_counter()
+    seed_history(num_request_dates, num_staff)
+    print(f"seeded {num_request_dates:,} request_dates in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    with view_schedule_app.app_context():
+        with db.engine.begin() as connection:
+            rows = rebuild_wfh_aggregate(connection)
+    print(f"rebuilt daily_wfh_count ({rows:,} rows) in {time.perf_counter() - start:.1f} s")
+
+    client = view_schedule_app.test_client()
+    report("per-row loop over all history", time_calls(per_row_loop, [()] * 3))
+    report("vectorized from request_dates", time_calls(vectorized_from_request_dates, [()] * 5))
+    report(
+        "GET get_wfh_status (aggregate)",
+        time_calls(lambda: client.get("/view_schedule/get_wfh_status"), [()] * 5),
+    )
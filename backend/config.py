@@ -17,5 +17,39 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {"pool_recycle": 299}
     CORS_ORIGINS = "*"
+    # Apply pending schema migrations (migrations.py) when run.py starts
+    APPLY_MIGRATIONS = os.getenv("APPLY_MIGRATIONS", "true").lower() == "true"
+    # Call services running in the same process (run.py) without going over HTTP
+    LOCAL_SERVICE_DISPATCH = os.getenv("LOCAL_SERVICE_DISPATCH", "true").lower() == "true"
+    # Shared HTTP client used by invokes.invoke_http for calls to remote services
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+    HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+    HTTP_GET_RETRIES = int(os.getenv("HTTP_GET_RETRIES", "2"))
+    HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.1"))
+    # Calls made at the same time by invokes.invoke_many, and the seconds they share to finish
+    INVOKE_MANY_CONCURRENCY = int(os.getenv("INVOKE_MANY_CONCURRENCY", "8"))
+    INVOKE_MANY_DEADLINE = float(os.getenv("INVOKE_MANY_DEADLINE", "30"))
+    # Requests rejected per set-based statement by /request_dates/auto_reject
+    AUTO_REJECT_CHUNK_SIZE = int(os.getenv("AUTO_REJECT_CHUNK_SIZE", "500"))
+    # Entries accepted by one call to /request/create_bulk
+    BULK_CREATE_MAX_ENTRIES = int(os.getenv("BULK_CREATE_MAX_ENTRIES", "1000"))
+    # Items accepted by one call to /request_dates/bulk_transition
+    BULK_TRANSITION_MAX_ITEMS = int(os.getenv("BULK_TRANSITION_MAX_ITEMS", "1000"))
+    # The largest limit accepted by the paginated request listings (pagination.py)
+    PAGE_LIMIT_MAX = int(os.getenv("PAGE_LIMIT_MAX", "500"))
+    # StatusLog events are queued and written in bulk by status_log_writer.py, once
+    # STATUS_LOG_BATCH_SIZE are waiting or the oldest has waited STATUS_LOG_MAX_AGE seconds
+    STATUS_LOG_WRITE_BEHIND = os.getenv("STATUS_LOG_WRITE_BEHIND", "true").lower() == "true"
+    STATUS_LOG_BATCH_SIZE = int(os.getenv("STATUS_LOG_BATCH_SIZE", "100"))
+    STATUS_LOG_MAX_AGE = float(os.getenv("STATUS_LOG_MAX_AGE", "0.5"))
+    # Seconds between checks that the in-memory employee directory matches the employee table
+    EMPLOYEE_DIRECTORY_CHECK_INTERVAL = float(os.getenv("EMPLOYEE_DIRECTORY_CHECK_INTERVAL", "5"))
+    # view_schedule responses cached in memory by response_cache.py: at most RESPONSE_CACHE_SIZE
+    # entries, each served for up to RESPONSE_CACHE_TTL seconds
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
     DEBUG = True
     TESTING = True
@@ -0,0 +1,194 @@
+"""
+Data versions for conditional GETs.
+
+The data_version table keeps one counter per table. Every committed session transaction that
+inserts, updates or deletes employee, request or request_dates rows raises their counters,
+whether the change went through the ORM or a bulk update(...)/delete(...) statement. The
+counters live in the database, so writes made by any service process show up in every other
+one.
+
+The counters are raised right after the commit, in a transaction of their own, so that writers
+only hold the lock on a counter row for that one statement instead of for the rest of their
+transaction. Until it commits, a client can still get a 304 for the data from just before the
+write. If it fails, the error is logged and the counters catch up with the next write.
+
+Read endpoints wrapped in conditional_get send an ETag built from the counters of the tables
+they read. A client that sends it back in If-None-Match gets a 304 after one primary key
+lookup, without the endpoint's own queries running.
+
+Writes made outside a session, on a bare engine connection, are not counted.
+"""
+
+import logging
+from datetime import date
+from functools import wraps
+from flask import g, has_request_context, make_response, request
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from database import db, DataVersion, Employee, Request, RequestDates
+
+TRACKED_TABLES = {model.__table__.name for model in (Employee, Request, RequestDates)}
+
+logger = logging.getLogger(__name__)
+
+
+def _note_changed_tables(session, tables):
+    changed = {table for table in tables if table in TRACKED_TABLES}
+    if changed:
+        session.info.setdefault("changed_tables", set()).update(changed)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_changes(session, flush_context):
+    _note_changed_tables(
+        session,
+        {
+            instance.__table__.name
+            for instance in (*session.new, *session.dirty, *session.deleted)
+            if hasattr(instance, "__table__")
+        },
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_changes(orm_execute_state):
+    # update(...), delete(...) and insert(...) statements do not go through the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _note_changed_tables(orm_execute_state.session, {orm_execute_state.statement.table.name})
+
+
+@event.listens_for(Session, "before_commit")
+def _collect_changed_tables(session):
+    # Flush first so that changes still pending in the session are counted too
+    session.flush()
+    changed = session.info.pop("changed_tables", None)
+    if changed:
+        session.info["committing_tables"] = changed
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    committed = session.info.pop("committing_tables", None)
+    if not committed:
+        return
+    try:
+        with session.get_bind().engine.begin() as connection:
+            bump_data_versions(connection, committed)
+    except Exception:
+        logger.exception("Failed to raise the data versions of %s", sorted(committed))
+    for table in committed:
+        for callback in _commit_callbacks.get(table, []):
+            callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_changes(session):
+    session.info.pop("changed_tables", None)
+    session.info.pop("committing_tables", None)
+
+
+_commit_callbacks = {}
+
+
+def on_commit(table, callback):
+    """Call callback() after every commit in this process that changed the table."""
+    _commit_callbacks.setdefault(table, []).append(callback)
+
+
+def bump_data_versions(connection, tables):
+    """Raise the counters of the given tables by one, in the connection's (or session's)
+    transaction."""
+    # Always in the same order, so two transactions cannot lock the rows in opposite orders
+    tables = sorted(tables)
+    result = connection.execute(
+        update(DataVersion)
+        .where(DataVersion.table_name.in_(tables))
+        .values(version=DataVersion.version + 1)
+    )
+    if result.rowcount < len(tables):
+        # Counters are created on first use in databases that the migration has not seeded
+        existing = set(
+            connection.scalars(
+                select(DataVersion.table_name).where(DataVersion.table_name.in_(tables))
+            )
+        )
+        connection.execute(
+            insert(DataVersion),
+            [{"table_name": table, "version": 1} for table in tables if table not in existing],
+        )
+
+
+def get_data_versions(tables):
+    """
+    The current counter of each table, 0 for tables that have never been written to.
+
+    Returns:
+        {"employee": 3, "request": 120, "request_dates": 415}
+    """
+    versions = dict.fromkeys(tables, 0)
+    versions.update(
+        db.session.execute(
+            select(DataVersion.table_name, DataVersion.version).where(
+                DataVersion.table_name.in_(list(versions))
+            )
+        ).all()
+    )
+    return versions
+
+
+def data_etag(tables, daily=False):
+    """
+    An ETag value that changes whenever one of the tables is written to, and also every day if
+    daily is set, for responses that depend on today's date.
+
+    Read once per request: conditional_get and the response cache of the same GET share it.
+
+    Returns:
+        "employee.3-request.120-request_dates.415-2024-10-01"
+    """
+    if has_request_context():
+        etags = g.setdefault("data_etags", {})
+        key = (tuple(sorted(tables)), daily)
+        if key not in etags:
+            etags[key] = _data_etag(tables, daily)
+        return etags[key]
+    return _data_etag(tables, daily)
+
+
+def _data_etag(tables, daily):
+    versions = get_data_versions(tables)
+    etag = "-".join(f"{table}.{versions[table]}" for table in sorted(versions))
+    if daily:
+        etag += f"-{date.today().isoformat()}"
+    return etag
+
+
+def conditional_get(*tables, daily=False):
+    """
+    Decorate a GET view whose response only depends on its URL and the given tables. Its 200
+    responses carry an ETag, and a request whose If-None-Match matches it gets an empty 304
+    without the view running.
+
+    Parameters:
+        tables (str): The tables the view reads, e.g. "employee", "request_dates"
+        daily (bool): The response also depends on today's date
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = data_etag(tables, daily)
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            # Let browsers keep the response but check the ETag before every reuse
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
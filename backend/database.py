@@ -6,6 +6,10 @@ db = SQLAlchemy()
 
 class Employee(db.Model):
     __tablename__ = "employee"
+    __table_args__ = (
+        db.Index("ix_employee_reporting_manager", "reporting_manager"),
+        db.Index("ix_employee_dept_position_role", "dept", "position", "role"),
+    )
 
     staff_id = db.Column(db.Integer, primary_key=True)
     staff_fname = db.Column(db.String(50), nullable=False)
@@ -57,6 +61,7 @@ class Employee(db.Model):
 
 class Request(db.Model):
     __tablename__ = "request"
+    __table_args__ = (db.Index("ix_request_staff_id", "staff_id"),)
 
     request_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     staff_id = db.Column(db.Integer, db.ForeignKey("employee.staff_id"), nullable=False)
@@ -85,6 +90,10 @@ class Request(db.Model):
 
 class RequestDates(db.Model):
     __tablename__ = "request_dates"
+    __table_args__ = (
+        db.Index("ix_request_dates_request_id", "request_id"),
+        db.Index("ix_request_dates_status_date", "request_status", "request_date"),
+    )
 
     request_date_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     request_id = db.Column(
@@ -96,6 +105,11 @@ class RequestDates(db.Model):
     rescind_reason = db.Column(db.String(100), nullable=True)
     withdraw_reason = db.Column(db.String(100), nullable=True)
 
+    request = db.relationship(
+        "Request",
+        backref=db.backref("request_dates", order_by="RequestDates.request_date_id"),
+    )
+
     def __init__(
         self,
         request_id,
@@ -152,3 +166,71 @@ class StatusLog(db.Model):
             "action": self.action,
             "reason": self.reason,
         }
+
+
+class DailyWfhCount(db.Model):
+    """Approved WFH per day, kept up to date by wfh_aggregate.py as request statuses change."""
+
+    __tablename__ = "daily_wfh_count"
+
+    wfh_date = db.Column(db.Date, primary_key=True)
+    dept = db.Column(db.String(50), primary_key=True)
+    # Staff without a reporting manager are counted under their own staff_id
+    reporting_manager = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    shift = db.Column(db.String(5), primary_key=True)
+    wfh_count = db.Column(db.Integer, nullable=False, default=0)
+    # One entry per approved request date, so a staff_id repeats if they have two
+    staff_ids = db.Column(db.JSON, nullable=False, default=list)
+
+    def __init__(self, wfh_date, dept, reporting_manager, shift, wfh_count=0, staff_ids=None):
+        self.wfh_date = wfh_date
+        self.dept = dept
+        self.reporting_manager = reporting_manager
+        self.shift = shift
+        self.wfh_count = wfh_count
+        self.staff_ids = staff_ids or []
+
+    def json(self):
+        return {
+            "wfh_date": self.wfh_date.isoformat(),
+            "dept": self.dept,
+            "reporting_manager": self.reporting_manager,
+            "shift": self.shift,
+            "wfh_count": self.wfh_count,
+            "staff_ids": self.staff_ids,
+        }
+
+
+class SchemaVersion(db.Model):
+    __tablename__ = "schema_version"
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.now)
+
+    def __init__(self, version, description):
+        self.version = version
+        self.description = description
+
+    def json(self):
+        return {
+            "version": self.version,
+            "description": self.description,
+            "applied_at": self.applied_at.isoformat(),
+        }
+
+
+class DataVersion(db.Model):
+    """A counter per table, raised by data_version.py whenever a transaction changes the table."""
+
+    __tablename__ = "data_version"
+
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __init__(self, table_name, version=0):
+        self.table_name = table_name
+        self.version = version
+
+    def json(self):
+        return {"table_name": self.table_name, "version": self.version}
@@ -1,11 +1,15 @@
-from flask import Flask, jsonify
+from flask import Flask, request, jsonify
 from flask_cors import CORS
+from sqlalchemy import select, literal
+from sqlalchemy.orm import aliased
 from database import db, Employee
+from data_version import conditional_get
+from employee_directory import get_employee_directory
 
 
 app = Flask(__name__)
 app.config.from_object("config.Config")
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["ETag"])
 db.init_app(app)
 
 
@@ -34,9 +38,9 @@ def get_employee_details(staff_id):
         }
     """
     try:
-        employee = Employee.query.get(staff_id)
+        employee = get_employee_directory().details(staff_id)
         if employee:
-            return jsonify({"code": 200, "data": employee.json()})
+            return jsonify({"code": 200, "data": employee})
         return jsonify({"code": 404, "error": "Employee not found."}), 404
     except Exception as e:
         return jsonify({"code": 500, "error": f"An error occurred: {e}"}), 500
@@ -94,6 +98,8 @@ def get_team(staff_id):
     ---
     Parameters:
         staff_id (int): The manager's staff_id
+        depth (int, optional query parameter): How many levels below staff_id to include.
+            Level 1 are the managers; their team_members cover levels 2 to depth. Defaults to 2.
 
     Success response:
         {
@@ -117,21 +123,44 @@ def get_team(staff_id):
         }
     """
     try:
-        staff_list = Employee.query.filter_by(reporting_manager=staff_id).all()
-        output = {"director_id": staff_id, "managers_and_teams": []}
+        depth = request.args.get("depth", default=2, type=int)
+        if depth < 1:
+            return jsonify({"code": 400, "error": "depth must be at least 1."}), 400
+
+        # Walk the reporting lines down from staff_id in a single recursive query, tagging
+        # everyone with the level-1 manager they sit under
+        team = (
+            select(
+                Employee.staff_id,
+                Employee.staff_id.label("manager_id"),
+                literal(1).label("level"),
+            )
+            .where(Employee.reporting_manager == staff_id)
+            .cte("team", recursive=True)
+        )
+        member = aliased(Employee)
+        team = team.union_all(
+            select(member.staff_id, team.c.manager_id, team.c.level + 1).where(
+                member.reporting_manager == team.c.staff_id,
+                # The CEO reports to themselves; do not walk that loop again
+                member.staff_id != member.reporting_manager,
+                team.c.level < depth,
+            )
+        )
+        rows = db.session.execute(
+            select(team.c.staff_id, team.c.manager_id, team.c.level).order_by(
+                team.c.level, team.c.manager_id, team.c.staff_id
+            )
+        ).all()
 
-        for manager in staff_list:
-            team_members = [
-                member.staff_id
-                for member in Employee.query.filter_by(
-                    reporting_manager=manager.staff_id
-                ).all()
-            ]
-            team = {
-                "manager_id": manager.staff_id,
-                "team_members": [manager.staff_id] + team_members,
-            }
-            output["managers_and_teams"].append(team)
+        output = {"director_id": staff_id, "managers_and_teams": []}
+        teams = {}
+        for member_id, manager_id, level in rows:
+            if level == 1:
+                teams[member_id] = {"manager_id": member_id, "team_members": [member_id]}
+                output["managers_and_teams"].append(teams[member_id])
+            else:
+                teams[manager_id]["team_members"].append(member_id)
 
         return jsonify(output), 200
     except Exception as e:
@@ -166,23 +195,18 @@ def get_all_employees():
     }
     """
     try:
-        employees = Employee.query.all()
-        reporting_structure = [
-            {
-                "staff_id": employee.staff_id,
-                "reporting_manager": employee.reporting_manager,
-                "staff_name": f"{employee.staff_fname} {employee.staff_lname}",
-                "dept": employee.dept,
-                "position": employee.position,
-            }
-            for employee in employees
-        ]
-        return jsonify({"code": 200, "data": reporting_structure}), 200
+        return (
+            app.response_class(
+                get_employee_directory().all_employees_json, mimetype="application/json"
+            ),
+            200,
+        )
     except Exception as e:
         return jsonify({"code": 500, "error": f"An error occurred: {e}"}), 500
 
 
 @app.route("/employee/get_all_employees_by_dept", methods=["GET"])
+@conditional_get("employee")
 def get_all_employees_by_dept():
     """
     Get all staff IDs and their details, grouped by department.
@@ -210,20 +234,12 @@ def get_all_employees_by_dept():
     }
     """
     try:
-        employees = Employee.query.all()
-        reporting_structure = {}
-
-        for employee in employees:
-            dept = employee.dept
-            staff_data = {
-                "staff_name": f"{employee.staff_fname} {employee.staff_lname}",
-                "role": employee.position,
-                "staff_id": employee.staff_id,
-                "reporting_manager": employee.reporting_manager,
-            }
-            reporting_structure.setdefault(dept, {})[employee.staff_id] = staff_data
-
-        return jsonify({"code": 200, "data": reporting_structure}), 200
+        return (
+            app.response_class(
+                get_employee_directory().employees_by_dept_json, mimetype="application/json"
+            ),
+            200,
+        )
     except Exception as e:
         return jsonify({"code": 500, "error": f"An error occurred: {e}"}), 500
 
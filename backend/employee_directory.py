@@ -0,0 +1,135 @@
+"""
+In-process, read-only snapshot of the employee table.
+
+A snapshot holds every employee by staff_id, the staff_ids under each reporting manager and in
+each department, and the JSON bodies of /employee/get_all_employees and
+/employee/get_all_employees_by_dept, serialized once when it is built. Lookups are then
+dictionary reads with no database round trip.
+
+A snapshot is never changed after it is built. A reload builds a new one and swaps it in
+with one assignment, so readers see either the old or the new snapshot, never a mix. It is
+reloaded on the next lookup after a commit in this process changes the employee table, and
+when the employee data version (data_version.py) differs from the one it was built from. The
+version is checked at most every Config.EMPLOYEE_DIRECTORY_CHECK_INTERVAL seconds, to pick up
+changes made by other processes.
+"""
+
+import json
+import threading
+import time
+from types import MappingProxyType
+from config import Config
+from data_version import get_data_versions, on_commit
+from sqlalchemy import select
+from database import db, Employee
+
+
+def _to_json(data):
+    return json.dumps({"code": 200, "data": data}, separators=(",", ":"), sort_keys=True).encode()
+
+
+class EmployeeDirectory:
+    def __init__(self, employees, version=None):
+        """
+        Parameters:
+            employees (iterable): Employee.json() dicts
+            version (int): The employee data version the rows were read at
+        """
+        self.version = version
+        by_id = {}
+        by_manager = {}
+        by_dept = {}
+        for employee in sorted(employees, key=lambda employee: employee["staff_id"]):
+            staff_id = employee["staff_id"]
+            by_id[staff_id] = MappingProxyType(dict(employee))
+            by_manager.setdefault(employee["reporting_manager"], []).append(staff_id)
+            by_dept.setdefault(employee["dept"], []).append(staff_id)
+
+        self.by_id = MappingProxyType(by_id)
+        self.by_manager = MappingProxyType(
+            {manager: tuple(staff_ids) for manager, staff_ids in by_manager.items()}
+        )
+        self.by_dept = MappingProxyType(
+            {dept: tuple(staff_ids) for dept, staff_ids in by_dept.items()}
+        )
+
+        # The full listings, serialized once for every request that asks for them
+        self.all_employees_json = _to_json(
+            [
+                {
+                    "staff_id": employee["staff_id"],
+                    "reporting_manager": employee["reporting_manager"],
+                    "staff_name": f"{employee['staff_fname']} {employee['staff_lname']}",
+                    "dept": employee["dept"],
+                    "position": employee["position"],
+                }
+                for employee in by_id.values()
+            ]
+        )
+        employees_by_dept = {}
+        for staff_id, employee in by_id.items():
+            employees_by_dept.setdefault(employee["dept"], {})[staff_id] = {
+                "staff_name": f"{employee['staff_fname']} {employee['staff_lname']}",
+                "role": employee["position"],
+                "staff_id": staff_id,
+                "reporting_manager": employee["reporting_manager"],
+            }
+        self.employees_by_dept_json = _to_json(employees_by_dept)
+
+    def details(self, staff_id):
+        """The employee's Employee.json() dict, or None if there is no such employee."""
+        employee = self.by_id.get(staff_id)
+        return dict(employee) if employee is not None else None
+
+    def reporting_to(self, staff_id):
+        """Employee.json() dicts of the staff reporting directly to staff_id, by staff_id."""
+        return [dict(self.by_id[member_id]) for member_id in self.by_manager.get(staff_id, ())]
+
+
+_lock = threading.Lock()
+_directory = None
+_checked_at = 0.0
+_stale = False
+
+
+def invalidate_employee_directory():
+    """Make the next lookup reload the snapshot."""
+    global _stale
+    _stale = True
+
+
+on_commit(Employee.__table__.name, invalidate_employee_directory)
+
+
+def _load():
+    global _directory, _checked_at, _stale
+    # Cleared before reading, so a commit made during the load marks the new snapshot stale
+    changed_here, _stale = _stale, False
+    version = get_data_versions([Employee.__table__.name])[Employee.__table__.name]
+    if _directory is None or changed_here or _directory.version != version:
+        # Plain rows instead of ORM objects, as nothing here is ever written back
+        columns = Employee.__table__.columns
+        employees = [
+            dict(zip(columns.keys(), row)) for row in db.session.execute(select(*columns))
+        ]
+        _directory = EmployeeDirectory(employees, version)
+    _checked_at = time.monotonic()
+
+
+def get_employee_directory():
+    """Return the current snapshot, reloading it first if it is stale. Must be called inside a
+    Flask app context."""
+    if (
+        _directory is not None
+        and not _stale
+        and time.monotonic() - _checked_at < Config.EMPLOYEE_DIRECTORY_CHECK_INTERVAL
+    ):
+        return _directory
+    with _lock:
+        if (
+            _directory is None
+            or _stale
+            or time.monotonic() - _checked_at >= Config.EMPLOYEE_DIRECTORY_CHECK_INTERVAL
+        ):
+            _load()
+        return _directory
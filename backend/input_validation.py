@@ -21,27 +21,46 @@ def string_length_valid(input_string, min_length=0, max_length=None):
     else:
         return False
 
-def has_existing_request(employee_requests, apply_date):
+
+# Request dates in these statuses still hold their shift, so new requests cannot overlap them
+ACTIVE_STATUSES = ["Pending Approval", "Approved", "Pending Withdrawal"]
+
+# The statuses a request date can move to from each status. Rejected, Withdrawn and Rescinded
+# dates stay as they are
+STATUS_TRANSITIONS = {
+    "Pending Approval": {"Approved", "Rejected", "Withdrawn"},
+    "Approved": {"Rescinded", "Pending Withdrawal"},
+    # The manager approves the withdrawal, or rejects it and the date stays approved
+    "Pending Withdrawal": {"Withdrawn", "Approved"},
+}
+
+# One bit per half-day: two shifts overlap when their masks share a bit
+SHIFT_MASKS = {"AM": 1, "PM": 2, "Full": 3}
+
+
+def shift_mask(shift):
+    """The half-days a shift covers; unknown shifts are treated as a full day."""
+    return SHIFT_MASKS.get(shift, SHIFT_MASKS["Full"])
+
+
+def first_conflict(taken_shifts, apply_date):
     """
-    Checks if the employee already has an existing request for the given date.
+    Finds the first requested date whose shift overlaps a shift already taken on that date.
 
     Parameters:
-        employee_requests (list): A list of dictionaries containing employee requests.
-        employee_id (int): The ID of the employee member.
-        request_date (str): The date of the request in 'YYYY-MM-DD' format.
+        taken_shifts (dict): Dates in 'YYYY-MM-DD' format mapped to the combined shift_mask of
+            the active request dates on them.
+        apply_date (dict): The requested dates in 'YYYY-MM-DD' format mapped to their shifts.
 
     Returns:
-        bool: True if there is an existing request for the given date, False otherwise.
+        str: The first overlapping date, or False if there is none.
     """
     for date, shift in apply_date.items():
-        for request in employee_requests:
-            if request['request_date'] == date and request["request_status"] in ["Pending Approval", "Approved", "Pending Withdrawal"]:
-                if request["request_shift"] == "Full" or shift == "Full":
-                    return date
-            if request['request_date'] == date and request["request_shift"] == shift and request["request_status"] in ["Pending Approval", "Approved", "Pending Withdrawal"]:
-                return date
+        if taken_shifts.get(date, 0) & shift_mask(shift):
+            return date
     return False
 
+
 def check_date_valid(request_start_date, request_end_date):
     """
     Checks if the request start date is within 2 months before the current date 
@@ -66,4 +85,49 @@ def check_date_valid(request_start_date, request_end_date):
     if (two_months_before <= request_start_date <= three_months_after) and (two_months_before <= request_end_date <= three_months_after):
         return True
     else:
-        return False
\ No newline at end of file
+        return False
+
+
+def apply_reason_error(apply_reason):
+    """
+    Checks the reason given for a new request.
+
+    Returns:
+        str: The error to show the staff member, or None if the reason is valid.
+    """
+    if not isinstance(apply_reason, str):
+        return "Please provide a reason for your request."
+    if string_length_valid(input_string=apply_reason, max_length=100) == False:
+        return "Your request reason is too long. Please keep it under 100 characters."
+    return None
+
+
+def new_request_error(request_dates, apply_reason):
+    """
+    Checks a new request against the rules of /request/create.
+
+    Parameters:
+        request_dates (dict): The requested dates in 'YYYY-MM-DD' format mapped to their shifts.
+        apply_reason (str): The reason for the request.
+
+    Returns:
+        str: The error to show the staff member, or None if the request is valid.
+    """
+    if not isinstance(request_dates, dict) or not request_dates:
+        return "Please select at least one date."
+    reason_error = apply_reason_error(apply_reason)
+    if reason_error:
+        return reason_error
+    if any(
+        not isinstance(shift, str) or string_length_valid(input_string=shift, max_length=5) == False
+        for shift in request_dates.values()
+    ):
+        return "One or more of your requested shifts is too long. Please keep it under 5 characters."
+    try:
+        for date in request_dates:
+            datetime.strptime(date, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return "One or more of your requested dates is not a valid date."
+    if check_date_valid(min(request_dates), max(request_dates)) == False:
+        return "Your selected range of dates are not within 2 months before and 3 months after the current date."
+    return None
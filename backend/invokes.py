@@ -1,10 +1,176 @@
 import requests
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from json import loads
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from werkzeug.exceptions import HTTPException
+from config import Config
 
 SUPPORTED_HTTP_METHODS = set([
     "GET", "OPTIONS", "HEAD", "POST", "PUT", "PATCH", "DELETE"
 ])
 
-# Wrapper for making HTTP requests using 'requests' module
+# Shared session: keeps connections to each service alive and reuses them across calls.
+# Only idempotent GETs are retried, with jittered exponential backoff.
+session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=Config.HTTP_POOL_CONNECTIONS,
+    pool_maxsize=Config.HTTP_POOL_MAXSIZE,
+    max_retries=Retry(
+        total=Config.HTTP_GET_RETRIES,
+        allowed_methods=frozenset(["GET"]),
+        status_forcelist=[502, 503, 504],
+        backoff_factor=Config.HTTP_RETRY_BACKOFF,
+        backoff_jitter=Config.HTTP_RETRY_BACKOFF,
+        raise_on_status=False,
+    ),
+)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
+DEFAULT_TIMEOUT = (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+# Call counters and latency per target, e.g. "PUT http://localhost:5001/request/update_reason"
+_stats_lock = threading.Lock()
+_target_stats = {}
+
+# Flask apps served by this process, as (scheme, host, port, mount path, app) tuples
+_local_services = []
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _origin_of(parts):
+    """(scheme, host, port) of a split url, with the default port of the scheme filled in."""
+    return parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS.get(parts.scheme)
+
+
+def register_local_service(service_app, base_url):
+    """Register a Flask app that runs in this process so invoke_http can call it directly.
+        service_app: the Flask app of the service;
+        base_url: where callers reach the app, e.g. "http://localhost:5001"; a path in it is
+            where the app is mounted, if its own routes do not carry it.
+    """
+    parts = urlsplit(base_url)
+    _local_services.append((*_origin_of(parts), parts.path.rstrip("/"), service_app))
+
+
+def clear_local_services():
+    """Forget all registered services, so every call goes over HTTP again."""
+    _local_services.clear()
+
+
+def is_local_service(url, method="GET"):
+    """Whether invoke_http would serve this call in-process, without HTTP."""
+    return _resolve_local_service(url, method) is not None
+
+
+def _resolve_local_service(url, method):
+    """Find the registered app that would serve this url: its scheme, host and port must be
+    those of the app's base url, and its path must be under the base url's path.
+        return: (service_app, base_url, path, query), or None if the service is remote.
+    """
+    parts = urlsplit(url)
+    origin = _origin_of(parts)
+    for scheme, host, port, mount_path, service_app in _local_services:
+        if (scheme, host, port) != origin:
+            continue
+        if parts.path != mount_path and not parts.path.startswith(mount_path + "/"):
+            continue
+        path = parts.path[len(mount_path):] or "/"
+        try:
+            service_app.url_map.bind(parts.netloc).match(path, method=method)
+        except HTTPException:
+            continue
+        base_url = f"{parts.scheme}://{parts.netloc}{mount_path}"
+        return service_app, base_url, path, parts.query
+    return None
+
+
+def _invoke_local_service(local_service, method, json):
+    """Call a registered service without leaving the process. The request goes through the
+    app, as one over HTTP would, so its before_request and after_request hooks and error
+    handlers run.
+        return: the Flask response of the app.
+    """
+    service_app, base_url, path, query = local_service
+    return service_app.test_client().open(
+        path, base_url=base_url, method=method, json=json, query_string=query
+    )
+
+
+def _target_of(url, method):
+    """Name the target of a call, with numeric ids in the path collapsed so they share counters."""
+    parts = urlsplit(url)
+    path = re.sub(r"/\d+(?=/|$)", "/<id>", parts.path)
+    return f"{method} {parts.scheme}://{parts.netloc}{path}"
+
+
+def _record_call(url, method, mode, elapsed_ms, failed):
+    target = _target_of(url, method)
+    with _stats_lock:
+        stats = _target_stats.setdefault(
+            target,
+            {"mode": mode, "calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0},
+        )
+        stats["mode"] = mode
+        stats["calls"] += 1
+        stats["errors"] += int(failed)
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+
+def get_invoke_stats():
+    """Report call latency per target and how often pooled HTTP connections were reused.
+
+    Returns:
+        {
+            "targets": {
+                "GET http://localhost:5000/employee/get_details/<id>": {
+                    "mode": "http", "calls": 12, "errors": 0, "avg_ms": 3.1, "max_ms": 9.8
+                },
+                ...
+            },
+            "pools": {
+                "http://localhost:5000": {"requests": 12, "connections_opened": 1, "connections_reused": 11},
+                ...
+            }
+        }
+    """
+    with _stats_lock:
+        targets = {
+            target: {
+                "mode": stats["mode"],
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+            }
+            for target, stats in _target_stats.items()
+        }
+
+    pools = {}
+    for key in list(_adapter.poolmanager.pools.keys()):
+        pool = _adapter.poolmanager.pools.get(key)
+        if pool is None:
+            continue
+        pools[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+            "requests": pool.num_requests,
+            "connections_opened": pool.num_connections,
+            "connections_reused": pool.num_requests - pool.num_connections,
+        }
+    return {"targets": targets, "pools": pools}
+
+
+def reset_invoke_stats():
+    with _stats_lock:
+        _target_stats.clear()
+
+
+# Wrapper for making HTTP requests using the shared 'requests' session
 def invoke_http(url, method='GET', json=None, **kwargs):
     """A simple wrapper for requests methods.
         url: the url of the http service;
@@ -12,28 +178,87 @@ def invoke_http(url, method='GET', json=None, **kwargs):
         data: the JSON input when needed by the http method;
         return: the JSON reply content from the http service if the call succeeds;
             otherwise, return a JSON object with a "code" name-value pair.
+        Services registered with register_local_service are called in-process instead of over HTTP.
+        Remote calls use the pooled session and time out after Config.HTTP_CONNECT_TIMEOUT and
+        Config.HTTP_READ_TIMEOUT seconds unless a timeout is passed in kwargs.
     """
     code = 200
     result = {}
+    mode = "http"
+    start = time.perf_counter()
 
     try:
         if method.upper() in SUPPORTED_HTTP_METHODS:
-            r = requests.request(method, url, json = json, **kwargs)
+            local_service = _resolve_local_service(url, method.upper())
+            if local_service:
+                mode = "local"
+                r = _invoke_local_service(local_service, method.upper(), json)
+                status_code, content = r.status_code, r.get_data()
+            else:
+                kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+                r = session.request(method, url, json = json, **kwargs)
+                status_code, content = r.status_code, r.content
         else:
             raise Exception("HTTP method {} unsupported.".format(method))
     except Exception as e:
         code = 500
         result = {"code": code, "message": "invocation of service fails: " + url + ". " + str(e)}
     if code not in range(200,300):
+        _record_call(url, method.upper(), mode, (time.perf_counter() - start) * 1000, True)
         return result
 
     ## Check http call result
-    if r.status_code != requests.codes.ok:
-        code = r.status_code
+    if status_code != requests.codes.ok:
+        code = status_code
     try:
-        result = r.json() if len(r.content)>0 else ""
+        result = loads(content) if len(content)>0 else ""
     except Exception as e:
         code = 500
         result = {"code": code, "message": "Invalid JSON output from service: " + url + ". " + str(e)}
 
-    return result
\ No newline at end of file
+    _record_call(
+        url, method.upper(), mode, (time.perf_counter() - start) * 1000, code not in range(200, 300)
+    )
+    return result
+
+
+def invoke_many(calls, max_concurrency=None, deadline=None):
+    """Run independent invoke_http calls at the same time on a thread pool.
+        calls: a list of invoke_http keyword arguments, e.g.
+            [{"url": request_URL + "/update_reason", "method": "PUT", "json": data}, ...];
+        max_concurrency: the most calls in flight at once, Config.INVOKE_MANY_CONCURRENCY by default;
+        deadline: seconds all the calls share to finish, Config.INVOKE_MANY_DEADLINE by default;
+        return: the result of each call, in the same order as calls. A call that has not finished
+            by the deadline gets a JSON object with "code" 504.
+    """
+    if not calls:
+        return []
+    max_concurrency = max_concurrency or Config.INVOKE_MANY_CONCURRENCY
+    deadline = Config.INVOKE_MANY_DEADLINE if deadline is None else deadline
+    expires_at = time.monotonic() + deadline
+
+    def run(call):
+        remaining = max(expires_at - time.monotonic(), 0.001)
+        call = dict(call)
+        call.setdefault("timeout", (min(Config.HTTP_CONNECT_TIMEOUT, remaining), remaining))
+        return invoke_http(**call)
+
+    executor = ThreadPoolExecutor(max_workers=min(max_concurrency, len(calls)))
+    try:
+        futures = [executor.submit(run, call) for call in calls]
+        wait(futures, timeout=deadline)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for call, future in zip(calls, futures):
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+        else:
+            results.append(
+                {
+                    "code": 504,
+                    "message": f"invocation of service timed out after {deadline}s: {call['url']}.",
+                }
+            )
+    return results
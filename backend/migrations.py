@@ -0,0 +1,117 @@
+"""
+Schema migrations applied at startup, recorded in the schema_version table.
+
+Each migration runs once per database, in version order. They are written to be idempotent so
+that a database created from SQL/Data.sql, or two services starting at the same time, end up
+in the same state. Works on MySQL, PostgreSQL and SQLite.
+
+To apply the migrations without starting the app:
+
+python migrations.py
+"""
+
+from flask import Flask
+from sqlalchemy import insert, inspect, select
+from sqlalchemy.exc import SQLAlchemyError
+from database import (
+    db,
+    DailyWfhCount,
+    DataVersion,
+    Employee,
+    Request,
+    RequestDates,
+    SchemaVersion,
+)
+from data_version import TRACKED_TABLES
+from wfh_aggregate import rebuild_wfh_aggregate
+
+
+def _index_exists(inspector, index):
+    """Whether the table already has an index starting with the same columns, under any name.
+    MySQL creates one for every foreign key, so matching by name alone would duplicate them."""
+    columns = [column.name.lower() for column in index.columns]
+    for existing in inspector.get_indexes(index.table.name):
+        existing_columns = [(name or "").lower() for name in existing["column_names"]]
+        if existing["name"] == index.name or existing_columns[: len(columns)] == columns:
+            return True
+    return False
+
+
+def create_model_indexes(connection):
+    """Create the secondary indexes declared in database.py that the database does not have yet."""
+    for model in (Employee, Request, RequestDates):
+        for index in model.__table__.indexes:
+            if not _index_exists(inspect(connection), index):
+                index.create(connection)
+
+
+def create_wfh_aggregate(connection):
+    """Create daily_wfh_count and fill it from the approved request dates."""
+    DailyWfhCount.__table__.create(connection, checkfirst=True)
+    rebuild_wfh_aggregate(connection)
+
+
+def create_data_versions(connection):
+    """Create data_version with a counter for every tracked table, so writers only update it.
+    Counters that already exist are kept: going back to an earlier version would make old ETags
+    match again."""
+    DataVersion.__table__.create(connection, checkfirst=True)
+    existing = set(connection.scalars(select(DataVersion.table_name)))
+    missing = sorted(TRACKED_TABLES - existing)
+    if missing:
+        connection.execute(
+            insert(DataVersion), [{"table_name": table, "version": 0} for table in missing]
+        )
+
+
+# (version, description, function taking a connection), in the order they are applied
+MIGRATIONS = [
+    (1, "Add indexes for hot query columns", create_model_indexes),
+    (2, "Add daily WFH aggregate table", create_wfh_aggregate),
+    (3, "Add data version counters", create_data_versions),
+]
+
+
+def current_version():
+    """The latest applied schema version, or 0 if none has been applied."""
+    return db.session.query(db.func.max(SchemaVersion.version)).scalar() or 0
+
+
+def apply_migrations(app):
+    """
+    Apply every migration newer than the recorded schema version.
+
+    Returns:
+        list: The versions applied by this call, e.g. [1]. Empty if the schema is up to date or
+        its tables have not been created yet.
+    """
+    applied = []
+    with app.app_context():
+        tables = inspect(db.engine).get_table_names()
+        if not {model.__table__.name for model in (Employee, Request, RequestDates)} <= set(tables):
+            # Nothing to migrate until the tables exist; db.create_all() adds the indexes itself
+            return applied
+        SchemaVersion.__table__.create(db.engine, checkfirst=True)
+
+        for version, description, migrate in MIGRATIONS:
+            if version <= current_version():
+                continue
+            try:
+                with db.engine.begin() as connection:
+                    migrate(connection)
+                db.session.add(SchemaVersion(version, description))
+                db.session.commit()
+                applied.append(version)
+            except SQLAlchemyError:
+                # Another process may have applied the same migration at the same time
+                db.session.rollback()
+                if version > current_version():
+                    raise
+    return applied
+
+
+if __name__ == "__main__":
+    app = Flask(__name__)
+    app.config.from_object("config.Config")
+    db.init_app(app)
+    print(f"Applied schema versions: {apply_migrations(app) or 'none, already up to date'}")
@@ -0,0 +1,140 @@
+"""
+In-memory index of the reporting structure, built from Employee.reporting_manager.
+
+Staff are laid out in the order of a depth-first walk of the org chart, so everyone under
+a manager sits in one contiguous slice of that order. "All reports under X" is then a slice,
+O(size of X's team), instead of a rescan of every employee at every level.
+
+The index is built from the employee directory snapshot (employee_directory.py), and rebuilt
+whenever that snapshot is reloaded, so both follow the same employee data version: changes
+committed in this process, bulk update(Employee) statements and writes made by other processes
+alike.
+"""
+
+import itertools
+import threading
+from employee_directory import get_employee_directory
+
+
+class OrgHierarchy:
+    def __init__(self, employees):
+        """
+        Parameters:
+            employees (iterable): (staff_id, reporting_manager, staff_name, dept, position) rows
+        """
+        # Set by get_org_hierarchy to tell its builds apart
+        self.version = None
+        self.details = {}
+        self.manager_of = {}
+        self.children = {}
+        for staff_id, reporting_manager, staff_name, dept, position in employees:
+            self.details[staff_id] = {
+                "staff_name": staff_name,
+                "dept": dept,
+                "position": position,
+            }
+            self.manager_of[staff_id] = reporting_manager
+            # Staff who report to themselves (the CEO) are roots, not their own children
+            if reporting_manager is not None and reporting_manager != staff_id:
+                self.children.setdefault(reporting_manager, []).append(staff_id)
+        for reports in self.children.values():
+            reports.sort()
+
+        # Euler tour: order[start[s] + 1 : end[s]] are all the staff under s
+        self.order = []
+        self.start = {}
+        self.end = {}
+        roots = [
+            staff_id
+            for staff_id, manager in self.manager_of.items()
+            if manager is None or manager == staff_id or manager not in self.manager_of
+        ]
+        # Staff caught in a reporting cycle are not under any root, so walk them last
+        for root in sorted(roots) + sorted(self.manager_of):
+            if root not in self.start:
+                self._walk(root)
+
+    def _walk(self, root):
+        stack = [(root, False)]
+        while stack:
+            staff_id, finished = stack.pop()
+            if finished:
+                self.end[staff_id] = len(self.order)
+                continue
+            if staff_id in self.start:
+                continue
+            self.start[staff_id] = len(self.order)
+            self.order.append(staff_id)
+            stack.append((staff_id, True))
+            for report in reversed(self.children.get(staff_id, [])):
+                if report not in self.start:
+                    stack.append((report, False))
+
+    def direct_reports(self, staff_id):
+        return list(self.children.get(staff_id, []))
+
+    def reports_under(self, staff_id):
+        """All staff_ids directly or indirectly reporting to staff_id, excluding staff_id itself."""
+        if staff_id not in self.start:
+            return []
+        return self.order[self.start[staff_id] + 1 : self.end[staff_id]]
+
+    def is_under(self, staff_id, manager_id):
+        """Whether staff_id reports to manager_id, directly or indirectly, in O(1)."""
+        if staff_id not in self.start or manager_id not in self.start:
+            return False
+        return self.start[manager_id] < self.start[staff_id] < self.end[manager_id]
+
+    def team_members(self, staff_id):
+        """
+        Everyone under staff_id, with their details.
+
+        Returns:
+            {
+                140015: {"staff_name": "Oliver Tan", "dept": "Sales", "position": "Account Manager"},
+                ...
+            }
+        """
+        members = {}
+        # A self-reporting staff member counts as part of their own team
+        if self.manager_of.get(staff_id) == staff_id:
+            members[staff_id] = self.details[staff_id]
+        for member_id in self.reports_under(staff_id):
+            members[member_id] = self.details[member_id]
+        return members
+
+
+_lock = threading.Lock()
+_builds = itertools.count()
+_hierarchy = None
+# The directory snapshot _hierarchy was built from
+_built_from = None
+
+
+def get_org_hierarchy():
+    """Return the index of the current employee directory snapshot, building it first if the
+    snapshot has been reloaded since. Must be called inside a Flask app context."""
+    global _hierarchy, _built_from
+    directory = get_employee_directory()
+    if _hierarchy is not None and _built_from is directory:
+        return _hierarchy
+    with _lock:
+        if _hierarchy is None or _built_from is not directory:
+            hierarchy = OrgHierarchy(
+                (
+                    employee["staff_id"],
+                    employee["reporting_manager"],
+                    f"{employee['staff_fname']} {employee['staff_lname']}",
+                    employee["dept"],
+                    employee["position"],
+                )
+                for employee in directory.by_id.values()
+            )
+            hierarchy.version = (directory.version, next(_builds))
+            _hierarchy, _built_from = hierarchy, directory
+        return _hierarchy
+
+
+def peek_org_hierarchy():
+    """Return the last index built, however stale, or None; never queries the database."""
+    return _hierarchy
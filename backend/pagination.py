@@ -0,0 +1,68 @@
+"""
+Query string arguments shared by the request listings: the status and date filters on request
+dates, and keyset pagination by request_id.
+
+A page is the requests after the cursor, in request_id order, with all their dates, so a
+request is never split across pages. When there are more requests, the listing sets the
+X-Next-Cursor response header; the client passes it back as ?cursor= to get the next page and
+should not read anything into its value. Finding a page costs the same however far into the
+listing it is, because it starts from an index lookup on request_id instead of skipping rows.
+"""
+
+from datetime import date
+from config import Config
+from database import RequestDates
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def page_args(args):
+    """
+    Read status, date_from, date_to, limit and cursor from a request's query string.
+
+    Returns:
+        (date_filters, limit, cursor): date_filters is a list of conditions on RequestDates,
+        empty when no filter is given. limit and cursor are None when not given.
+
+    Raises:
+        ValueError: The message to show when an argument is invalid
+    """
+    statuses = args.getlist("status")
+    date_from = args.get("date_from")
+    date_to = args.get("date_to")
+    try:
+        limit = int(args["limit"]) if "limit" in args else None
+        cursor = int(args["cursor"]) if "cursor" in args else None
+    except ValueError:
+        raise ValueError("limit and cursor must be whole numbers.")
+    try:
+        date_from = date.fromisoformat(date_from) if date_from else None
+        date_to = date.fromisoformat(date_to) if date_to else None
+    except ValueError:
+        raise ValueError("date_from and date_to must be in YYYY-MM-DD format.")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1.")
+    if limit is not None and limit > Config.PAGE_LIMIT_MAX:
+        raise ValueError(f"limit must be at most {Config.PAGE_LIMIT_MAX}.")
+
+    date_filters = []
+    if statuses:
+        date_filters.append(RequestDates.request_status.in_(statuses))
+    if date_from:
+        date_filters.append(RequestDates.request_date >= date_from)
+    if date_to:
+        date_filters.append(RequestDates.request_date <= date_to)
+    return date_filters, limit, cursor
+
+
+def split_page(rows, limit, request_id=lambda row: row.request_id):
+    """
+    Cut rows fetched with limit + 1 down to the page.
+
+    Returns:
+        (rows, next_cursor): next_cursor is None on the last page
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, request_id(rows[-1])
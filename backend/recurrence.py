@@ -0,0 +1,67 @@
+"""
+Recurring WFH requests.
+
+A recurrence rule asks for the same shift on some weekdays from one date to another:
+
+    {"weekdays": [0, 2], "shift": "AM", "start": "2024-10-01", "until": "2024-12-31"}
+
+Weekdays are numbered from Monday (0) to Sunday (6), as date.weekday(). /request/create
+expands the rule into request dates on the server with NumPy date arithmetic, so clients send
+these few fields instead of one entry per date.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+import input_validation
+
+
+def recurrence_error(rule):
+    """
+    Checks a recurrence rule.
+
+    Returns:
+        str: The error to show the staff member, or None if the rule is valid.
+    """
+    if not isinstance(rule, dict):
+        return "Please provide the weekdays, shift, start and until of your recurring request."
+    weekdays = rule.get("weekdays")
+    if (
+        not isinstance(weekdays, list)
+        or not weekdays
+        or any(type(weekday) is not int or not 0 <= weekday <= 6 for weekday in weekdays)
+    ):
+        return "Please select the days of the week, from 0 (Monday) to 6 (Sunday)."
+    if rule.get("shift") not in input_validation.SHIFT_MASKS:
+        return "Please select a shift of AM, PM or Full."
+    try:
+        start = datetime.strptime(rule.get("start"), "%Y-%m-%d").date()
+        until = datetime.strptime(rule.get("until"), "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return "Please provide the start and until dates in YYYY-MM-DD format."
+    if until < start:
+        return "The end date of your recurring request is before its start date."
+    if input_validation.check_date_valid(rule["start"], rule["until"]) == False:
+        return "Your selected range of dates are not within 2 months before and 3 months after the current date."
+    if len(expand_recurrence(rule)) == 0:
+        return "None of your selected days of the week fall between the start and end dates."
+    return None
+
+
+def expand_recurrence(rule):
+    """The dates a valid rule covers, as a sorted datetime64[D] array."""
+    days = np.arange(np.datetime64(rule["start"], "D"), np.datetime64(rule["until"], "D") + 1)
+    # Day 0 of datetime64, 1970-01-01, was a Thursday (weekday 3)
+    weekdays = (days.astype(np.int64) + 3) % 7
+    return days[np.isin(weekdays, rule["weekdays"])]
+
+
+def recurrence_dates(rule):
+    """
+    The request dates a valid rule covers, in the request_dates format of /request/create.
+
+    Returns:
+        {"2024-10-02": "AM", "2024-10-07": "AM", ...}
+    """
+    return dict.fromkeys(expand_recurrence(rule).astype(str).tolist(), rule["shift"])
@@ -1,8 +1,12 @@
 from flask import Flask, request, jsonify
-from invokes import invoke_http
+from invokes import invoke_many, is_local_service
+from status_log_writer import log_status_event
 from flask_cors import CORS
 from os import environ
-from database import db
+from sqlalchemy import insert
+from database import db, Request, RequestDates, StatusLog
+from request_date_status import change_request_dates_status, request_has_dates
+import data_version  # Raises the data versions of the tables this service writes
 
 app = Flask(__name__)
 app.config.from_object("config.Config")
@@ -14,7 +18,6 @@ request_URL = environ.get("REQUEST_URL") or "http://localhost:5001/request"
 request_dates_URL = (
     environ.get("REQUEST_DATES_URL") or "http://localhost:5002/request_dates"
 )
-status_log_URL = environ.get("STATUS_LOG_URL") or "http://localhost:5003/status_log"
 
 
 @app.route("/")
@@ -22,6 +25,67 @@ def hello():
     return "This is reject_requests.py"
 
 
+def reject_in_process(request_id, reason):
+    """
+    Reject a request with one transaction: set its reject_reason, reject its dates that are not
+    withdrawn or pending withdrawal, and log the rejection. Does what /request/update_reason and
+    /request_dates/change_all_status do together, for when both run in this process, and
+    answers as they would. Nothing is changed unless both succeed.
+
+    Returns:
+        (update_reason_response, change_status_response): the bodies /request/update_reason
+        and /request_dates/change_all_status would have returned; change_status_response is
+        None if update_reason_response is not a 200
+    """
+    try:
+        request_record = db.session.get(Request, request_id, with_for_update=True)
+        if request_record is None:
+            db.session.rollback()
+            return {"code": 404, "message": f"No request found for request ID {request_id}."}, None
+        request_record.reject_reason = reason
+        update_reason_response = {
+            "code": 200,
+            "message": "Reason has been updated.",
+            "data": request_record.json(),
+        }
+
+        # The same dates as change_all_status changes
+        rejected = change_request_dates_status(
+            [
+                RequestDates.request_id == request_id,
+                RequestDates.request_status.not_in(["Withdrawn", "Pending Withdrawal"]),
+            ],
+            "Rejected",
+        )
+        if not rejected and not request_has_dates(RequestDates.request_id == request_id):
+            db.session.rollback()
+            return update_reason_response, {
+                "code": 404,
+                "message": f"No request dates found for request ID {request_id}.",
+            }
+        change_status_response = {
+            "code": 200,
+            "message": f"Request status for request ID {request_id} updated to Rejected.",
+            "data": rejected,
+        }
+
+        db.session.execute(
+            insert(StatusLog),
+            [
+                {
+                    "request_id": request_id,
+                    "action": "Request has been rejected by the manager/director",
+                    "reason": reason,
+                }
+            ],
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return update_reason_response, change_status_response
+
+
 # Rejects request
 @app.route("/reject_request", methods=["PUT"])
 def reject_request():
@@ -34,16 +98,15 @@ def reject_request():
             "reason": "Insufficient justification for the leave"
         }
 
-    Success response:
+    Success response, with the responses of /request/update_reason and
+    /request_dates/change_all_status, whether they are called over HTTP or, when both run in
+    this process, done in one transaction:
         {
             "code": 200,
-            "message": "Request created successfully.",
+            "message": "Request rejection reason and status updated successfully.",
             "data": {
-                "request_id": 1,
-                "staff_id": 1,
-                "creation_date": "2023-10-01",
-                "request_dates": ["2023-10-01", "2023-10-02"],
-                "apply_reason": "Reason for request"
+                "update_reason_response": {...},
+                "change_status_response": {...}
             }
         }
     """
@@ -58,12 +121,28 @@ def reject_request():
                 400,
             )
 
-        data = {"request_id": request_id, "reason": reason, "status": "Rejected"}
-
-        # Invoke the API to update the reason for rejection
-        update_reason_response = invoke_http(
-            request_URL + "/update_reason", json=data, method="PUT"
-        )
+        # When the request and request_dates services run in this process, as with run.py,
+        # reject in one transaction instead of calling them
+        in_process = is_local_service(
+            request_URL + "/update_reason", "PUT"
+        ) and is_local_service(request_dates_URL + "/change_all_status", "PUT")
+        if in_process:
+            update_reason_response, change_status_response = reject_in_process(request_id, reason)
+        else:
+            data = {"request_id": request_id, "reason": reason, "status": "Rejected"}
+
+            # Update the reason for rejection and the status of all records with the same
+            # request_id at the same time, as neither call depends on the other
+            update_reason_response, change_status_response = invoke_many(
+                [
+                    {"url": request_URL + "/update_reason", "method": "PUT", "json": data},
+                    {
+                        "url": request_dates_URL + "/change_all_status",
+                        "method": "PUT",
+                        "json": data,
+                    },
+                ]
+            )
 
         if update_reason_response.get("code") != 200:
             return jsonify(
@@ -75,11 +154,6 @@ def reject_request():
                 }
             ), update_reason_response.get("code", 500)
 
-        # Invoke the API to change the status of all records with the same request_id
-        change_status_response = invoke_http(
-            request_dates_URL + "/change_all_status", json=data, method="PUT"
-        )
-
         if change_status_response.get("code") != 200:
             return jsonify(
                 {
@@ -91,13 +165,14 @@ def reject_request():
                 }
             ), change_status_response.get("code", 500)
 
-        log_data = {
-            "request_id": request_id,
-            "action": "Request has been rejected by the manager/director",
-            "reason": reason,
-        }
+        if not in_process:
+            log_data = {
+                "request_id": request_id,
+                "action": "Request has been rejected by the manager/director",
+                "reason": reason,
+            }
 
-        invoke_http(status_log_URL + "/add_event", json=log_data, method="POST")
+            log_status_event(**log_data)
 
         # If both requests are successful
         return (
@@ -1,26 +1,17 @@
 from flask import Flask, request, jsonify
-import input_validation
-from os import environ
-import requests
 from database import db, Request
 from flask_cors import CORS
-from invokes import invoke_http
-from datetime import datetime
+from request_creation import create_requests
+from pagination import NEXT_CURSOR_HEADER, page_args, split_page
+import data_version  # Raises the data versions of the tables this service writes
 
 
 app = Flask(__name__)
 app.config.from_object("config.Config")
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=[NEXT_CURSOR_HEADER])
 db.init_app(app)
 
 
-request_URL = environ.get("REQUEST_URL") or "http://localhost:5001/request"
-request_dates_URL = (
-    environ.get("REQUEST_DATES_URL") or "http://localhost:5002/request_dates"
-)
-status_log_URL = environ.get("STATUS_LOG_URL") or "http://localhost:5003/status_log"
-
-
 @app.route("/request/")
 def hello():
     return "This is request.py"
@@ -40,6 +31,14 @@ def create_request():
                 "2024-09-24": "PM",
                 "2024-09-25": "Full",
             }
+        recurrence (dict): Instead of request_dates, the same shift on some weekdays from start
+            to until, with weekdays from 0 (Monday) to 6 (Sunday); see recurrence.py
+            {
+                "weekdays": [0, 2],
+                "shift": "AM",
+                "start": "2024-10-01",
+                "until": "2024-12-31"
+            }
         apply_reason (str): The reason for the request
 
     Success response:
@@ -50,176 +49,116 @@ def create_request():
                 "request_id": 1,
                 "staff_id": 1,
                 "creation_date": "2023-10-01",
-                "request_dates": ["2023-10-01", "2023-10-02"],
-                "apply_reason": "Reason for request"
+                "request_dates": {"2023-10-01": "PM", "2023-10-02": "Full"},
+                "apply_reason": "Reason for request",
+                "reject_reason": null
             }
         }
     """
     try:
-        data = request.get_json()
-        staff_id = data.get("staff_id")
-        request_dates = data.get("request_dates")
-        apply_reason = data.get("apply_reason")
-
-        # Check if length of apply_reason is at most 100 characters
-        if (
-            input_validation.string_length_valid(
-                input_string=apply_reason, max_length=100
-            )
-            == False
-        ):
-            return (
-                jsonify(
-                    {
-                        "code": 400,
-                        "error": "Your request reason is too long. Please keep it under 100 characters.",
-                    }
-                ),
-                400,
-            )
+        result = create_requests([request.get_json()])[0]
+        if result["code"] != 200:
+            return jsonify(result), result["code"]
 
-        # Check if length of all requested_shifts are at most 5 characters
-        requested_shifts_concat_str = "".join(request_dates.values())
-        number_of_requested_shifts = len(request_dates)
-        if (
-            input_validation.string_length_valid(
-                input_string=requested_shifts_concat_str,
-                max_length=(number_of_requested_shifts * 5),
-            )
-            == False
-        ):
-            return (
-                jsonify(
-                    {
-                        "code": 400,
-                        "error": "One or more of your requested shifts is too long. Please keep it under 5 characters.",
-                    }
-                ),
-                400,
-            )
+        return (
+            jsonify(
+                {
+                    "code": 200,
+                    "message": "Request created successfully.",
+                    "data": result["data"],
+                }
+            ),
+            200,
+        )
 
-        # Check if dates that staff requested for are within 2 months before and 3 months after current date
-        earliest_requested_date = min(request_dates.keys())
-        latest_requested_date = max(request_dates.keys())
+    except Exception as e:
+        return (
+            jsonify(
+                {
+                    "code": 500,
+                    "error": f"An error occurred while creating the request. Details: {str(e)}",
+                }
+            ),
+            500,
+        )
 
-        if (
-            input_validation.check_date_valid(
-                earliest_requested_date, latest_requested_date
-            )
-            == False
-        ):
-            return (
-                jsonify(
-                    {
-                        "code": 400,
-                        "error": "Your selected range of dates are not within 2 months before and 3 months after the current date.",
-                    }
-                ),
-                400,
-            )
 
-        try:
-            response = requests.get(
-                f"{request_URL}/get_requests_by_staff_id/{staff_id}"
-            )
-            if response.status_code == 200:
-                employee_requests = response.json()["data"]
-            else:
-                employee_requests = []
-        except Exception as e:
-            return (
-                jsonify(
-                    {
-                        "code": 500,
-                        "error": f"An error occurred while getting employee requests for staff_id {staff_id}: {e}",
-                    }
-                ),
-                500,
-            )
+# Create many requests at once
+@app.route("/request/create_bulk", methods=["POST"])
+def create_bulk_requests():
+    """
+    Create many requests in one transaction, e.g. for HR setting up arrangements for a team
+    ---
+    Parameters (in JSON body):
+        requests (list): Entries in the /request/create format
+            [
+                {
+                    "staff_id": 140894,
+                    "request_dates": {"2024-09-24": "PM", "2024-09-25": "Full"},
+                    "apply_reason": "Reason for request"
+                }
+            ]
 
-        existing_request_ids = [
-            request_details["request_id"] for request_details in employee_requests
-        ]
+    Each entry is created or refused on its own. An entry is refused if it fails the
+    /request/create checks, or if one of its shifts overlaps an active request of the staff
+    member or an earlier entry in the list.
 
-        # get all dates that staff has requested for from request_ids
-        try:
-            payload = {"request_ids": existing_request_ids}
-            response = requests.post(
-                f"{request_dates_URL}/get_by_request_ids", json=payload
-            )
-            if response.status_code == 200:
-                requested_dates = response.json()["data"]
-            else:
-                requested_dates = []
-        except Exception as e:
-            return (
-                jsonify(
-                    {
-                        "code": 500,
-                        "error": f"An error occurred while getting employee requests for staff_id {staff_id}: {e}",
+    Success response:
+        {
+            "code": 200,
+            "created": 1,
+            "failed": 1,
+            "data": [
+                {
+                    "index": 0,
+                    "code": 200,
+                    "data": {
+                        "request_id": 1,
+                        "staff_id": 140894,
+                        "creation_date": "2024-09-20",
+                        "apply_reason": "Reason for request",
+                        "reject_reason": null,
+                        "request_dates": {"2024-09-24": "PM", "2024-09-25": "Full"}
                     }
-                ),
-                500,
+                },
+                {
+                    "index": 1,
+                    "code": 400,
+                    "error": "You have a duplicate request on 2024-09-24. Please check."
+                }
+            ]
+        }
+    """
+    try:
+        entries = (request.get_json(silent=True) or {}).get("requests")
+        if not isinstance(entries, list) or not entries:
+            return (
+                jsonify({"code": 400, "error": "Please provide a list of requests."}),
+                400,
             )
-
-        check_date = input_validation.has_existing_request(
-            requested_dates, request_dates
-        )
-
-        if check_date != False:
+        if len(entries) > app.config["BULK_CREATE_MAX_ENTRIES"]:
             return (
                 jsonify(
                     {
                         "code": 400,
-                        "error": f"You have a duplicate request on {check_date}. Please check.",
+                        "error": f"Please send at most {app.config['BULK_CREATE_MAX_ENTRIES']} requests at a time.",
                     }
                 ),
                 400,
             )
 
-        # Create and commit the new request to get the request_id
-        new_request = Request(
-            staff_id=staff_id,
-            creation_date=datetime.now().strftime("%Y-%m-%d"),
-            apply_reason=apply_reason,
-        )
-        db.session.add(new_request)
-        db.session.commit()
-
-        try:
-            add_request_dates = requests.post(
-                f"{request_dates_URL}/create",
-                json={
-                    "request_id": new_request.request_id,
-                    "request_dates": request_dates,
-                    "staff_id": staff_id,
-                },
-            )
-
-            if add_request_dates.status_code != 200:
-                raise Exception("Failed to add request dates.")
-
-        except Exception as e:
-            # Compensating transaction: delete the previously committed request
-            db.session.delete(new_request)
-            db.session.commit()
-            raise e
-
-        # Log the action
-        log_data = {
-            "request_id": new_request.request_id,
-            "action": "Request has been created by staff",
-            "reason": apply_reason,
-        }
-
-        invoke_http(status_log_URL + "/add_event", json=log_data, method="POST")
+        results = [
+            {"index": index, **result} for index, result in enumerate(create_requests(entries))
+        ]
+        created = sum(result["code"] == 200 for result in results)
 
         return (
             jsonify(
                 {
                     "code": 200,
-                    "message": "Request created successfully.",
-                    "data": new_request.json(),
+                    "created": created,
+                    "failed": len(results) - created,
+                    "data": results,
                 }
             ),
             200,
@@ -230,7 +169,7 @@ def create_request():
             jsonify(
                 {
                     "code": 500,
-                    "error": f"An error occurred while creating the request. Details: {str(e)}",
+                    "error": f"An error occurred while creating the requests. Details: {str(e)}",
                 }
             ),
             500,
@@ -241,8 +180,16 @@ def create_request():
 @app.route("/request/get_all_requests", methods=["GET"])
 def get_all_requests():
     """
-    Get all WFH requests
+    Get all WFH requests, in request_id order
     ---
+    Optional query parameters:
+        status (str, repeatable): Only include requests with a date of this status
+        date_from (str): Only include requests with a date on or after this date, in YYYY-MM-DD format
+        date_to (str): Only include requests with a date on or before this date, in YYYY-MM-DD format
+        limit (int): The most requests to return. When there are more, the X-Next-Cursor
+            response header holds the cursor for the next page
+        cursor (int): Return the requests after this cursor, taken from X-Next-Cursor
+
     Success response:
         {
             "code": 200,
@@ -259,8 +206,21 @@ def get_all_requests():
         }
     """
     try:
-        # Retrieve all requests from the database
-        requests = Request.query.all()
+        try:
+            date_filters, limit, cursor = page_args(request.args)
+        except ValueError as e:
+            return jsonify({"code": 400, "error": str(e)}), 400
+
+        # Retrieve the requests from the database
+        query = Request.query
+        if date_filters:
+            query = query.filter(Request.request_dates.any(*date_filters))
+        if cursor is not None:
+            query = query.filter(Request.request_id > cursor)
+        query = query.order_by(Request.request_id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        requests, next_cursor = split_page(query.all(), limit)
 
         if requests:
             # Format the response
@@ -275,7 +235,10 @@ def get_all_requests():
                 for request in requests
             ]
 
-            return jsonify({"code": 200, "data": request_list})
+            response = jsonify({"code": 200, "data": request_list})
+            if next_cursor is not None:
+                response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+            return response
         else:
             return jsonify({"code": 404, "error": "No requests found."}), 404
 
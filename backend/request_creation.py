@@ -0,0 +1,215 @@
+"""
+Creating WFH requests.
+
+create_requests checks new requests and writes their Request rows, their RequestDates and their
+StatusLog events in one database transaction. A request is never visible without its dates,
+and a failure leaves nothing behind. /request/create and /request/create_bulk are thin
+wrappers around it.
+"""
+
+from datetime import date, datetime
+from sqlalchemy import insert, select
+import input_validation
+import recurrence
+from database import db, Employee, Request, RequestDates, StatusLog
+from wfh_aggregate import record_status_changes
+
+# As in /request_dates/create, the CEO's requests need no approval
+AUTO_APPROVED_STAFF_ID = 130002
+
+
+def get_taken_shifts(staff_id, request_dates):
+    """
+    The shifts that staff_id's active request dates already hold on the requested dates, found
+    with one indexed query whatever the size of their request history.
+
+    Parameters:
+        staff_id (int): The staff_id
+        request_dates (iterable): Dates in YYYY-MM-DD format
+
+    Returns:
+        {"2024-09-24": 1, "2024-09-25": 3}, each the combined input_validation.shift_mask of
+        the shifts held on that date
+    """
+    return get_taken_shifts_by_staff([staff_id], request_dates).get(staff_id, {})
+
+
+def get_taken_shifts_by_staff(staff_ids, request_dates):
+    """
+    get_taken_shifts for many staff at once, with one query.
+
+    Returns:
+        {140894: {"2024-09-24": 1}, 140895: {"2024-09-25": 3}}
+    """
+    taken_shifts = {}
+    for staff_id, request_date, request_shift in db.session.execute(
+        select(Request.staff_id, RequestDates.request_date, RequestDates.request_shift)
+        .join(Request, Request.request_id == RequestDates.request_id)
+        .where(
+            Request.staff_id.in_(set(staff_ids)),
+            RequestDates.request_date.in_(
+                {datetime.strptime(day, "%Y-%m-%d").date() for day in request_dates}
+            ),
+            RequestDates.request_status.in_(input_validation.ACTIVE_STATUSES),
+        )
+    ):
+        staff_shifts = taken_shifts.setdefault(staff_id, {})
+        day = request_date.isoformat()
+        staff_shifts[day] = staff_shifts.get(day, 0) | input_validation.shift_mask(request_shift)
+    return taken_shifts
+
+
+def entry_error(entry):
+    """
+    Checks one new request, in the /request/create body format.
+
+    Returns:
+        str: The error to show the staff member, or None if the request is valid.
+    """
+    if not isinstance(entry.get("staff_id"), int):
+        return "Please provide a staff_id."
+    rule = entry.get("recurrence")
+    if rule is not None and entry.get("request_dates"):
+        return "Please send either request_dates or a recurrence, not both."
+    if rule is not None:
+        return recurrence.recurrence_error(rule) or input_validation.apply_reason_error(
+            entry.get("apply_reason")
+        )
+    # Reason length, shift lengths, and dates within 2 months before and 3 months after the
+    # current date
+    return input_validation.new_request_error(entry.get("request_dates"), entry.get("apply_reason"))
+
+
+def create_requests(entries):
+    """
+    Create new requests, each with its dates and a "created" StatusLog event, in one
+    transaction committed before this returns.
+
+    An entry is refused if it is invalid, if its staff member does not exist, or if one of its
+    shifts overlaps an active request of the staff member or an earlier entry. The others are
+    created.
+
+    Parameters:
+        entries (list): Dicts in the /request/create body format: staff_id, apply_reason and
+            either request_dates or recurrence
+
+    Returns:
+        A result per entry, in order:
+        [
+            {
+                "code": 200,
+                "data": {
+                    "request_id": 1,
+                    "staff_id": 140894,
+                    "creation_date": "2024-09-20",
+                    "apply_reason": "Reason for request",
+                    "reject_reason": None,
+                    "request_dates": {"2024-09-24": "PM"}
+                }
+            },
+            {"code": 400, "error": "You have a duplicate request on 2024-09-24. Please check."}
+        ]
+    """
+    results = [None] * len(entries)
+    valid_entries = []
+    for index, entry in enumerate(entries):
+        entry = entry if isinstance(entry, dict) else {}
+        error = entry_error(entry)
+        if error:
+            results[index] = {"code": 400, "error": error}
+            continue
+        rule = entry.get("recurrence")
+        request_dates = (
+            recurrence.recurrence_dates(rule) if rule is not None else entry["request_dates"]
+        )
+        valid_entries.append((index, entry["staff_id"], request_dates, entry["apply_reason"]))
+
+    if not valid_entries:
+        return results
+
+    existing_staff = set(
+        db.session.scalars(
+            select(Employee.staff_id).where(
+                Employee.staff_id.in_({staff_id for _, staff_id, _, _ in valid_entries})
+            )
+        )
+    )
+    taken_shifts = get_taken_shifts_by_staff(
+        existing_staff,
+        {day for _, _, request_dates, _ in valid_entries for day in request_dates},
+    )
+
+    accepted = []
+    for index, staff_id, request_dates, apply_reason in valid_entries:
+        if staff_id not in existing_staff:
+            results[index] = {"code": 404, "error": f"No employee found with staff_id {staff_id}."}
+            continue
+        staff_shifts = taken_shifts.setdefault(staff_id, {})
+        check_date = input_validation.first_conflict(staff_shifts, request_dates)
+        if check_date != False:
+            results[index] = {
+                "code": 400,
+                "error": f"You have a duplicate request on {check_date}. Please check.",
+            }
+            continue
+        # Later entries for the same staff member must not overlap this one either
+        for day, shift in request_dates.items():
+            staff_shifts[day] = staff_shifts.get(day, 0) | input_validation.shift_mask(shift)
+        accepted.append((index, staff_id, request_dates, apply_reason))
+
+    if not accepted:
+        return results
+
+    try:
+        creation_date = datetime.now().date()
+        new_requests = [
+            Request(staff_id=staff_id, creation_date=creation_date, apply_reason=apply_reason)
+            for _, staff_id, _, apply_reason in accepted
+        ]
+        # The ORM batches these inserts where the database returns the new request_ids in
+        # order (PostgreSQL); elsewhere it sends one per request
+        db.session.add_all(new_requests)
+        db.session.flush()
+
+        new_dates = [
+            {
+                "request_id": new_request.request_id,
+                "request_date": date.fromisoformat(day),
+                "request_shift": shift,
+                "request_status": (
+                    "Approved" if staff_id == AUTO_APPROVED_STAFF_ID else "Pending Approval"
+                ),
+            }
+            for new_request, (_, staff_id, request_dates, _) in zip(new_requests, accepted)
+            for day, shift in request_dates.items()
+        ]
+        db.session.execute(insert(RequestDates), new_dates)
+        record_status_changes(
+            (row["request_id"], row["request_date"], row["request_shift"], None, row["request_status"])
+            for row in new_dates
+        )
+        log_date = datetime.now()
+        db.session.execute(
+            insert(StatusLog),
+            [
+                {
+                    "request_id": new_request.request_id,
+                    "action": "Request has been created by staff",
+                    "reason": new_request.apply_reason,
+                    "log_date": log_date,
+                }
+                for new_request in new_requests
+            ],
+        )
+
+        # Before the commit expires the new rows, which would reload them one by one
+        for new_request, (index, _, request_dates, _) in zip(new_requests, accepted):
+            results[index] = {
+                "code": 200,
+                "data": {**new_request.json(), "request_dates": request_dates},
+            }
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return results
@@ -0,0 +1,107 @@
+"""
+Status changes to the request dates matching some conditions, made with set-based
+UPDATE ... RETURNING statements. Used by /request_dates/change_all_status,
+/request_dates/change_partial_status and the in-process path of /reject_request.
+"""
+
+from datetime import date
+from sqlalchemy import select, update
+from database import db, RequestDates
+from wfh_aggregate import record_status_changes
+
+REQUEST_DATE_COLUMNS = [
+    RequestDates.request_date_id,
+    RequestDates.request_id,
+    RequestDates.request_date,
+    RequestDates.request_shift,
+    RequestDates.request_status,
+    RequestDates.withdraw_reason,
+    RequestDates.rescind_reason,
+]
+
+
+def _update_returning(conditions, values):
+    """
+    Apply values to the request dates matching conditions with one UPDATE, and return the
+    changed rows in the RequestDates.json() format. Uses UPDATE ... RETURNING where the
+    database has it (PostgreSQL, SQLite); MySQL does not, so there the rows are locked and read
+    first, and updated by request_date_id.
+    """
+    if db.session.get_bind().dialect.update_returning:
+        rows = db.session.execute(
+            update(RequestDates)
+            .where(*conditions)
+            .values(**values)
+            .returning(*REQUEST_DATE_COLUMNS),
+            execution_options={"synchronize_session": False},
+        ).mappings().all()
+    else:
+        rows = db.session.execute(
+            select(*REQUEST_DATE_COLUMNS).where(*conditions).with_for_update()
+        ).mappings().all()
+        if rows:
+            db.session.execute(
+                update(RequestDates)
+                .where(RequestDates.request_date_id.in_([row["request_date_id"] for row in rows]))
+                .values(**values),
+                execution_options={"synchronize_session": False},
+            )
+        rows = [{**row, **values} for row in rows]
+    return sorted(
+        (
+            {**row, "request_date": row["request_date"].isoformat()}
+            for row in rows
+        ),
+        key=lambda row: row["request_date_id"],
+    )
+
+
+def request_has_dates(*conditions):
+    """Whether any request date matches the conditions."""
+    return db.session.execute(select(RequestDates.request_date_id).where(*conditions).limit(1)).first() is not None
+
+
+def change_request_dates_status(conditions, new_status, values=None):
+    """
+    Set request_status, and any other values, on the request dates matching conditions, and
+    update daily_wfh_count to match. The caller commits.
+
+    Dates already approved are left alone when new_status is Approved, so that takes one
+    UPDATE. Otherwise the dates that were approved are updated by a second UPDATE, because
+    RETURNING only gives the new status and daily_wfh_count has to know which dates stop
+    counting as WFH.
+
+    Returns:
+        The changed request dates, in the RequestDates.json() format
+    """
+    values = {"request_status": new_status, **(values or {})}
+    if new_status == "Approved":
+        changed = _update_returning(
+            [*conditions, RequestDates.request_status != "Approved"], values
+        )
+        # None: not approved before
+        old_statuses = [None] * len(changed)
+    else:
+        # In this order, so that the second UPDATE does not see the dates the first one changed
+        was_not_approved = _update_returning(
+            [*conditions, RequestDates.request_status != "Approved"], values
+        )
+        was_approved = _update_returning(
+            [*conditions, RequestDates.request_status == "Approved"], values
+        )
+        changed = sorted(was_approved + was_not_approved, key=lambda row: row["request_date_id"])
+        approved_ids = {row["request_date_id"] for row in was_approved}
+        old_statuses = [
+            "Approved" if row["request_date_id"] in approved_ids else None for row in changed
+        ]
+    record_status_changes(
+        (
+            row["request_id"],
+            date.fromisoformat(row["request_date"]),
+            row["request_shift"],
+            old_status,
+            new_status,
+        )
+        for row, old_status in zip(changed, old_statuses)
+    )
+    return changed
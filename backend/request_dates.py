@@ -1,8 +1,13 @@
 from flask import Flask, request, jsonify
-from database import db, Request, RequestDates
+from database import db, Request, RequestDates, StatusLog
 from flask_cors import CORS
-from invokes import invoke_http
-from os import environ
+from sqlalchemy import insert, select, update
+from status_log_writer import log_status_event
+from wfh_aggregate import record_status_changes
+from status_transitions import apply_transitions
+from request_date_status import change_request_dates_status, request_has_dates
+import data_version  # Raises the data versions of the tables this service writes
+from datetime import date
 
 app = Flask(__name__)
 app.config.from_object("config.Config")
@@ -10,10 +15,6 @@ db.init_app(app)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 
-request_URL = environ.get("REQUEST_URL") or "http://localhost:5001/request"
-status_log_URL = environ.get("STATUS_LOG_URL") or "http://localhost:5003/status_log"
-
-
 # Create
 @app.route("/request_dates/create", methods=["POST"])
 def create_request_dates():
@@ -68,22 +69,36 @@ def create_request_dates():
 
         # Check if the (foreign key constraint) request_id exists
         try:
-            new_request_dates = []
+            new_rows = [
+                {
+                    "request_id": request_id,
+                    "request_date": date.fromisoformat(request_date),
+                    "request_shift": request_shift,
+                    "request_status": request_status,
+                }
+                for request_date, request_shift in request_dates.items()
+            ]
 
-            # Create new request dates
+            # Create new request dates, with one multi-row insert however many there are
             with db.session.begin_nested():
-                for request_date, request_shift in request_dates.items():
-                    new_request_date = RequestDates(
-                        request_id=request_id,
-                        request_date=request_date,
-                        request_shift=request_shift,
-                        request_status=request_status,
-                    )
-                    db.session.add(new_request_date)
-                    new_request_dates.append(new_request_date)
+                db.session.execute(insert(RequestDates), new_rows)
+                record_status_changes(
+                    (request_id, row["request_date"], row["request_shift"], None, request_status)
+                    for row in new_rows
+                )
 
             db.session.commit()
 
+            # Read them back for their request_date_ids
+            new_request_dates = (
+                RequestDates.query.filter(
+                    RequestDates.request_id == request_id,
+                    RequestDates.request_date.in_([row["request_date"] for row in new_rows]),
+                )
+                .order_by(RequestDates.request_date_id)
+                .all()
+            )
+
             return (
                 jsonify(
                     {
@@ -224,6 +239,9 @@ def change_all_status():
     request_id(int)
     status(varchar(20))
 
+    Dates that are withdrawn or pending withdrawal are left alone. data holds the dates that
+    were changed.
+
     Success Response
     {
         "code": 200,
@@ -259,10 +277,16 @@ def change_all_status():
                 400,
             )
 
-        # Query the request dates by request_id
-        request_dates = RequestDates.query.filter_by(request_id=request_id).all()
-
-        if not request_dates:
+        # Update the request dates that are not withdrawn or pending withdrawal
+        changed = change_request_dates_status(
+            [
+                RequestDates.request_id == request_id,
+                RequestDates.request_status.not_in(["Withdrawn", "Pending Withdrawal"]),
+            ],
+            new_status,
+        )
+        if not changed and not request_has_dates(RequestDates.request_id == request_id):
+            db.session.rollback()
             return (
                 jsonify(
                     {
@@ -273,18 +297,14 @@ def change_all_status():
                 404,
             )
 
-        # Update the Request_Status for each record
-        for request_date in request_dates:
-            if (
-                request_date.request_status != "Withdrawn"
-                and request_date.request_status != "Pending Withdrawal"
-            ):
-                request_date.request_status = new_status
-
-        # Get request by request_id and change reject reason
+        # Change the reject reason of the request
         if new_status == "Rejected":
-            original_request = Request.query.filter_by(request_id=request_id).first()
-            original_request.reject_reason = reason
+            db.session.execute(
+                update(Request)
+                .where(Request.request_id == request_id)
+                .values(reject_reason=reason),
+                execution_options={"synchronize_session": False},
+            )
 
         # Commit the changes to the database
         db.session.commit()
@@ -295,20 +315,21 @@ def change_all_status():
             "reason": reason,
         }
 
-        invoke_http(status_log_URL + "/add_event", json=log_data, method="POST")
+        log_status_event(**log_data)
 
         return (
             jsonify(
                 {
                     "code": 200,
                     "message": f"Request status for request ID {request_id} updated to {new_status}.",
-                    "data": [request_date.json() for request_date in request_dates],
+                    "data": changed,
                 }
             ),
             200,
         )
 
     except Exception as e:
+        db.session.rollback()
         return (
             jsonify(
                 {
@@ -332,6 +353,8 @@ def change_partial_status():
     dates(list)
     shift(varchar(5))
 
+    data holds the dates that were changed.
+
     Success Response
     {
         "code": 200,
@@ -373,14 +396,40 @@ def change_partial_status():
                 400,
             )
 
-        # Query the request dates that match the request_id and are in the provided dates list
-        request_dates = RequestDates.query.filter(
+        try:
+            dates = [date.fromisoformat(day) for day in dates]
+        except (TypeError, ValueError):
+            return (
+                jsonify({"code": 400, "message": "One or more of the dates is not a valid date."}),
+                400,
+            )
+
+        # Check the reason before changing anything
+        if new_status == "Rescinded" and not reason:
+            return (
+                jsonify({"code": 400, "message": "Rescind reason must be provided."}),
+                400,
+            )
+        if (new_status == "Withdrawn" or new_status == "Pending Withdrawal") and not reason:
+            return (
+                jsonify({"code": 400, "message": "Withdraw reason must be provided."}),
+                400,
+            )
+        values = {}
+        if new_status == "Rescinded":
+            values["rescind_reason"] = reason
+        elif new_status == "Withdrawn" or new_status == "Pending Withdrawal":
+            values["withdraw_reason"] = reason
+
+        # Update the request dates that match the request_id, the provided dates and the shift
+        conditions = [
             RequestDates.request_id == request_id,
             RequestDates.request_date.in_(dates),
             RequestDates.request_shift == shift,
-        ).all()
-
-        if not request_dates:
+        ]
+        updated_dates = change_request_dates_status(conditions, new_status, values)
+        if not updated_dates and not request_has_dates(*conditions):
+            db.session.rollback()
             return (
                 jsonify(
                     {
@@ -391,46 +440,16 @@ def change_partial_status():
                 404,
             )
 
-        # Update the Request_Status and Reason for each matching record
-        for request_date in request_dates:
-            request_date.request_status = new_status
-
-            # Update the reason based on the status
-            if new_status == "Rescinded":
-                if not reason:
-                    return (
-                        jsonify(
-                            {"code": 400, "message": "Rescind reason must be provided."}
-                        ),
-                        400,
-                    )
-                request_date.rescind_reason = reason
-            elif new_status == "Withdrawn" or new_status == "Pending Withdrawal":
-                if not reason:
-                    return (
-                        jsonify(
-                            {
-                                "code": 400,
-                                "message": "Withdraw reason must be provided.",
-                            }
-                        ),
-                        400,
-                    )
-                request_date.withdraw_reason = reason
-
         # Commit the changes to the database
         db.session.commit()
 
-        # Format the updated records for the response
-        updated_dates = [request_date.json() for request_date in request_dates]
-
         log_data = {
             "request_id": request_id,
-            "action": dates[0] + " : " + new_status,
+            "action": dates[0].isoformat() + " : " + new_status,
             "reason": reason,
         }
 
-        invoke_http(status_log_URL + "/add_event", json=log_data, method="POST")
+        log_status_event(**log_data)
 
         return (
             jsonify(
@@ -444,6 +463,7 @@ def change_partial_status():
         )
 
     except Exception as e:
+        db.session.rollback()
         return (
             jsonify(
                 {
@@ -455,6 +475,106 @@ def change_partial_status():
         )
 
 
+# Change the status of the dates of many requests at once
+@app.route("/request_dates/bulk_transition", methods=["PUT"])
+def bulk_transition():
+    """
+    Approve, reject, rescind or withdraw the dates of many requests in one transaction
+    ---
+    Parameters (in JSON body):
+        transitions (list): One item per change, with dates (and shift) to change only those
+            dates of the request, as change_partial_status; without them every date of the
+            request that can change, as change_all_status
+            [
+                {"request_id": 1, "status": "Approved"},
+                {"request_id": 2, "status": "Rejected", "reason": "Team is short-staffed"},
+                {
+                    "request_id": 3,
+                    "status": "Rescinded",
+                    "reason": "Client visit",
+                    "dates": ["2024-10-01"],
+                    "shift": "AM"
+                }
+            ]
+
+    Each item is checked against the statuses its dates can move to
+    (input_validation.STATUS_TRANSITIONS) and applied or refused on its own.
+
+    Success response:
+        {
+            "code": 200,
+            "updated": 1,
+            "failed": 1,
+            "data": [
+                {
+                    "index": 0,
+                    "code": 200,
+                    "data": [
+                        {
+                            "request_date_id": 1,
+                            "request_id": 1,
+                            "request_date": "2024-10-01",
+                            "request_shift": "AM",
+                            "request_status": "Approved",
+                            "withdraw_reason": null,
+                            "rescind_reason": null
+                        }
+                    ]
+                },
+                {
+                    "index": 1,
+                    "code": 400,
+                    "error": "Cannot change Withdrawn dates to Rejected."
+                }
+            ]
+        }
+    """
+    try:
+        items = (request.get_json(silent=True) or {}).get("transitions")
+        if not isinstance(items, list) or not items:
+            return (
+                jsonify({"code": 400, "message": "Please provide a list of transitions."}),
+                400,
+            )
+        if len(items) > app.config["BULK_TRANSITION_MAX_ITEMS"]:
+            return (
+                jsonify(
+                    {
+                        "code": 400,
+                        "message": f"Please send at most {app.config['BULK_TRANSITION_MAX_ITEMS']} transitions at a time.",
+                    }
+                ),
+                400,
+            )
+
+        results = [
+            {"index": index, **result} for index, result in enumerate(apply_transitions(items))
+        ]
+        updated = sum(result["code"] == 200 for result in results)
+        return (
+            jsonify(
+                {
+                    "code": 200,
+                    "updated": updated,
+                    "failed": len(results) - updated,
+                    "data": results,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        return (
+            jsonify(
+                {
+                    "code": 500,
+                    "error": f"An error occurred while updating the request statuses: {str(e)}",
+                }
+            ),
+            500,
+        )
+
+
 # get staff's pending and approved pending withdrawal requests
 @app.route("/request_dates/get_staff_request/<int:request_id>")
 def get_staff_request(request_id):
@@ -523,6 +643,16 @@ def get_staff_request(request_id):
 def auto_reject():
     """
     Automatically reject requests if any of their request_dates are more than 2 months old.
+    ---
+    All the dates of each such request are rejected, its reject_reason is set, the WFH aggregate
+    is updated and the rejection is logged, as set-based statements over
+    Config.AUTO_REJECT_CHUNK_SIZE requests at a time, in one transaction. When nothing is stale this is a single indexed query.
+
+    Success response:
+        {
+            "message": "2 unique requests have been updated to Rejected",
+            "requests": [1, 2]
+        }
     """
     from datetime import datetime, timedelta
 
@@ -530,83 +660,91 @@ def auto_reject():
         today = datetime.today()
         two_months_ago = today - timedelta(days=60)
 
-        # Step 1: Query all pending request dates older than 2 months
-        pending_old_requests = RequestDates.query.filter(
-            RequestDates.request_status == "Pending Approval",
-            RequestDates.request_date < two_months_ago.date(),
-        ).all()
-
-        # Collect the unique request IDs to reject
-        request_ids_to_reject = {req.request_id for req in pending_old_requests}
-
-        # Step 2: Query all request_dates with the identified request_ids
-        if request_ids_to_reject:
-            related_requests = RequestDates.query.filter(
-                RequestDates.request_id.in_(request_ids_to_reject)
-            ).all()
-
-            updated_requests = []
-
-            # Step 3: Batch update all related requests to "Rejected"
-            for req in related_requests:
-                req.request_status = "Rejected"
-                updated_requests.append(req)
-
-            # Batch commit all the changes to the database
-            db.session.commit()
-
-            # Step 4: Update the reason in the original request table for each request
-            for request_id in request_ids_to_reject:
-                data = {
-                    "request_id": request_id,
-                    "reason": "1 or more date(s) have been auto-rejected by the system",
-                    "status": "Rejected",
-                }
-                update_reason_response = invoke_http(
-                    request_URL + "/update_reason", json=data, method="PUT"
+        # Step 1: Find the requests with a pending date older than 2 months (uses
+        # ix_request_dates_status_date). The ids are selected first because MySQL cannot
+        # update request_dates with a subquery on request_dates itself.
+        request_ids_to_reject = [
+            request_id
+            for (request_id,) in db.session.execute(
+                select(RequestDates.request_id)
+                .where(
+                    RequestDates.request_status == "Pending Approval",
+                    RequestDates.request_date < two_months_ago.date(),
                 )
+                .distinct()
+                .order_by(RequestDates.request_id)
+            )
+        ]
 
-                if update_reason_response.get("code") != 200:
-                    return jsonify(
-                        {
-                            "code": update_reason_response.get("code", 500),
-                            "message": update_reason_response.get(
-                                "message", "Failed to update reason for request."
-                            ),
-                        }
-                    ), update_reason_response.get("code", 500)
-
-                # Log the rejection event for the request
-                log_data = {
-                    "request_id": request_id,
-                    "action": "The entire request has been auto-rejected by the system",
-                    "reason": "Auto rejected due to one or more dates being older than 2 months",
-                }
-                invoke_http(status_log_URL + "/add_event", json=log_data, method="POST")
+        # If no requests need to be updated
+        if not request_ids_to_reject:
+            return (
+                jsonify(
+                    {
+                        "message": "No requests were found to be auto-rejected.",
+                        "updated_requests": [],
+                    }
+                ),
+                200,
+            )
 
-            # Step 5: Return response with unique request IDs of rejected requests
-            response = jsonify(
-                {
-                    "message": f"{len(request_ids_to_reject)} unique requests have been updated to Rejected",
-                    "requests": list(
-                        request_ids_to_reject
-                    ),  # Return unique request IDs
-                }
+        # Steps 2-4: Reject every date of those requests, update the reason on the requests
+        # and log the rejections, a chunk of requests at a time
+        chunk_size = app.config["AUTO_REJECT_CHUNK_SIZE"]
+        for i in range(0, len(request_ids_to_reject), chunk_size):
+            chunk = request_ids_to_reject[i : i + chunk_size]
+            # Approved dates in these requests stop counting as WFH
+            record_status_changes(
+                (request_id, request_date, request_shift, "Approved", "Rejected")
+                for request_id, request_date, request_shift in db.session.execute(
+                    select(
+                        RequestDates.request_id,
+                        RequestDates.request_date,
+                        RequestDates.request_shift,
+                    ).where(
+                        RequestDates.request_id.in_(chunk),
+                        RequestDates.request_status == "Approved",
+                    )
+                )
+            )
+            db.session.execute(
+                update(RequestDates)
+                .where(RequestDates.request_id.in_(chunk))
+                .values(request_status="Rejected"),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.execute(
+                update(Request)
+                .where(Request.request_id.in_(chunk))
+                .values(
+                    reject_reason="1 or more date(s) have been auto-rejected by the system"
+                ),
+                execution_options={"synchronize_session": False},
             )
-            return response, 200
+            db.session.execute(
+                insert(StatusLog),
+                [
+                    {
+                        "request_id": request_id,
+                        "action": "The entire request has been auto-rejected by the system",
+                        "reason": "Auto rejected due to one or more dates being older than 2 months",
+                    }
+                    for request_id in chunk
+                ],
+            )
+        db.session.commit()
 
-        # If no requests need to be updated
-        return (
-            jsonify(
-                {
-                    "message": "No requests were found to be auto-rejected.",
-                    "updated_requests": [],
-                }
-            ),
-            200,
+        # Step 5: Return response with unique request IDs of rejected requests
+        response = jsonify(
+            {
+                "message": f"{len(request_ids_to_reject)} unique requests have been updated to Rejected",
+                "requests": request_ids_to_reject,  # Return unique request IDs
+            }
         )
+        return response, 200
 
     except Exception as e:
+        db.session.rollback()
         error_response = jsonify(
             {
                 "message": "An error occurred while auto-rejecting requests",
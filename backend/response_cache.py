@@ -0,0 +1,253 @@
+"""
+In-process cache of view_schedule responses.
+
+Entries are keyed by (endpoint, view arguments, window), where the window is today's date plus
+the query string, and hold the response body. The cache holds at most
+Config.RESPONSE_CACHE_SIZE entries, evicting the least recently used, and an entry expires
+Config.RESPONSE_CACHE_TTL seconds after it was stored.
+
+Each entry has a scope: the staff_id whose team it covers, or None if it covers the whole
+organisation. When an approved WFH date is added or removed (wfh_aggregate.record_status_changes),
+only the entries on the staff member's hierarchy path are dropped once the change is
+committed: their own, their manager's, and so on up to the top, plus the organisation-wide
+entries, and only those whose window includes the date. Employee changes need no invalidation,
+because the org hierarchy version is part of every key.
+
+The data versions of employee, request and request_dates (data_version.py) are part of every
+key too, so a write made by another process, or committed but not yet invalidated here, is never
+answered with a response cached before it. Invalidation frees those entries early; the ones it
+does not see age out of the LRU.
+
+Any object with the get, put, invalidate and stats methods of ResponseCache can be used
+instead, with set_response_cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from flask import make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from config import Config
+from data_version import data_etag
+from org_hierarchy import get_org_hierarchy, peek_org_hierarchy
+
+# The tables every cached view reads
+CACHED_TABLES = ("employee", "request", "request_dates")
+
+
+class ResponseCache:
+    def __init__(self, max_entries=None, ttl=None):
+        """
+        Parameters:
+            max_entries (int): Entries kept before the least recently used is evicted,
+                Config.RESPONSE_CACHE_SIZE by default
+            ttl (float): Seconds an entry is served for, Config.RESPONSE_CACHE_TTL by default
+        """
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_SIZE
+        self.ttl = Config.RESPONSE_CACHE_TTL if ttl is None else ttl
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        # key: (expires at, scope, (first date, last date) or None, value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Raised by every invalidation, so that a response computed before one is not stored
+        self.generation = 0
+
+    def get(self, key):
+        """The value stored under key, or None if there is none or it has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.counts["expirations"] += 1
+                entry = None
+            if entry is None:
+                self.counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counts["hits"] += 1
+            return entry[3]
+
+    def put(self, key, value, scope=None, window=None, generation=None):
+        """
+        Store value under key.
+
+        Parameters:
+            scope (int): The staff_id whose team the value covers, None for the whole organisation
+            window (tuple): The first and last dates the value covers, None for any date
+            generation (int): self.generation when the value started being computed; if there has
+                been an invalidation since, the value may be stale and is not stored
+        """
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, scope, window, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counts["evictions"] += 1
+
+    def invalidate(self, scopes=None, dates=None):
+        """
+        Drop the entries covering any of scopes, and the organisation-wide ones, whose window
+        includes any of dates. scopes=None drops every scope and dates=None every window.
+        """
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key
+                for key, (_, scope, window, _) in self._entries.items()
+                if (scopes is None or scope is None or scope in scopes)
+                and (
+                    dates is None
+                    or window is None
+                    or any(window[0] <= changed <= window[1] for changed in dates)
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.counts["invalidations"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            {"entries": 12, "max_entries": 1024, "ttl": 60.0, "hits": 40, "misses": 12,
+             "hit_rate": 0.7692, "evictions": 0, "expirations": 2, "invalidations": 3}
+        """
+        with self._lock:
+            lookups = self.counts["hits"] + self.counts["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                **self.counts,
+                "hit_rate": round(self.counts["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide cache, created on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def set_response_cache(cache):
+    """Replace the process-wide cache, e.g. with one backed by a shared store."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def note_schedule_changes(session, changes):
+    """
+    Remember (staff_id, reporting_manager, date) of approved WFH added or removed in the session's
+    transaction, to invalidate the cached responses covering them once it is committed.
+    """
+    session.info.setdefault("schedule_changes", []).extend(changes)
+
+
+def hierarchy_path(hierarchy, staff_id, reporting_manager):
+    """staff_id, their manager, their manager's manager and so on up to the top."""
+    path = [staff_id]
+    manager = reporting_manager
+    while manager is not None and manager not in path:
+        path.append(manager)
+        manager = hierarchy.manager_of.get(manager) if hierarchy is not None else None
+    return path
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_schedule_commit(session):
+    changes = session.info.pop("schedule_changes", None)
+    if not changes:
+        return
+    # The index built for the views is enough to walk the path; it cannot be rebuilt here
+    # because the session cannot run queries after a commit
+    hierarchy = peek_org_hierarchy()
+    scopes = set()
+    for staff_id, reporting_manager, _ in changes:
+        scopes.update(hierarchy_path(hierarchy, staff_id, reporting_manager))
+    if hierarchy is None:
+        scopes = None
+    get_response_cache().invalidate(scopes, {changed for _, _, changed in changes})
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_schedule_changes(session):
+    session.info.pop("schedule_changes", None)
+
+
+def request_window():
+    """The dates a request covers, from its start and end query parameters, or None if it
+    has neither."""
+    start = request.args.get("start")
+    end = request.args.get("end")
+    if not start and not end:
+        return None
+    return (
+        date.fromisoformat(start) if start else date.min,
+        date.fromisoformat(end) if end else date.max,
+    )
+
+
+def cached_response(scope_arg=None):
+    """
+    Decorate a GET view to serve its 200 responses from the response cache. Every view argument
+    is part of the key, so responses for different staff are never shared.
+
+    Parameters:
+        scope_arg (str): The view argument holding the staff_id whose team the response covers;
+            None if it covers the whole organisation, or staff anywhere in it
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.RESPONSE_CACHE_ENABLED:
+                return view(*args, **kwargs)
+            try:
+                window = request_window()
+            except ValueError:
+                # Let the view report the invalid dates
+                return view(*args, **kwargs)
+            scope = kwargs.get(scope_arg) if scope_arg else None
+            cache = get_response_cache()
+            key = (
+                view.__name__,
+                args,
+                tuple(sorted(kwargs.items())),
+                (date.today(), request.query_string),
+                get_org_hierarchy().version,
+                data_etag(CACHED_TABLES),
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                return make_response(body, 200, {"Content-Type": mimetype})
+
+            generation = cache.generation
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                cache.put(
+                    key, (response.get_data(), response.content_type), scope, window, generation
+                )
+            return response
+
+        return wrapper
+
+    return decorator
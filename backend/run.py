@@ -1,6 +1,7 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
 import os
 
 # Create a new Flask app to serve as the main entry point
@@ -29,7 +30,7 @@ app.config.from_object("config.Config")
 db = SQLAlchemy(app)
 # db.init_app(app)
 
-# Import your Flask apps
+# Import the Flask apps of each service
 from employee import app as employee_app
 from request import app as request_app
 from request_dates import app as request_dates_app
@@ -37,16 +38,61 @@ from view_requests import app as view_requests_app
 from reject_requests import app as reject_requests_app
 from status_log import app as status_log_app
 from view_schedule import app as view_schedule_app
+from view_requests import employee_URL, request_URL, request_dates_URL
+from invokes import register_local_service, get_invoke_stats
+from migrations import apply_migrations
 
+# Every service app already carries its own path prefix in its routes, except
+# reject_requests, which is mounted under /reject_requests
+services = {
+    "/employee": employee_app,
+    "/request": request_app,
+    "/request_dates": request_dates_app,
+    "/view_requests": view_requests_app,
+    "/status_log": status_log_app,
+    "/view_schedule": view_schedule_app,
+}
+app.wsgi_app = DispatcherMiddleware(
+    app.wsgi_app, {"/reject_requests": reject_requests_app}
+)
+index_wsgi_app = app.wsgi_app
+
+
+def dispatch_to_service(environ, start_response):
+    """Send each request to the service app that owns the first segment of its path."""
+    prefix = "/" + environ.get("PATH_INFO", "").lstrip("/").split("/", 1)[0]
+    service_app = services.get(prefix)
+    if service_app is None:
+        return index_wsgi_app(environ, start_response)
+    return service_app(environ, start_response)
+
+
+app.wsgi_app = dispatch_to_service
 
-# Register blueprints or routes from your individual apps
-app.register_blueprint(employee_app, url_prefix="/employee")
-app.register_blueprint(request_app, url_prefix="/request")
-app.register_blueprint(request_dates_app, url_prefix="/request_dates")
-app.register_blueprint(view_requests_app, url_prefix="/view_requests")
-app.register_blueprint(reject_requests_app, url_prefix="/reject_requests")
-app.register_blueprint(status_log_app, url_prefix="/status_log")
-app.register_blueprint(view_schedule_app, url_prefix="/view_schedule")
+port = int(os.environ.get("PORT", 5000))
+
+# Services in this process call each other directly instead of over loopback HTTP, both
+# when they are called at this process's address and at the URLs their callers are
+# configured with for the separate services
+if app.config["LOCAL_SERVICE_DISPATCH"]:
+    own_url = f"http://localhost:{port}"
+    for prefix, service_url in [
+        ("/employee", employee_URL),
+        ("/request", request_URL),
+        ("/request_dates", request_dates_URL),
+    ]:
+        if service_url.rstrip("/").endswith(prefix):
+            register_local_service(services[prefix], service_url.rstrip("/")[: -len(prefix)])
+    for service_app in services.values():
+        register_local_service(service_app, own_url)
+    register_local_service(reject_requests_app, own_url + "/reject_requests")
+
+# Bring the schema up to date before serving; the service apps share database.db
+if app.config["APPLY_MIGRATIONS"]:
+    try:
+        apply_migrations(employee_app)
+    except Exception as e:
+        print("Error: schema migrations could not be applied:", str(e))
 
 
 @app.route("/")
@@ -54,5 +100,22 @@ def index():
     return "Welcome to the WFH Scheduling API"
 
 
+@app.route("/invoke_stats")
+def invoke_stats():
+    """
+    Latency per service target and connection reuse of the shared HTTP client
+    ---
+    Success response:
+        {
+            "code": 200,
+            "data": {
+                "targets": {"PUT http://localhost:5001/request/update_reason": {...}},
+                "pools": {"http://localhost:5001": {...}}
+            }
+        }
+    """
+    return jsonify({"code": 200, "data": get_invoke_stats()}), 200
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
+    app.run(host="0.0.0.0", port=port)
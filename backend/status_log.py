@@ -7,6 +7,7 @@ from datetime import datetime
 app = Flask(__name__)
 app.config.from_object("config.Config")
 CORS(app, resources={r"/*": {"origins": "*"}})
+db.init_app(app)
 
 
 # Add event to the log
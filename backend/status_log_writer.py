@@ -0,0 +1,174 @@
+"""
+Write-behind buffer for StatusLog events.
+
+Services log status changes with log_status_event, which only appends the event to an
+in-process queue. A background thread writes the queued events with one bulk insert once
+Config.STATUS_LOG_BATCH_SIZE events are waiting or the oldest has waited
+Config.STATUS_LOG_MAX_AGE seconds, and whatever is left is written when the process exits.
+
+Callers that need the event on disk before they respond pass sync=True. Setting
+STATUS_LOG_WRITE_BEHIND=false makes every call synchronous. Remote callers keep using
+/status_log/add_event.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from config import Config
+from database import db, StatusLog
+
+logger = logging.getLogger(__name__)
+
+
+class StatusLogWriter:
+    def __init__(self, app, batch_size=None, max_age=None):
+        """
+        Parameters:
+            app (Flask): The app whose database the events are written to
+            batch_size (int): Queued events that trigger a flush, Config.STATUS_LOG_BATCH_SIZE by default
+            max_age (float): Seconds an event may wait before a flush, Config.STATUS_LOG_MAX_AGE by default
+        """
+        self.app = app
+        self.batch_size = batch_size or Config.STATUS_LOG_BATCH_SIZE
+        self.max_age = Config.STATUS_LOG_MAX_AGE if max_age is None else max_age
+        self.stats = {"logged": 0, "flushed": 0, "flushes": 0, "dropped": 0}
+        # (time queued, row) pairs, oldest first
+        self._events = deque()
+        self._lock = threading.Lock()
+        # Held for a whole flush so that batches are written in the order they were logged
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+
+    def log(self, request_id, action, reason=None, sync=False):
+        """Queue an event. With sync=True, it and everything queued before it are written
+        before this returns."""
+        row = {
+            "request_id": request_id,
+            "action": action,
+            "reason": reason,
+            "log_date": datetime.now(),
+        }
+        with self._lock:
+            self._events.append((time.monotonic(), row))
+            self.stats["logged"] += 1
+            queued = len(self._events)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(
+                    target=self._run, name="status-log-writer", daemon=True
+                )
+                self._thread.start()
+
+        if sync or self._closed:
+            self.flush()
+        elif queued == 1 or queued >= self.batch_size:
+            # Let the writer thread work out when the new oldest event is due, or flush now
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._events)
+
+    def flush(self):
+        """Write every queued event with one bulk insert; returns the number written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._events)
+                self._events.clear()
+            if not batch:
+                return 0
+            rows = [row for _, row in batch]
+            try:
+                self._insert(rows)
+            except (IntegrityError, DataError):
+                # A bad event must not block the rest, so find it by writing them one by one
+                self._insert_individually(rows)
+            except Exception:
+                # Put the batch back in front of anything queued since, to retry later
+                with self._lock:
+                    self._events.extendleft(reversed(batch))
+                raise
+            with self._lock:
+                self.stats["flushed"] += len(rows)
+                self.stats["flushes"] += 1
+            return len(rows)
+
+    def close(self):
+        """Stop the writer thread and write whatever is still queued."""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=max(self.max_age, 1) * 5)
+        self.flush()
+
+    def _insert(self, rows):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(insert(StatusLog), rows)
+
+    def _insert_individually(self, rows):
+        for row in rows:
+            try:
+                self._insert([row])
+            except (IntegrityError, DataError) as e:
+                logger.error("Dropped status log event %s: %s", row, e)
+                with self._lock:
+                    self.stats["dropped"] += 1
+
+    def _due(self):
+        with self._lock:
+            if not self._events:
+                return False, None
+            wait_for = self._events[0][0] + self.max_age - time.monotonic()
+            return len(self._events) >= self.batch_size or wait_for <= 0, max(wait_for, 0)
+
+    def _run(self):
+        while not self._closed:
+            due, wait_for = self._due()
+            if not due:
+                self._wake.wait(wait_for)
+                self._wake.clear()
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write status log events, retrying later")
+                self._wake.wait(max(self.max_age, 1))
+                self._wake.clear()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_status_log_writer():
+    """Return the process-wide writer, bound to the current Flask app on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = StatusLogWriter(current_app._get_current_object())
+                atexit.register(_writer.close)
+    return _writer
+
+
+def log_status_event(request_id, action, reason=None, sync=False):
+    """
+    Record a status change event for a request. Must be called inside a Flask app context.
+
+    Parameters:
+        request_id (int): The request the event belongs to
+        action (str): What happened, e.g. "Request has been rejected by the manager/director"
+        reason (str): The reason given for it, if any
+        sync (bool): Write the event before returning instead of in the background
+    """
+    get_status_log_writer().log(
+        request_id, action, reason, sync=sync or not Config.STATUS_LOG_WRITE_BEHIND
+    )
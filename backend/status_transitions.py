@@ -0,0 +1,216 @@
+"""
+Status changes for many request dates at once, behind /request_dates/bulk_transition.
+
+Every item is checked against input_validation.STATUS_TRANSITIONS in memory, after one query
+that reads the current dates of all the requests involved. The accepted changes are then
+written in one transaction: one UPDATE per target status, one UPDATE for the reject reasons
+and one insert for all the StatusLog rows, however many items there are.
+"""
+
+from datetime import date
+from sqlalchemy import case, insert, select, update
+import input_validation
+from database import db, Request, RequestDates, StatusLog
+from wfh_aggregate import record_status_changes
+
+# The column of request_dates that keeps the reason for moving a date to each status
+REASON_COLUMNS = {
+    "Rescinded": "rescind_reason",
+    "Withdrawn": "withdraw_reason",
+    "Pending Withdrawal": "withdraw_reason",
+}
+# Dates that an item without dates leaves alone, as change_all_status does
+WHOLE_REQUEST_SKIPPED = {"Withdrawn", "Pending Withdrawal"}
+# Statuses that cannot be set without a reason
+REASON_REQUIRED = {"Rejected", "Rescinded", "Withdrawn", "Pending Withdrawal"}
+TARGET_STATUSES = set().union(*input_validation.STATUS_TRANSITIONS.values())
+
+
+def transition_error(item):
+    """
+    Checks one item of /request_dates/bulk_transition.
+
+    Returns:
+        str: The error to show, or None if the item is valid.
+    """
+    if not isinstance(item.get("request_id"), int):
+        return "Please provide a request_id."
+    status = item.get("status")
+    if status not in TARGET_STATUSES:
+        return f"Request dates cannot be changed to {status}."
+    reason = item.get("reason")
+    if status in REASON_REQUIRED and not reason:
+        return f"A reason must be provided to change request dates to {status}."
+    if reason is not None and (
+        not isinstance(reason, str)
+        or input_validation.string_length_valid(input_string=reason, max_length=100) == False
+    ):
+        return "The reason is too long. Please keep it under 100 characters."
+    dates = item.get("dates")
+    if dates is not None:
+        if not isinstance(dates, list) or not dates:
+            return "Please provide a list of dates, or no dates to change the whole request."
+        try:
+            for day in dates:
+                date.fromisoformat(day)
+        except (TypeError, ValueError):
+            return "One or more of the dates is not a valid date."
+    return None
+
+
+def _matches(row, item):
+    if item.get("dates") is not None and row["request_date"] not in item["dates"]:
+        return False
+    return item.get("shift") is None or row["request_shift"] == item["shift"]
+
+
+def apply_transitions(items):
+    """
+    Change the status of request dates for each item, in one transaction committed before this
+    returns.
+
+    An item without dates changes every date of the request that can move to the new status,
+    and leaves the others alone; like change_all_status, it never touches withdrawn dates or
+    dates pending withdrawal. An item with dates (and optionally a shift) changes exactly
+    those dates, and is refused if one of them cannot move to the new status. Later items see
+    the changes made by earlier ones. A refused item changes nothing.
+
+    Parameters:
+        items (list): Dicts of request_id, status, reason, and optionally dates
+            (YYYY-MM-DD strings) and shift
+
+    Returns:
+        A result per item, in order:
+        [
+            {"code": 200, "data": [{"request_date_id": 1, ..., "request_status": "Approved"}]},
+            {"code": 400, "error": "Cannot change Rejected dates to Approved."}
+        ]
+    """
+    results = [None] * len(items)
+    valid_items = []
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        error = transition_error(item)
+        if error:
+            results[index] = {"code": 400, "error": error}
+        else:
+            valid_items.append((index, item))
+    if not valid_items:
+        return results
+
+    try:
+        # Every date of every request involved, locked until the commit
+        rows_by_request = {}
+        for row in db.session.execute(
+            select(
+                RequestDates.request_date_id,
+                RequestDates.request_id,
+                RequestDates.request_date,
+                RequestDates.request_shift,
+                RequestDates.request_status,
+                RequestDates.withdraw_reason,
+                RequestDates.rescind_reason,
+            )
+            .where(RequestDates.request_id.in_({item["request_id"] for _, item in valid_items}))
+            .order_by(RequestDates.request_date_id)
+            .with_for_update()
+        ).mappings():
+            row = dict(row)
+            row["request_date"] = row["request_date"].isoformat()
+            rows_by_request.setdefault(row["request_id"], []).append(row)
+
+        # request_date_id: (row before the first change, new status, reason)
+        changes = {}
+        reject_reasons = {}
+        log_rows = []
+        for index, item in valid_items:
+            request_id, new_status = item["request_id"], item["status"]
+            rows = [row for row in rows_by_request.get(request_id, []) if _matches(row, item)]
+            if not rows:
+                results[index] = {
+                    "code": 404,
+                    "error": f"No request dates found for request ID {request_id}.",
+                }
+                continue
+            movable = [
+                row
+                for row in rows
+                if new_status in input_validation.STATUS_TRANSITIONS.get(row["request_status"], ())
+                and (item.get("dates") is not None or row["request_status"] not in WHOLE_REQUEST_SKIPPED)
+            ]
+            movable_ids = {row["request_date_id"] for row in movable}
+            stuck = [row for row in rows if row["request_date_id"] not in movable_ids]
+            if not movable or (item.get("dates") is not None and stuck):
+                results[index] = {
+                    "code": 400,
+                    "error": f"Cannot change {(stuck or rows)[0]['request_status']} dates to {new_status}.",
+                }
+                continue
+
+            reason = item.get("reason")
+            for row in movable:
+                # Keep the row as it was before the first change, for the WFH aggregate
+                old_row = changes.get(row["request_date_id"], (dict(row),))[0]
+                changes[row["request_date_id"]] = (old_row, new_status, reason)
+                row["request_status"] = new_status
+                if new_status in REASON_COLUMNS:
+                    row[REASON_COLUMNS[new_status]] = reason
+            if new_status == "Rejected":
+                reject_reasons[request_id] = reason
+            log_rows.append(
+                {
+                    "request_id": request_id,
+                    "action": (
+                        f"{item['dates'][0]} : {new_status}"
+                        if item.get("dates") is not None
+                        else "Request has been " + new_status.lower()
+                    ),
+                    "reason": reason,
+                }
+            )
+            results[index] = {"code": 200, "data": [dict(row) for row in movable]}
+
+        if not changes:
+            db.session.rollback()
+            return results
+
+        record_status_changes(
+            (
+                old_row["request_id"],
+                date.fromisoformat(old_row["request_date"]),
+                old_row["request_shift"],
+                old_row["request_status"],
+                new_status,
+            )
+            for old_row, new_status, _ in changes.values()
+        )
+
+        # One UPDATE per new status, with the reasons of its dates picked by request_date_id
+        by_status = {}
+        for request_date_id, (_, new_status, reason) in changes.items():
+            by_status.setdefault(new_status, {})[request_date_id] = reason
+        for new_status, reasons in by_status.items():
+            values = {"request_status": new_status}
+            if new_status in REASON_COLUMNS:
+                values[REASON_COLUMNS[new_status]] = case(
+                    reasons, value=RequestDates.request_date_id
+                )
+            db.session.execute(
+                update(RequestDates)
+                .where(RequestDates.request_date_id.in_(list(reasons)))
+                .values(**values),
+                execution_options={"synchronize_session": False},
+            )
+        if reject_reasons:
+            db.session.execute(
+                update(Request)
+                .where(Request.request_id.in_(list(reject_reasons)))
+                .values(reject_reason=case(reject_reasons, value=Request.request_id)),
+                execution_options={"synchronize_session": False},
+            )
+        db.session.execute(insert(StatusLog), log_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return results
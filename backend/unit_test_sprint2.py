@@ -11,7 +11,7 @@ from request_dates import db as request_dates_db, RequestDates
 from status_log import db as status_log_db, StatusLog
 from datetime import date
 from flask import jsonify
-from reject_requests import app as reject_requests_app, invoke_http
+from reject_requests import app as reject_requests_app
 import datetime
 from view_requests import app as view_requests_app
 
@@ -216,15 +216,15 @@ class TestRejectRequest(unittest.TestCase):
         self.app = reject_requests.app.test_client()
         self.app.testing = True
 
-    @patch('reject_requests.invoke_http')  # Mock the invoke_http function
-    def test_reject_request_success(self, mock_invoke_http):
+    @patch('reject_requests.log_status_event')  # Mock the status log
+    @patch('reject_requests.invoke_many')  # Mock the invoke_many function
+    def test_reject_request_success(self, mock_invoke_many, mock_log_status_event):
         # Simulate the behavior of external services using MagicMock
 
-        # Mocking the /update_reason API call to return a success response
-        mock_invoke_http.side_effect = [
-            {"code": 200, "message": "Request updated successfully."},  # First call (update_reason)
-            {"code": 200, "message": "Status updated successfully."},   # Second call (change_all_status)
-            {"code": 200, "message": "Log created successfully."}        # Third call (add_event)
+        # Mocking the /update_reason and /change_all_status API calls, which run together
+        mock_invoke_many.return_value = [
+            {"code": 200, "message": "Request updated successfully."},  # update_reason
+            {"code": 200, "message": "Status updated successfully."},   # change_all_status
         ]
 
         # Define the input data for the request
@@ -240,13 +240,19 @@ class TestRejectRequest(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json["code"], 200)
         self.assertIn("Request rejection reason and status updated successfully.", response.json["message"])
+        mock_log_status_event.assert_called_once_with(
+            request_id=1,
+            action="Request has been rejected by the manager/director",
+            reason="Insufficient justification for the leave",
+        )
 
-    @patch("reject_requests.invoke_http")  # Same patching location
-    def test_reject_request_failure(self, mock_invoke_http):
-        # Mock the first API call to fail
-        mock_invoke_http.side_effect = [
-            {"code": 500, "message": "Failed to update reason."},  # First call fails
-            {"code": 200, "message": "Status updated successfully."},  # Second call success
+    @patch("reject_requests.log_status_event")
+    @patch("reject_requests.invoke_many")
+    def test_reject_request_failure(self, mock_invoke_many, mock_log_status_event):
+        # Mock the update_reason call to fail
+        mock_invoke_many.return_value = [
+            {"code": 500, "message": "Failed to update reason."},  # update_reason fails
+            {"code": 200, "message": "Status updated successfully."},  # change_all_status succeeds
         ]
 
         # Simulate a PUT request to /reject_request
@@ -258,6 +264,7 @@ class TestRejectRequest(unittest.TestCase):
         response_json = response.get_json()
         self.assertEqual(response_json["code"], 500)
         self.assertEqual(response_json["message"], "Failed to update reason.")
+        mock_log_status_event.assert_not_called()  # Nothing is logged when the rejection fails
 
 
 class TestChangeStatusToApproved(flask_testing.TestCase):
@@ -353,8 +360,9 @@ class ChangeAllStatusTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn('Request ID or status not provided.', response.get_data(as_text=True))
 
-    @patch('request_dates.RequestDates')
-    def test_change_all_status_no_request_dates_found(self, MockRequestDates):
+    @patch('request_dates.request_has_dates', return_value=False)
+    @patch('request_dates.change_request_dates_status')
+    def test_change_all_status_no_request_dates_found(self, mock_change_status, mock_has_dates):
         # Sample request data
         request_data = {
             'request_id': 999,
@@ -362,18 +370,18 @@ class ChangeAllStatusTestCase(unittest.TestCase):
         }
 
         # Mocking the empty database response
-        MockRequestDates.query.filter_by.return_value.all.return_value = []
+        mock_change_status.return_value = []
 
         response = self.app.put('/request_dates/change_all_status', json=request_data)
         self.assertEqual(response.status_code, 404)
         self.assertIn('No request dates found for request ID 999', response.get_data(as_text=True))
 
-    @patch('request_dates.RequestDates')
+    @patch('request_dates.change_request_dates_status')
     @patch('request_dates.db.session.commit')
-    @patch('request_dates.invoke_http')
-    def test_change_all_status_exception(self, mock_invoke_http, mock_commit, MockRequestDates):
+    @patch('request_dates.log_status_event')
+    def test_change_all_status_exception(self, mock_log_status_event, mock_commit, mock_change_status):
         # Mock a database query error
-        MockRequestDates.query.filter_by.side_effect = Exception("Database error")
+        mock_change_status.side_effect = Exception("Database error")
 
         request_data = {
             'request_id': 1,
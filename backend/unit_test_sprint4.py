@@ -0,0 +1,1661 @@
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from contextlib import contextmanager
+from flask import Flask, request, jsonify, make_response
+from sqlalchemy import event, text, update
+import employee
+import view_requests
+import request_dates
+import reject_requests
+import request as request_service
+import view_schedule
+from datetime import date, timedelta
+from database import Request, RequestDates, SchemaVersion, StatusLog, DailyWfhCount, DataVersion
+from migrations import apply_migrations, MIGRATIONS
+from data_version import TRACKED_TABLES, bump_data_versions, data_etag, get_data_versions
+from response_cache import ResponseCache, get_response_cache, set_response_cache
+from employee_directory import get_employee_directory
+from config import Config
+from database import db, Employee
+from org_hierarchy import OrgHierarchy, get_org_hierarchy
+from status_log_writer import StatusLogWriter
+from wfh_aggregate import rebuild_wfh_aggregate, record_status_changes
+from attendance import staff_by_day, AttendanceMatrix
+from recurrence import recurrence_dates, recurrence_error
+from invokes import (
+    invoke_http,
+    invoke_many,
+    register_local_service,
+    clear_local_services,
+    is_local_service,
+    get_invoke_stats,
+    reset_invoke_stats,
+    DEFAULT_TIMEOUT,
+)
+
+
+class TestLocalServiceDispatch(unittest.TestCase):
+    def setUp(self):
+        self.service_app = Flask("echo_service")
+
+        self.hooks = []
+
+        @self.service_app.route("/echo/<int:item_id>", methods=["POST"])
+        def echo(item_id):
+            return jsonify({"code": 200, "data": {"item_id": item_id, **request.json}})
+
+        @self.service_app.before_request
+        def before_request():
+            self.hooks.append(("before", request.host))
+
+        @self.service_app.after_request
+        def after_request(response):
+            self.hooks.append(("after", response.status_code))
+            return response
+
+        register_local_service(self.service_app, "http://localhost:5999")
+
+    def tearDown(self):
+        clear_local_services()
+
+    @patch("invokes.session.request")
+    def test_registered_service_is_called_in_process(self, mock_request):
+        response = invoke_http(
+            "http://localhost:5999/echo/7", method="POST", json={"reason": "test"}
+        )
+
+        mock_request.assert_not_called()
+        self.assertEqual(
+            response, {"code": 200, "data": {"item_id": 7, "reason": "test"}}
+        )
+        self.assertEqual(self.hooks, [("before", "localhost:5999"), ("after", 200)])
+
+    @patch("invokes.session.request")
+    def test_other_hosts_and_ports_are_called_over_http(self, mock_request):
+        mock_request.return_value = MagicMock(status_code=200, content=b'{"code": 200}')
+
+        for url in [
+            "http://localhost:5998/echo/7",
+            "http://127.0.0.1:5999/echo/7",
+            "https://localhost:5999/echo/7",
+            "http://localhost/echo/7",
+        ]:
+            with self.subTest(url=url):
+                self.assertFalse(is_local_service(url, "POST"))
+                invoke_http(url, method="POST", json={"reason": "test"})
+
+        self.assertEqual(mock_request.call_count, 4)
+        self.assertEqual(self.hooks, [])
+
+    def test_mount_path_ends_at_a_path_segment(self):
+        mounted_app = Flask("mounted_service")
+        mounted_app.add_url_rule("/echo/<int:item_id>", view_func=lambda item_id: {"code": 200})
+        register_local_service(mounted_app, "http://localhost:5998/mounted")
+
+        self.assertTrue(is_local_service("http://localhost:5998/mounted/echo/7"))
+        self.assertFalse(is_local_service("http://localhost:5998/mountedecho/7"))
+        self.assertFalse(is_local_service("http://localhost:5998/mounted_other/echo/7"))
+
+    @patch("invokes.session.request")
+    def test_unregistered_service_falls_back_to_http(self, mock_request):
+        mock_request.return_value = MagicMock(
+            status_code=200, content=b'{"code": 200}'
+        )
+
+        response = invoke_http("http://localhost:5999/other/7", method="GET")
+
+        mock_request.assert_called_once()
+        self.assertEqual(mock_request.call_args.kwargs["timeout"], DEFAULT_TIMEOUT)
+        self.assertEqual(response, {"code": 200})
+
+    @patch("invokes.session.request")
+    def test_calls_are_counted_per_target(self, mock_request):
+        mock_request.return_value = MagicMock(status_code=404, content=b'{"code": 404}')
+        reset_invoke_stats()
+
+        invoke_http("http://localhost:5999/other/7", method="GET")
+        invoke_http("http://localhost:5999/other/8", method="GET")
+
+        stats = get_invoke_stats()["targets"]["GET http://localhost:5999/other/<id>"]
+        self.assertEqual(stats["mode"], "http")
+        self.assertEqual(stats["calls"], 2)
+        self.assertEqual(stats["errors"], 2)
+
+
+class TestInvokeMany(unittest.TestCase):
+    @patch("invokes.invoke_http")
+    def test_results_keep_the_order_of_calls(self, mock_invoke_http):
+        def slow_echo(url, method, json=None, timeout=None):
+            time.sleep(json["delay"])
+            return {"code": 200, "data": url}
+
+        mock_invoke_http.side_effect = slow_echo
+        calls = [
+            {"url": f"http://localhost:5999/{n}", "method": "GET", "json": {"delay": delay}}
+            for n, delay in enumerate([0.2, 0.0, 0.1])
+        ]
+
+        start = time.monotonic()
+        results = invoke_many(calls, max_concurrency=3)
+
+        self.assertLess(time.monotonic() - start, 0.3)  # not 0.3s of back-to-back calls
+        self.assertEqual([result["data"] for result in results], [call["url"] for call in calls])
+
+    @patch("invokes.invoke_http")
+    def test_calls_past_the_deadline_time_out(self, mock_invoke_http):
+        mock_invoke_http.side_effect = lambda url, method, timeout=None: time.sleep(1) or {"code": 200}
+
+        results = invoke_many(
+            [{"url": "http://localhost:5999/slow", "method": "GET"}], deadline=0.1
+        )
+
+        self.assertEqual(results[0]["code"], 504)
+
+
+def create_sqlite_app():
+    """A Flask app bound to a fresh in-memory SQLite database with all tables created."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def make_employee(staff_id, reporting_manager, dept="Sales", position="Account Manager", role=2):
+    return Employee(
+        staff_id=staff_id,
+        staff_fname="Staff",
+        staff_lname=str(staff_id),
+        dept=dept,
+        position=position,
+        country="Singapore",
+        email=f"{staff_id}@allinone.com.sg",
+        role=role,
+        reporting_manager=reporting_manager,
+    )
+
+
+@contextmanager
+def count_queries(app):
+    """Count the SQL statements sent to the app's database inside the with block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+class TestOrgHierarchy(unittest.TestCase):
+    def setUp(self):
+        # 1 is the CEO and reports to themselves; 2 and 3 report to 1; 4 and 5 report to 2
+        self.hierarchy = OrgHierarchy(
+            [
+                (1, 1, "Jack Sim", "CEO", "MD"),
+                (2, 1, "Derek Tan", "Sales", "Director"),
+                (3, 1, "Eric Loh", "Solutioning", "Director"),
+                (4, 2, "Susan Goh", "Sales", "Account Manager"),
+                (5, 2, "Oliver Tan", "Sales", "Account Manager"),
+            ]
+        )
+
+    def test_reports_under_includes_indirect_reports(self):
+        self.assertEqual(self.hierarchy.reports_under(1), [2, 4, 5, 3])
+        self.assertEqual(self.hierarchy.reports_under(2), [4, 5])
+        self.assertEqual(self.hierarchy.reports_under(4), [])
+        self.assertTrue(self.hierarchy.is_under(5, 1))
+        self.assertFalse(self.hierarchy.is_under(3, 2))
+
+    def test_team_members_matches_the_recursive_scan(self):
+        self.assertEqual(
+            self.hierarchy.team_members(2),
+            {
+                4: {"staff_name": "Susan Goh", "dept": "Sales", "position": "Account Manager"},
+                5: {"staff_name": "Oliver Tan", "dept": "Sales", "position": "Account Manager"},
+            },
+        )
+        # The CEO reports to themselves, so the recursive scan counted them in their own team
+        self.assertEqual(set(self.hierarchy.team_members(1)), {1, 2, 3, 4, 5})
+
+    def test_index_is_rebuilt_after_employee_changes_are_committed(self):
+        app = create_sqlite_app()
+        with app.app_context():
+            db.session.add_all([make_employee(1, 1, role=1), make_employee(2, 1)])
+            db.session.commit()
+            self.assertEqual(get_org_hierarchy().reports_under(1), [2])
+
+            db.session.add(make_employee(3, 2))
+            db.session.commit()
+            self.assertEqual(get_org_hierarchy().reports_under(1), [2, 3])
+
+            # Bulk statements bypass the mapper events but raise the data version too
+            db.session.execute(update(Employee).where(Employee.staff_id == 3).values(reporting_manager=1))
+            db.session.commit()
+            self.assertEqual(get_org_hierarchy().direct_reports(1), [2, 3])
+
+    def test_index_follows_the_directory_snapshot(self):
+        app = create_sqlite_app()
+        with app.app_context():
+            db.session.add_all([make_employee(1, 1, role=1), make_employee(2, 1)])
+            db.session.commit()
+            hierarchy = get_org_hierarchy()
+            self.assertIs(get_org_hierarchy(), hierarchy)
+
+            # A write made by another process, seen through the employee data version
+            connection = db.session.connection()
+            connection.execute(update(Employee).where(Employee.staff_id == 2).values(dept="Finance"))
+            bump_data_versions(connection, ["employee"])
+            db.session.commit()
+            with patch.object(Config, "EMPLOYEE_DIRECTORY_CHECK_INTERVAL", 0):
+                self.assertEqual(get_org_hierarchy().details[2]["dept"], "Finance")
+                self.assertEqual(get_employee_directory().details(2)["dept"], "Finance")
+
+
+class TestGetTeamQueryCount(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+
+    def add_org(self, num_managers, staff_per_manager):
+        """Director 1 with num_managers managers, each with staff_per_manager staff."""
+        employees = [make_employee(1, None, position="Director", role=1)]
+        next_id = 2
+        for _ in range(num_managers):
+            manager_id = next_id
+            employees.append(make_employee(manager_id, 1, position="Manager", role=3))
+            employees += [
+                make_employee(staff_id, manager_id)
+                for staff_id in range(manager_id + 1, manager_id + 1 + staff_per_manager)
+            ]
+            next_id = manager_id + 1 + staff_per_manager
+        with self.app.app_context():
+            db.session.add_all(employees)
+            db.session.commit()
+
+    def get_team(self, query_string=""):
+        with self.app.test_request_context(f"/employee/get_team/1{query_string}"):
+            response, status = employee.get_team(1)
+            return response.get_json(), status
+
+    def test_query_count_is_constant_as_the_org_grows(self):
+        self.add_org(num_managers=2, staff_per_manager=2)
+        with count_queries(self.app) as small_org_queries:
+            small_team, status = self.get_team()
+        self.assertEqual(status, 200)
+
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+        self.add_org(num_managers=40, staff_per_manager=5)
+        with count_queries(self.app) as large_org_queries:
+            large_team, status = self.get_team()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(large_team["managers_and_teams"]), 40)
+        self.assertEqual(len(small_org_queries), 1)
+        self.assertEqual(len(large_org_queries), len(small_org_queries))
+
+    def test_response_shape_is_unchanged(self):
+        self.add_org(num_managers=2, staff_per_manager=2)
+
+        team, status = self.get_team()
+
+        self.assertEqual(
+            team,
+            {
+                "director_id": 1,
+                "managers_and_teams": [
+                    {"manager_id": 2, "team_members": [2, 3, 4]},
+                    {"manager_id": 5, "team_members": [5, 6, 7]},
+                ],
+            },
+        )
+
+    def test_depth_limits_the_levels_returned(self):
+        self.add_org(num_managers=1, staff_per_manager=1)
+        with self.app.app_context():
+            db.session.add(make_employee(10, 3))  # reports to staff 3, one level further down
+            db.session.commit()
+
+        self.assertEqual(self.get_team()[0]["managers_and_teams"][0]["team_members"], [2, 3])
+        self.assertEqual(
+            self.get_team("?depth=3")[0]["managers_and_teams"][0]["team_members"], [2, 3, 10]
+        )
+
+
+class TestSRetrieveRequests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        with self.app.app_context():
+            db.session.add(make_employee(2, None))
+            for request_id, status in [(1, "Approved"), (2, "Rejected"), (3, "Approved")]:
+                db.session.add(Request(2, date(2024, 9, 1), "Family event", request_id=request_id))
+                db.session.add(
+                    RequestDates(request_id, date(2024, 9, request_id), "Full", request_status=status)
+                )
+            db.session.commit()
+
+    def s_retrieve_requests(self, query_string=""):
+        with self.app.test_request_context(f"/view_requests/s_retrieve_requests/2{query_string}"):
+            return view_requests.s_retrieve_requests(2)
+
+    def test_dates_are_loaded_with_a_constant_number_of_queries(self):
+        with count_queries(self.app) as queries:
+            response = self.s_retrieve_requests()
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([req["request_id"] for req in response.get_json()], [1, 2, 3])
+        self.assertEqual(response.get_json()[1]["wfh_dates"][0]["request_status"], "Rejected")
+
+    def test_status_filter_and_cursor_pagination(self):
+        first_page = self.s_retrieve_requests("?status=Approved&limit=1")
+        self.assertEqual([req["request_id"] for req in first_page.get_json()], [1])
+
+        cursor = first_page.headers["X-Next-Cursor"]
+        second_page = self.s_retrieve_requests(f"?status=Approved&limit=1&cursor={cursor}")
+        self.assertEqual([req["request_id"] for req in second_page.get_json()], [3])
+        self.assertNotIn("X-Next-Cursor", second_page.headers)
+
+
+class TestListingPagination(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        with self.app.app_context():
+            db.session.add_all(
+                [make_employee(1, 1, position="Director", role=1), make_employee(2, 1), make_employee(3, 9)]
+            )
+            # Requests 1-5 of staff 2 with 1-3 dates each, request 6 of staff 3 who reports elsewhere
+            for request_id in range(1, 7):
+                db.session.add(
+                    Request(2 if request_id < 6 else 3, date(2024, 9, 1), "Family event", request_id=request_id)
+                )
+                for n in range(1 + request_id % 3):
+                    status = "Approved" if request_id % 2 else "Pending Approval"
+                    db.session.add(
+                        RequestDates(request_id, date(2024, 9, 10 * n + request_id), "AM", request_status=status)
+                    )
+            db.session.commit()
+
+    def m_retrieve_requests(self, query_string=""):
+        with self.app.test_request_context(f"/view_requests/m_retrieve_requests/1{query_string}"):
+            return make_response(view_requests.m_retrieve_requests(1))
+
+    def get_all_requests(self, query_string=""):
+        with self.app.test_request_context(f"/request/get_all_requests{query_string}"):
+            return make_response(request_service.get_all_requests())
+
+    def all_pages(self, retrieve, query_string):
+        pages = []
+        response = retrieve(query_string)
+        while True:
+            pages.append([req["request_id"] for req in response.get_json()["data"]])
+            if "X-Next-Cursor" not in response.headers:
+                return pages, response
+            response = retrieve(f"{query_string}&cursor={response.headers['X-Next-Cursor']}")
+
+    def test_manager_pages_keep_the_dates_of_each_request_together(self):
+        unpaged = self.m_retrieve_requests().get_json()["data"]
+        pages, _ = self.all_pages(self.m_retrieve_requests, "?limit=2")
+
+        self.assertEqual(pages, [[1, 2], [3, 4], [5]])
+        paged = []
+        for cursor in [None, 2, 4]:
+            paged += self.m_retrieve_requests(
+                "?limit=2" + (f"&cursor={cursor}" if cursor else "")
+            ).get_json()["data"]
+        self.assertEqual(paged, unpaged)
+        self.assertEqual([len(req["wfh_dates"]) for req in paged], [2, 3, 1, 2, 3])
+
+    def test_manager_pages_are_filtered_with_two_queries(self):
+        with count_queries(self.app) as queries:
+            response = self.m_retrieve_requests("?status=Approved&limit=1")
+
+        # The page of request_ids, then their dates; the first query reads the data versions
+        self.assertEqual(len(queries), 3)
+        self.assertEqual([req["request_id"] for req in response.get_json()["data"]], [1])
+        self.assertEqual(response.headers["X-Next-Cursor"], "1")
+
+    def test_all_requests_status_filter_and_cursor_pagination(self):
+        pages, _ = self.all_pages(self.get_all_requests, "?status=Approved&limit=2")
+
+        self.assertEqual(pages, [[1, 3], [5]])
+        self.assertEqual(self.get_all_requests("?limit=0").status_code, 400)
+
+    def test_limit_above_the_maximum_is_refused(self):
+        too_many = f"?limit={Config.PAGE_LIMIT_MAX + 1}"
+        for retrieve in (self.get_all_requests, self.m_retrieve_requests):
+            response = retrieve(too_many)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.get_json()["error"], f"limit must be at most {Config.PAGE_LIMIT_MAX}.")
+        self.assertEqual(self.get_all_requests(f"?limit={Config.PAGE_LIMIT_MAX}").status_code, 200)
+
+    def test_limit_and_cursor_that_are_not_whole_numbers_are_refused(self):
+        for query_string in ("?limit=abc", "?limit=", "?limit=2.5", "?limit=2&cursor=abc"):
+            for retrieve in (self.get_all_requests, self.m_retrieve_requests):
+                with self.subTest(query_string=query_string, retrieve=retrieve.__name__):
+                    response = retrieve(query_string)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.get_json()["error"], "limit and cursor must be whole numbers.")
+
+
+class TestCreateRequestConflicts(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.day = date.today() + timedelta(days=7)
+        with self.app.app_context():
+            db.session.add(make_employee(2, None))
+            db.session.add(Request(2, date.today(), "Family event", request_id=1))
+            db.session.add(RequestDates(1, self.day, "AM"))
+            db.session.add(RequestDates(1, self.day + timedelta(days=1), "Full", request_status="Withdrawn"))
+            db.session.commit()
+
+    def create(self, request_dates):
+        payload = {"staff_id": 2, "apply_reason": "Appointment", "request_dates": request_dates}
+        with self.app.test_request_context("/request/create", method="POST", json=payload):
+            response, status = request_service.create_request()
+            return response.get_json(), status
+
+    def test_overlapping_shifts_are_rejected(self):
+        response, status = self.create({self.day.isoformat(): "Full"})
+
+        self.assertEqual(status, 400)
+        self.assertIn(self.day.isoformat(), response["error"])
+        with self.app.app_context():
+            self.assertEqual(Request.query.count(), 1)
+
+    def test_free_shifts_and_inactive_dates_are_allowed(self):
+        response, status = self.create(
+            {self.day.isoformat(): "PM", (self.day + timedelta(days=1)).isoformat(): "Full"}
+        )
+
+        self.assertEqual(status, 200)
+
+    @patch("request_creation.record_status_changes", side_effect=RuntimeError("disk full"))
+    def test_failed_create_leaves_nothing_behind(self, mock_record_status_changes):
+        response, status = self.create({self.day.isoformat(): "PM"})
+
+        self.assertEqual(status, 500)
+        with self.app.app_context():
+            self.assertEqual(Request.query.count(), 1)
+            self.assertEqual(RequestDates.query.count(), 2)
+            self.assertEqual(StatusLog.query.count(), 0)
+
+    def test_conflict_check_is_one_query_whatever_the_history(self):
+        with self.app.app_context():
+            for request_id in range(2, 52):
+                db.session.add(Request(2, date.today(), "Family event", request_id=request_id))
+                db.session.add(RequestDates(request_id, self.day - timedelta(days=request_id), "Full"))
+            db.session.commit()
+
+        with count_queries(self.app) as queries:
+            response, status = self.create({self.day.isoformat(): "PM"})
+
+        self.assertEqual(status, 200)
+        # The staff and conflict checks, then one transaction: the request, its dates, its
+        # status log and the data version bump
+        self.assertEqual(len(queries), 6)
+
+
+class TestRecurrence(unittest.TestCase):
+    def setUp(self):
+        # The next Monday at least a week away
+        self.monday = date.today() + timedelta(days=7 - date.today().weekday() + 7)
+        self.rule = {
+            "weekdays": [0, 2],
+            "shift": "AM",
+            "start": self.monday.isoformat(),
+            "until": (self.monday + timedelta(days=13)).isoformat(),
+        }
+
+    def test_rule_is_expanded_into_its_weekdays(self):
+        self.assertIsNone(recurrence_error(self.rule))
+        self.assertEqual(
+            recurrence_dates(self.rule),
+            {
+                (self.monday + timedelta(days=offset)).isoformat(): "AM"
+                for offset in (0, 2, 7, 9)
+            },
+        )
+
+    def test_invalid_rules_are_refused(self):
+        for change in (
+            {"weekdays": [7]},
+            {"weekdays": []},
+            {"shift": "Night"},
+            {"until": (self.monday - timedelta(days=1)).isoformat()},
+            {"until": (self.monday + timedelta(days=365)).isoformat()},
+            {"weekdays": [5], "until": (self.monday + timedelta(days=4)).isoformat()},
+        ):
+            self.assertIsNotNone(recurrence_error({**self.rule, **change}), change)
+
+    def test_create_accepts_a_rule(self):
+        app = create_sqlite_app()
+        with app.app_context():
+            db.session.add(make_employee(2, None))
+            db.session.add(Request(2, date.today(), "Family event", request_id=1))
+            db.session.add(RequestDates(1, self.monday + timedelta(days=9), "Full"))
+            db.session.commit()
+
+        def create(rule):
+            payload = {"staff_id": 2, "apply_reason": "Weekly WFH", "recurrence": rule}
+            with app.test_request_context("/request/create", method="POST", json=payload):
+                response, status = request_service.create_request()
+                return response.get_json(), status
+
+        response, status = create(self.rule)
+        self.assertEqual(status, 400)
+        self.assertIn((self.monday + timedelta(days=9)).isoformat(), response["error"])
+
+        response, status = create({**self.rule, "weekdays": [0]})
+        self.assertEqual(status, 200)
+        with app.app_context():
+            self.assertEqual(
+                [
+                    (row.request_date, row.request_shift)
+                    for row in RequestDates.query.filter_by(request_id=response["data"]["request_id"])
+                ],
+                [(self.monday, "AM"), (self.monday + timedelta(days=7), "AM")],
+            )
+
+
+class TestCreateBulkRequests(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.day = (date.today() + timedelta(days=7)).isoformat()
+        with self.app.app_context():
+            db.session.add_all([make_employee(staff_id, None) for staff_id in range(2, 30)])
+            db.session.add(Request(2, date.today(), "Family event", request_id=1))
+            db.session.add(RequestDates(1, date.fromisoformat(self.day), "AM"))
+            db.session.commit()
+
+    def create_bulk(self, entries):
+        with self.app.test_request_context(
+            "/request/create_bulk", method="POST", json={"requests": entries}
+        ):
+            response, status = request_service.create_bulk_requests()
+            return response.get_json(), status
+
+    def test_each_entry_is_created_or_refused_on_its_own(self):
+        response, status = self.create_bulk(
+            [
+                {"staff_id": 3, "request_dates": {self.day: "Full"}, "apply_reason": "Team WFH"},
+                {"staff_id": 2, "request_dates": {self.day: "Full"}, "apply_reason": "Team WFH"},
+                {"staff_id": 2, "request_dates": {self.day: "PM"}, "apply_reason": "Team WFH"},
+                {"staff_id": 2, "request_dates": {self.day: "PM"}, "apply_reason": "Team WFH"},
+                {"staff_id": 4, "request_dates": {self.day: "Full"}, "apply_reason": "x" * 101},
+                {"staff_id": 999, "request_dates": {self.day: "Full"}, "apply_reason": "Team WFH"},
+            ]
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual((response["created"], response["failed"]), (2, 4))
+        self.assertEqual(
+            [result["code"] for result in response["data"]], [200, 400, 200, 400, 400, 404]
+        )
+        self.assertIn(self.day, response["data"][3]["error"])
+        with self.app.app_context():
+            created = [response["data"][0]["data"]["request_id"], response["data"][2]["data"]["request_id"]]
+            self.assertEqual(
+                sorted((row.request_id, row.request_shift) for row in RequestDates.query.filter(RequestDates.request_id.in_(created))),
+                [(created[0], "Full"), (created[1], "PM")],
+            )
+            self.assertEqual(sorted(log.request_id for log in StatusLog.query.all()), created)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def entries(staff_ids):
+            return [
+                {"staff_id": staff_id, "request_dates": {self.day: "Full"}, "apply_reason": "Team WFH"}
+                for staff_id in staff_ids
+            ]
+
+        with count_queries(self.app) as small_batch:
+            self.create_bulk(entries(range(3, 5)))
+        with count_queries(self.app) as large_batch:
+            response, _ = self.create_bulk(entries(range(5, 30)))
+
+        self.assertEqual(response["created"], 25)
+        # Only the request inserts may be sent one per row, where the database cannot return
+        # the new request_ids of a batched insert in order
+        self.assertEqual(
+            len([query for query in large_batch if not query.startswith("INSERT INTO request ")]),
+            len([query for query in small_batch if not query.startswith("INSERT INTO request ")]),
+        )
+
+
+class TestAutoReject(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        stale_date = date.today() - timedelta(days=70)
+        with self.app.app_context():
+            db.session.add(make_employee(2, None))
+            # Requests 1-5 have a stale pending date, request 6 is recent
+            for request_id in range(1, 7):
+                db.session.add(Request(2, date.today(), "Family event", request_id=request_id))
+                request_date = stale_date if request_id <= 5 else date.today()
+                db.session.add(RequestDates(request_id, request_date, "Full"))
+                db.session.add(
+                    RequestDates(request_id, request_date + timedelta(days=1), "AM", request_status="Approved")
+                )
+            db.session.commit()
+
+    def auto_reject(self):
+        with self.app.test_request_context("/request_dates/auto_reject", method="PUT"):
+            response, status = request_dates.auto_reject()
+            return response.get_json(), status
+
+    @patch.dict(request_dates.app.config, {"AUTO_REJECT_CHUNK_SIZE": 2})
+    def test_stale_requests_are_rejected_in_chunks(self):
+        with count_queries(self.app) as queries:
+            response, status = self.auto_reject()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["requests"], [1, 2, 3, 4, 5])
+        # One lookup, then for each of the 3 chunks: the approved dates, their staff and
+        # daily_wfh_count rows, and the three writes; then the data version bump at commit
+        self.assertEqual(len(queries), 1 + 6 * 3 + 1)
+        with self.app.app_context():
+            statuses = {
+                (request_date.request_id, request_date.request_status)
+                for request_date in RequestDates.query.all()
+            }
+            self.assertEqual(
+                statuses,
+                {(request_id, "Rejected") for request_id in range(1, 6)}
+                | {(6, "Pending Approval"), (6, "Approved")},
+            )
+            self.assertIsNone(db.session.get(Request, 6).reject_reason)
+            self.assertEqual(
+                db.session.get(Request, 1).reject_reason,
+                "1 or more date(s) have been auto-rejected by the system",
+            )
+            self.assertEqual(
+                sorted(log.request_id for log in StatusLog.query.all()), [1, 2, 3, 4, 5]
+            )
+
+    def test_nothing_to_reject_costs_one_query(self):
+        self.auto_reject()
+        with count_queries(self.app) as queries:
+            response, status = self.auto_reject()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["updated_requests"], [])
+        self.assertEqual(len(queries), 1)
+
+
+class TestRejectInProcess(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.day = date.today() + timedelta(days=7)
+        with self.app.app_context():
+            db.session.add(make_employee(2, None))
+            db.session.add(Request(2, date.today(), "Family event", request_id=1))
+            db.session.add(RequestDates(1, self.day, "Full"))
+            db.session.add(RequestDates(1, self.day + timedelta(days=1), "AM", request_status="Approved"))
+            db.session.add(RequestDates(1, self.day + timedelta(days=2), "PM", request_status="Withdrawn"))
+            # Request 2 has no dates
+            db.session.add(Request(2, date.today(), "Family event", request_id=2))
+            db.session.commit()
+            rebuild_wfh_aggregate(db.session.connection())
+            db.session.commit()
+
+    @patch("reject_requests.invoke_many")
+    @patch("reject_requests.is_local_service", return_value=True)
+    def reject(self, request_id, mock_is_local_service, mock_invoke_many):
+        payload = {"request_id": request_id, "reason": "Team offsite"}
+        with self.app.test_request_context("/reject_request", method="PUT", json=payload):
+            response, status = reject_requests.reject_request()
+        mock_invoke_many.assert_not_called()
+        return response.get_json(), status
+
+    @patch("request_dates.log_status_event")
+    @patch("reject_requests.log_status_event")
+    @patch("reject_requests.is_local_service", return_value=False)
+    def reject_over_http(self, request_id, mock_is_local_service, *mock_log_status_events):
+        """Reject with the request and request_dates services answering as if called over HTTP."""
+        views = {
+            "/update_reason": request_service.update_reason,
+            "/change_all_status": request_dates.change_all_status,
+        }
+
+        def invoke_many(calls):
+            responses = []
+            for call in calls:
+                view = views["/" + call["url"].rsplit("/", 1)[1]]
+                with self.app.test_request_context(method=call["method"], json=call["json"]):
+                    response, status = view()
+                responses.append(response.get_json())
+            return responses
+
+        payload = {"request_id": request_id, "reason": "Team offsite"}
+        with patch("reject_requests.invoke_many", side_effect=invoke_many):
+            with self.app.test_request_context("/reject_request", method="PUT", json=payload):
+                response, status = reject_requests.reject_request()
+        return response.get_json(), status
+
+    def test_request_is_rejected_in_one_transaction(self):
+        response, status = self.reject(1)
+
+        self.assertEqual(status, 200)
+        self.assertEqual(response["data"]["update_reason_response"]["data"]["reject_reason"], "Team offsite")
+        self.assertEqual(
+            [row["request_status"] for row in response["data"]["change_status_response"]["data"]],
+            ["Rejected", "Rejected"],
+        )
+        with self.app.app_context():
+            self.assertEqual(
+                [row.request_status for row in RequestDates.query.order_by(RequestDates.request_date)],
+                ["Rejected", "Rejected", "Withdrawn"],
+            )
+            self.assertEqual(db.session.get(Request, 1).reject_reason, "Team offsite")
+            self.assertEqual(
+                [(log.action, log.reason) for log in StatusLog.query.all()],
+                [("Request has been rejected by the manager/director", "Team offsite")],
+            )
+            self.assertEqual(DailyWfhCount.query.count(), 0)
+
+    def test_unknown_request_is_not_found(self):
+        with count_queries(self.app) as queries:
+            response, status = self.reject(99)
+
+        self.assertEqual(status, 404)
+        self.assertEqual(len(queries), 1)
+
+    def test_in_process_and_http_rejections_answer_alike(self):
+        for request_id in (1, 2, 99):
+            with self.subTest(request_id=request_id):
+                in_process = self.reject(request_id)
+                # The HTTP path starts from the same rows
+                self.setUp()
+                self.assertEqual(in_process, self.reject_over_http(request_id))
+                self.setUp()
+
+        # A request with no dates is not found, as change_all_status says, and is left alone
+        response, status = self.reject(2)
+        self.assertEqual(status, 404)
+        self.assertEqual(response["message"], "No request dates found for request ID 2.")
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(Request, 2).reject_reason)
+            self.assertEqual(StatusLog.query.count(), 0)
+
+
+class TestBulkTransition(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.day = date.today() + timedelta(days=7)
+        with self.app.app_context():
+            db.session.add(make_employee(2, None))
+            for request_id in range(1, 31):
+                db.session.add(Request(2, date.today(), "Family event", request_id=request_id))
+            # 1 and 2 are pending, 3 is approved, 4 is withdrawn, 5-30 are pending
+            db.session.add(RequestDates(1, self.day, "Full"))
+            db.session.add(RequestDates(2, self.day + timedelta(days=1), "AM"))
+            db.session.add(RequestDates(3, self.day + timedelta(days=2), "PM", request_status="Approved"))
+            db.session.add(RequestDates(3, self.day + timedelta(days=3), "PM", request_status="Approved"))
+            db.session.add(RequestDates(4, self.day + timedelta(days=4), "AM", request_status="Withdrawn"))
+            for request_id in range(5, 31):
+                db.session.add(RequestDates(request_id, self.day + timedelta(days=request_id), "AM"))
+            db.session.commit()
+            rebuild_wfh_aggregate(db.session.connection())
+            db.session.commit()
+
+    def transition(self, items):
+        with self.app.test_request_context(
+            "/request_dates/bulk_transition", method="PUT", json={"transitions": items}
+        ):
+            response, status = request_dates.bulk_transition()
+            return response.get_json(), status
+
+    def test_each_item_is_applied_or_refused_on_its_own(self):
+        rescinded = (self.day + timedelta(days=2)).isoformat()
+        response, status = self.transition(
+            [
+                {"request_id": 1, "status": "Approved"},
+                {"request_id": 2, "status": "Rejected", "reason": "Short-staffed"},
+                {"request_id": 3, "status": "Rescinded", "reason": "Client visit", "dates": [rescinded], "shift": "PM"},
+                {"request_id": 4, "status": "Approved"},
+                {"request_id": 5, "status": "Rejected"},
+                {"request_id": 99, "status": "Approved"},
+            ]
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual((response["updated"], response["failed"]), (3, 3))
+        self.assertEqual(
+            [result["code"] for result in response["data"]], [200, 200, 200, 400, 400, 404]
+        )
+        self.assertEqual(response["data"][3]["error"], "Cannot change Withdrawn dates to Approved.")
+        with self.app.app_context():
+            statuses = {
+                row.request_id: row.request_status
+                for row in RequestDates.query.filter(RequestDates.request_id <= 5)
+                .order_by(RequestDates.request_date)
+            }
+            self.assertEqual(
+                statuses,
+                {1: "Approved", 2: "Rejected", 3: "Approved", 4: "Withdrawn", 5: "Pending Approval"},
+            )
+            row = RequestDates.query.filter_by(request_date=date.fromisoformat(rescinded)).one()
+            self.assertEqual((row.request_status, row.rescind_reason), ("Rescinded", "Client visit"))
+            self.assertEqual(db.session.get(Request, 2).reject_reason, "Short-staffed")
+            self.assertEqual(sorted(log.request_id for log in StatusLog.query.all()), [1, 2, 3])
+            self.assertEqual(
+                sorted((row.wfh_date, row.wfh_count) for row in DailyWfhCount.query.all()),
+                [(self.day, 1), (self.day + timedelta(days=3), 1)],
+            )
+
+    def test_whole_request_items_leave_pending_withdrawals_alone(self):
+        pending_withdrawal = self.day + timedelta(days=40)
+        with self.app.app_context():
+            db.session.add(
+                RequestDates(5, pending_withdrawal, "PM", request_status="Pending Withdrawal")
+            )
+            db.session.commit()
+
+        response, _ = self.transition([{"request_id": 5, "status": "Approved"}])
+        self.assertEqual([row["request_status"] for row in response["data"][0]["data"]], ["Approved"])
+        response, _ = self.transition([{"request_id": 5, "status": "Withdrawn", "reason": "Plans changed"}])
+        self.assertEqual(response["data"][0]["code"], 400)
+
+        with self.app.app_context():
+            self.assertEqual(
+                [
+                    (row.request_date, row.request_status)
+                    for row in RequestDates.query.filter_by(request_id=5).order_by(RequestDates.request_date)
+                ],
+                [(self.day + timedelta(days=5), "Approved"), (pending_withdrawal, "Pending Withdrawal")],
+            )
+
+    def test_query_count_does_not_grow_with_the_items(self):
+        with count_queries(self.app) as few:
+            self.transition([{"request_id": request_id, "status": "Approved"} for request_id in (5, 6)])
+        with count_queries(self.app) as many:
+            response, _ = self.transition(
+                [{"request_id": request_id, "status": "Approved"} for request_id in range(7, 31)]
+            )
+
+        self.assertEqual(response["updated"], 24)
+        self.assertEqual(len(many), len(few))
+
+
+class TestSetBasedStatusChange(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.day = date.today() + timedelta(days=7)
+        with self.app.app_context():
+            db.session.add(make_employee(2, None))
+            db.session.add(Request(2, date.today(), "Family event", request_id=1))
+            db.session.add(RequestDates(1, self.day, "Full"))
+            db.session.add(RequestDates(1, self.day + timedelta(days=1), "AM", request_status="Approved"))
+            db.session.add(RequestDates(1, self.day + timedelta(days=2), "PM", request_status="Withdrawn"))
+            db.session.commit()
+            rebuild_wfh_aggregate(db.session.connection())
+            db.session.commit()
+
+    @patch("request_dates.log_status_event")
+    def put(self, view, payload, mock_log_status_event):
+        with self.app.test_request_context("/request_dates", method="PUT", json=payload):
+            response, status = view()
+            return response.get_json(), status
+
+    def statuses(self):
+        with self.app.app_context():
+            return [row.request_status for row in RequestDates.query.order_by(RequestDates.request_date)]
+
+    def wfh_counts(self):
+        with self.app.app_context():
+            return sorted((row.wfh_date, row.wfh_count) for row in DailyWfhCount.query.all())
+
+    def test_approve_updates_only_the_dates_not_yet_approved(self):
+        with count_queries(self.app) as queries:
+            response, status = self.put(
+                request_dates.change_all_status, {"request_id": 1, "status": "Approved"}
+            )
+
+        self.assertEqual(status, 200)
+        self.assertEqual([row["request_date"] for row in response["data"]], [self.day.isoformat()])
+        self.assertEqual(self.statuses(), ["Approved", "Approved", "Withdrawn"])
+        self.assertEqual(
+            self.wfh_counts(), [(self.day, 1), (self.day + timedelta(days=1), 1)]
+        )
+        # The dates are never read back, before or after the commit
+        self.assertFalse(
+            [query for query in queries if query.startswith("SELECT") and "request_dates" in query]
+        )
+
+    def test_reject_keeps_withdrawn_dates_and_the_wfh_count(self):
+        response, status = self.put(
+            request_dates.change_all_status,
+            {"request_id": 1, "status": "Rejected", "reason": "Short-staffed"},
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(response["data"]), 2)
+        self.assertEqual(self.statuses(), ["Rejected", "Rejected", "Withdrawn"])
+        self.assertEqual(self.wfh_counts(), [])
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Request, 1).reject_reason, "Short-staffed")
+
+    def test_unknown_request_is_not_found(self):
+        response, status = self.put(
+            request_dates.change_all_status, {"request_id": 99, "status": "Approved"}
+        )
+
+        self.assertEqual(status, 404)
+
+    def test_partial_status_sets_the_reason(self):
+        withdrawn = (self.day + timedelta(days=1)).isoformat()
+        response, status = self.put(
+            request_dates.change_partial_status,
+            {"request_id": 1, "status": "Withdrawn", "reason": "Plans changed", "dates": [withdrawn], "shift": "AM"},
+        )
+
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [(row["request_date"], row["request_status"], row["withdraw_reason"]) for row in response["data"]],
+            [(withdrawn, "Withdrawn", "Plans changed")],
+        )
+        self.assertEqual(self.statuses(), ["Pending Approval", "Withdrawn", "Withdrawn"])
+        self.assertEqual(self.wfh_counts(), [])
+
+    def test_partial_status_is_checked_before_anything_changes(self):
+        with count_queries(self.app) as queries:
+            response, status = self.put(
+                request_dates.change_partial_status,
+                {"request_id": 1, "status": "Rescinded", "dates": [self.day.isoformat()], "shift": "Full"},
+            )
+
+        self.assertEqual((status, response["message"]), (400, "Rescind reason must be provided."))
+        self.assertEqual(queries, [])
+
+
+class TestStatusLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        with self.app.app_context():
+            db.session.add(make_employee(2, None))
+            db.session.add(Request(2, date(2024, 9, 1), "Family event", request_id=1))
+            db.session.commit()
+
+    def logged_actions(self):
+        with self.app.app_context():
+            return [log.action for log in StatusLog.query.order_by(StatusLog.log_id)]
+
+    def wait_for_rows(self, count, timeout=2):
+        deadline = time.monotonic() + timeout
+        while len(self.logged_actions()) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.logged_actions()
+
+    def test_events_are_written_in_one_insert_at_the_batch_size(self):
+        writer = StatusLogWriter(self.app, batch_size=3, max_age=60)
+        writer.log(1, "first")
+        writer.log(1, "second")
+        self.assertEqual(self.logged_actions(), [])
+
+        writer.log(1, "third")
+        self.assertEqual(self.wait_for_rows(3), ["first", "second", "third"])
+        self.assertEqual(writer.stats["flushes"], 1)
+        writer.close()
+
+    def test_events_are_written_once_they_reach_the_max_age(self):
+        writer = StatusLogWriter(self.app, batch_size=100, max_age=0.05)
+        writer.log(1, "first", "reason")
+
+        self.assertEqual(self.wait_for_rows(1), ["first"])
+        writer.close()
+
+    def test_sync_writes_the_event_and_everything_queued_before_it(self):
+        writer = StatusLogWriter(self.app, batch_size=100, max_age=60)
+        writer.log(1, "first")
+        writer.log(1, "second", sync=True)
+
+        self.assertEqual(self.logged_actions(), ["first", "second"])
+        writer.close()
+
+    def test_close_writes_the_remaining_events(self):
+        writer = StatusLogWriter(self.app, batch_size=100, max_age=60)
+        writer.log(1, "first")
+        writer.close()
+
+        self.assertEqual(self.logged_actions(), ["first"])
+        self.assertEqual(writer.pending(), 0)
+
+
+@patch("request_dates.log_status_event", MagicMock())
+class TestWfhAggregate(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.day = date.today() + timedelta(days=7)
+        with self.app.app_context():
+            db.session.add_all(
+                [
+                    make_employee(1, 1, position="Director", role=1),
+                    make_employee(2, 1),
+                    make_employee(3, 1),
+                    make_employee(4, 2, dept="Finance"),
+                ]
+            )
+            for request_id, staff_id in [(1, 2), (2, 3), (3, 4)]:
+                db.session.add(Request(staff_id, date.today(), "Family event", request_id=request_id))
+                db.session.add(RequestDates(request_id, self.day, "Full"))
+            db.session.add(RequestDates(1, self.day + timedelta(days=1), "AM"))
+            db.session.commit()
+
+    def put(self, endpoint, json):
+        with self.app.test_request_context(f"/request_dates/{endpoint}", method="PUT", json=json):
+            response = getattr(request_dates, endpoint)()
+            return response[1] if isinstance(response, tuple) else response.status_code
+
+    def aggregate_rows(self):
+        with self.app.app_context():
+            return sorted(
+                (row.wfh_date, row.dept, row.reporting_manager, row.shift, row.wfh_count, row.staff_ids)
+                for row in DailyWfhCount.query.all()
+            )
+
+    def test_status_changes_update_the_aggregate(self):
+        for request_id in [1, 2, 3]:
+            self.assertEqual(
+                self.put("change_all_status", {"request_id": request_id, "status": "Approved"}), 200
+            )
+        self.assertEqual(
+            self.aggregate_rows(),
+            [
+                (self.day, "Finance", 2, "Full", 1, [4]),
+                (self.day, "Sales", 1, "Full", 2, [2, 3]),
+                (self.day + timedelta(days=1), "Sales", 1, "AM", 1, [2]),
+            ],
+        )
+
+        status = self.put(
+            "change_partial_status",
+            {
+                "request_id": 1,
+                "status": "Withdrawn",
+                "reason": "Plans changed",
+                "dates": [self.day.isoformat()],
+                "shift": "Full",
+            },
+        )
+        self.assertEqual(status, 200)
+        self.put("change_all_status", {"request_id": 3, "status": "Rejected", "reason": "Busy"})
+        self.assertEqual(
+            self.aggregate_rows(),
+            [
+                (self.day, "Sales", 1, "Full", 1, [3]),
+                (self.day + timedelta(days=1), "Sales", 1, "AM", 1, [2]),
+            ],
+        )
+
+    def test_rebuild_matches_the_incremental_updates(self):
+        for request_id in [1, 3]:
+            self.put("change_all_status", {"request_id": request_id, "status": "Approved"})
+        incremental = self.aggregate_rows()
+
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                self.assertEqual(rebuild_wfh_aggregate(connection), 3)
+        self.assertEqual(self.aggregate_rows(), incremental)
+
+    def test_a_row_inserted_concurrently_is_added_to(self):
+        with self.app.app_context():
+            # Read before another transaction committed the first approval for the same key
+            with patch("wfh_aggregate.DailyWfhCount.query") as mock_query:
+                mock_query.filter.return_value.with_for_update.return_value = []
+                db.session.add(DailyWfhCount(self.day, "Sales", 1, "Full", 1, [2]))
+                db.session.flush()
+                record_status_changes([(2, self.day, "Full", "Pending Approval", "Approved")])
+            db.session.commit()
+
+        self.assertEqual(self.aggregate_rows(), [(self.day, "Sales", 1, "Full", 2, [2, 3])])
+
+    def test_changes_to_missing_requests_are_skipped(self):
+        with self.app.app_context():
+            with self.assertLogs("wfh_aggregate", "ERROR"):
+                record_status_changes(
+                    [
+                        (99, self.day, "Full", "Pending Approval", "Approved"),
+                        (1, self.day, "Full", "Pending Approval", "Approved"),
+                    ]
+                )
+            db.session.commit()
+
+        self.assertEqual(self.aggregate_rows(), [(self.day, "Sales", 1, "Full", 1, [2])])
+
+    def test_wfh_status_by_team_reads_the_aggregate(self):
+        for request_id in [1, 2, 3]:
+            self.put("change_all_status", {"request_id": request_id, "status": "Approved"})
+
+        with self.app.test_request_context("/view_schedule/get_wfh_status_by_team/2"):
+            response = view_schedule.get_wfh_status_by_team(2).get_json()
+        self.assertEqual(response["num_employee_in_dept"], 1)
+        self.assertEqual(response["data"][self.day.isoformat()], [4])
+        self.assertEqual(response["data"][(self.day + timedelta(days=1)).isoformat()], [])
+        self.assertEqual(response["counts"][self.day.isoformat()], 1)
+        self.assertEqual(len(response["counts"]), len(response["data"]))
+
+        with self.app.test_request_context("/view_schedule/get_wfh_status"):
+            response = view_schedule.get_wfh_status().get_json()
+        self.assertEqual(response["data"][self.day.isoformat()], [2, 3, 4])
+
+    def test_wfh_status_covers_the_days_of_the_schedules(self):
+        with self.app.test_request_context("/view_schedule/get_wfh_status"):
+            response = view_schedule.get_wfh_status().get_json()
+        self.assertEqual(sorted(response["counts"]), view_schedule.get_date_range())
+
+    def test_cached_responses_are_dropped_along_the_hierarchy_path(self):
+        set_response_cache(ResponseCache())
+        self.put("change_all_status", {"request_id": 3, "status": "Approved"})
+        day = self.day.isoformat()
+
+        def wfh_by_team(staff_id):
+            with self.app.test_request_context(f"/view_schedule/get_wfh_status_by_team/{staff_id}"):
+                return view_schedule.get_wfh_status_by_team(staff_id=staff_id).get_json()["data"][day]
+
+        self.assertEqual(wfh_by_team(2), [4])
+        with count_queries(self.app) as queries:
+            self.assertEqual(wfh_by_team(2), [4])
+        # Only the data versions are read
+        self.assertEqual(len(queries), 1)
+        self.assertIn("FROM data_version", queries[0])
+
+        # Staff 3 reports to 1, so team 2's entry is kept, but not served for the new data versions
+        self.put("change_all_status", {"request_id": 2, "status": "Approved"})
+        self.assertEqual(get_response_cache().stats()["invalidations"], 0)
+        self.assertEqual(wfh_by_team(2), [4])
+
+        # Staff 4 reports to 2
+        self.put("change_all_status", {"request_id": 3, "status": "Rejected", "reason": "Busy"})
+        self.assertEqual(wfh_by_team(2), [])
+        self.assertEqual(
+            {
+                name: count
+                for name, count in get_response_cache().stats().items()
+                if name in ("hits", "misses", "invalidations")
+            },
+            {"hits": 1, "misses": 3, "invalidations": 2},
+        )
+
+    def test_writes_from_other_processes_are_not_answered_from_the_cache(self):
+        set_response_cache(ResponseCache())
+        day = self.day.isoformat()
+
+        def wfh_by_team():
+            with self.app.test_request_context("/view_schedule/get_wfh_status_by_team/2"):
+                return view_schedule.get_wfh_status_by_team(staff_id=2).get_json()["data"][day]
+
+        self.assertEqual(wfh_by_team(), [])
+        # Another process approves staff 4's date: no invalidation here, only new data versions
+        with self.app.app_context():
+            connection = db.session.connection()
+            connection.execute(
+                update(RequestDates).where(RequestDates.request_id == 3).values(request_status="Approved")
+            )
+            rebuild_wfh_aggregate(connection)
+            bump_data_versions(connection, ["request_dates"])
+            db.session.commit()
+
+        self.assertEqual(wfh_by_team(), [4])
+
+    def test_attendance_rates_returns_the_groups_below_the_threshold(self):
+        for request_id in [1, 2, 3]:
+            self.put("change_all_status", {"request_id": request_id, "status": "Approved"})
+
+        with self.app.test_request_context("/view_schedule/attendance_rates?threshold=0.5"):
+            response, status = view_schedule.attendance_rates()
+        self.assertEqual(status, 200)
+        day = self.day.isoformat()
+        self.assertEqual(
+            [
+                (cell["group"], cell["date"], cell["shift"], cell["in_office"], cell["total"])
+                for cell in response.get_json()["data"]
+            ],
+            [
+                ("Finance", day, "AM", 0, 1),
+                ("Finance", day, "PM", 0, 1),
+                ("Sales", day, "AM", 1, 3),
+                ("Sales", day, "PM", 1, 3),
+            ],
+        )
+
+        with self.app.test_request_context(
+            "/view_schedule/attendance_rates?group_by=team&staff_id=2"
+        ):
+            response, status = view_schedule.attendance_rates()
+        self.assertEqual([cell["group"] for cell in response.get_json()["data"]], [2, 2])
+
+        with self.app.test_request_context("/view_schedule/attendance_rates?threshold=2"):
+            self.assertEqual(view_schedule.attendance_rates()[1], 400)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (3, 1, 1))
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = ResponseCache(max_entries=2, ttl=0.05)
+        cache.put("a", 1)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_invalidation_only_drops_the_scopes_and_dates_given(self):
+        cache = ResponseCache(max_entries=10, ttl=60)
+        october = (date(2024, 10, 1), date(2024, 10, 31))
+        cache.put("org", 0, scope=None, window=october)
+        cache.put("team 1", 1, scope=1, window=october)
+        cache.put("team 2", 2, scope=2, window=october)
+        cache.put("team 2 in November", 2, scope=2, window=(date(2024, 11, 1), date(2024, 11, 30)))
+        # A response computed before the invalidation is not stored
+        generation = cache.generation
+
+        cache.invalidate({3, 1}, {date(2024, 10, 15)})
+        cache.put("team 1", 1, scope=1, window=october, generation=generation)
+
+        self.assertEqual(
+            [key for key in ["org", "team 1", "team 2", "team 2 in November"] if cache.get(key) is not None],
+            ["team 2", "team 2 in November"],
+        )
+
+
+class TestTeamScheduleCache(unittest.TestCase):
+    def setUp(self):
+        set_response_cache(ResponseCache())
+        self.app = create_sqlite_app()
+        self.day = date.today() + timedelta(days=7)
+        with self.app.app_context():
+            # 2 reports to 1 and 3 reports to 2: same position, different teams
+            db.session.add_all(
+                [make_employee(1, 1, position="Director", role=1), make_employee(2, 1), make_employee(3, 2)]
+            )
+            for request_id, staff_id in [(1, 2), (2, 3)]:
+                db.session.add(Request(staff_id, date.today(), "Family event", request_id=request_id))
+                db.session.add(RequestDates(request_id, self.day, "Full", request_status="Approved"))
+            db.session.commit()
+
+    def team_schedule(self, staff_id):
+        with self.app.test_request_context(f"/view_schedule/s_get_team_schedule/{staff_id}"):
+            schedule = view_schedule.s_get_team_schedule(staff_id=staff_id).get_json()
+        return [staff["staff_id"] for staff in schedule["Sales"][self.day.isoformat()]["Full"]]
+
+    def test_cached_team_schedules_are_kept_apart_per_staff(self):
+        self.assertEqual(self.team_schedule(2), [3])
+        # Staff 3 must not get the response cached for staff 2
+        self.assertEqual(self.team_schedule(3), [2])
+        self.assertEqual(self.team_schedule(2), [3])
+        self.assertEqual(get_response_cache().stats()["hits"], 1)
+
+
+class TestStaffByDay(unittest.TestCase):
+    def test_staff_are_counted_once_per_day_inside_the_window(self):
+        start = date(2024, 10, 1)
+        staff_by_date, counts = staff_by_day(
+            [start, start, start, date(2024, 10, 3), date(2024, 9, 30), date(2024, 10, 4)],
+            [140025, 140015, 140025, 140015, 140036, 140036],
+            start,
+            date(2024, 10, 3),
+        )
+
+        self.assertEqual(
+            staff_by_date,
+            {"2024-10-01": [140015, 140025], "2024-10-02": [], "2024-10-03": [140015]},
+        )
+        self.assertEqual(counts, {"2024-10-01": 2, "2024-10-02": 0, "2024-10-03": 1})
+
+    def test_only_staff_limits_the_staff_counted(self):
+        start = date(2024, 10, 1)
+        staff_by_date, counts = staff_by_day(
+            [start, start], [140015, 140025], start, start, only_staff={140025: {}}
+        )
+
+        self.assertEqual(staff_by_date, {"2024-10-01": [140025]})
+        self.assertEqual(counts, {"2024-10-01": 1})
+
+
+class TestAttendanceMatrix(unittest.TestCase):
+    def test_full_days_count_for_both_half_days(self):
+        matrix = AttendanceMatrix([3, 1, 2, 4], date(2024, 10, 1), date(2024, 10, 2))
+        # Staff 9 is not in the matrix and is ignored
+        matrix.mark_wfh(
+            [1, 2, 9, 3],
+            [date(2024, 10, 1), date(2024, 10, 1), date(2024, 10, 1), date(2024, 10, 2)],
+            ["Full", "AM", "PM", "PM"],
+        )
+
+        groups, in_office, sizes = matrix.office_counts(["A", "A", "B", "B"])
+        self.assertEqual(groups.tolist(), ["A", "B"])
+        self.assertEqual(sizes.tolist(), [2, 2])
+        self.assertEqual(in_office.tolist(), [[[0, 1], [2, 2]], [[2, 2], [2, 1]]])
+        self.assertEqual(
+            [
+                (cell["group"], cell["date"], cell["shift"])
+                for cell in matrix.breaches(["A", "A", "B", "B"], 0.5)
+            ],
+            [("A", "2024-10-01", "AM")],
+        )
+
+
+class TestOrgSchedule(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.today = date.today()
+        with self.app.app_context():
+            db.session.add_all(
+                [
+                    make_employee(1, 1, position="Director", role=1),
+                    make_employee(2, 1),
+                    make_employee(3, 1, dept="Finance"),
+                ]
+            )
+            # An approved request per staff member, with one date this week and one long ago
+            for request_id, staff_id in [(1, 2), (2, 3)]:
+                db.session.add(Request(staff_id, self.today, "Family event", request_id=request_id))
+                for request_date in [self.today, self.today - timedelta(days=400)]:
+                    db.session.add(RequestDates(request_id, request_date, "Full", request_status="Approved"))
+            db.session.commit()
+
+    def get_org_schedule(self, query_string=""):
+        with self.app.test_request_context(f"/view_schedule/o_get_org_schedule{query_string}"):
+            response = make_response(view_schedule.o_get_org_schedule())
+            return response.get_json(), response.status_code
+
+    def test_only_the_requested_dates_and_departments_are_returned(self):
+        day = self.today.isoformat()
+        with count_queries(self.app) as queries:
+            response, status = self.get_org_schedule(f"?start={day}&end={day}&dept=Sales")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(list(response), ["Sales"])
+        self.assertEqual(sorted(response["Sales"]), [day, "num_employee"])
+        self.assertEqual([staff["staff_id"] for staff in response["Sales"][day]["Full"]], [2])
+        # The window and department are applied in SQL
+        self.assertIn("BETWEEN", queries[-1])
+        self.assertIn("dept IN", queries[-1])
+
+    def test_default_window_and_invalid_dates(self):
+        response, status = self.get_org_schedule()
+        self.assertEqual(status, 200)
+        self.assertEqual(sorted(response), ["Finance", "Sales"])
+        self.assertEqual(len(response["Sales"]) - 1, 151)
+
+        self.assertEqual(self.get_org_schedule("?start=tomorrow")[1], 400)
+        self.assertEqual(self.get_org_schedule("?start=2024-10-02&end=2024-10-01")[1], 400)
+        self.assertEqual(self.get_org_schedule("?format=xml")[1], 400)
+
+    def test_columnar_format_holds_the_same_schedule(self):
+        nested, _ = self.get_org_schedule()
+        columnar, status = self.get_org_schedule("?format=columnar")
+
+        self.assertEqual(status, 200)
+        # Expand the columnar response back into the nested shape, without the empty slots
+        expanded = {}
+        for group, columns in columnar["groups"].items():
+            expanded[group] = {}
+            for shift in ["AM", "PM", "Full"]:
+                for date_index, staff_indexes in columns[shift]:
+                    expanded[group].setdefault(columnar["dates"][date_index], {})[shift] = [
+                        columnar["staff"][i] for i in staff_indexes
+                    ]
+        self.assertEqual(
+            expanded,
+            {
+                group: {
+                    date: {shift: staff for shift, staff in shifts.items() if staff}
+                    for date, shifts in schedule.items()
+                    if date != "num_employee" and any(shifts.values())
+                }
+                for group, schedule in nested.items()
+            },
+        )
+        self.assertEqual(columnar["groups"]["Sales"]["num_employee"], 2)
+
+
+class TestDataVersion(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        with self.app.app_context():
+            db.session.add_all([make_employee(1, 1, position="Director", role=1), make_employee(2, 1)])
+            db.session.add(Request(2, date(2024, 9, 1), "Family event", request_id=1))
+            db.session.add(RequestDates(1, date(2024, 9, 2), "Full"))
+            db.session.commit()
+
+    def m_retrieve_requests(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        with self.app.test_request_context(
+            "/view_requests/m_retrieve_requests/1", headers=headers
+        ):
+            return make_response(view_requests.m_retrieve_requests(1))
+
+    def test_unchanged_data_gets_a_304_without_running_the_query(self):
+        response = self.m_retrieve_requests()
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+
+        with count_queries(self.app) as queries:
+            response = self.m_retrieve_requests(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+        self.assertEqual(response.get_data(), b"")
+        # Only the data_version lookup
+        self.assertEqual(len(queries), 1)
+
+    def test_committed_writes_change_the_etag(self):
+        etag = self.m_retrieve_requests().headers["ETag"]
+
+        with self.app.app_context():
+            db.session.get(RequestDates, 1).request_status = "Approved"
+            db.session.rollback()
+        self.assertEqual(self.m_retrieve_requests(etag).status_code, 304)
+
+        with self.app.app_context():
+            db.session.get(RequestDates, 1).request_status = "Approved"
+            db.session.commit()
+        response = self.m_retrieve_requests(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["data"][0]["wfh_dates"][0]["request_status"], "Approved")
+
+        # Bulk statements bypass the flush but are counted too
+        etag = response.headers["ETag"]
+        with self.app.app_context():
+            db.session.execute(
+                update(Request).where(Request.request_id == 1).values(reject_reason="Too many")
+            )
+            db.session.commit()
+        self.assertNotEqual(self.m_retrieve_requests(etag).headers["ETag"], etag)
+
+    def test_versions_are_raised_after_the_writer_commits(self):
+        with self.app.app_context():
+            engine = db.engine
+            versions_before = get_data_versions(["request_dates"])["request_dates"]
+        events = []
+        record_commit = lambda connection: events.append("COMMIT")
+        record_statement = lambda conn, cursor, statement, *args: events.append(statement.split()[0:3])
+        event.listen(engine, "commit", record_commit)
+        event.listen(engine, "before_cursor_execute", record_statement)
+        try:
+            with self.app.app_context():
+                db.session.get(RequestDates, 1).request_status = "Approved"
+                db.session.commit()
+        finally:
+            event.remove(engine, "commit", record_commit)
+            event.remove(engine, "before_cursor_execute", record_statement)
+
+        # The writer's transaction commits before the counter row is locked, in a second one
+        bump = events.index(["UPDATE", "data_version", "SET"])
+        self.assertEqual((events[bump - 1], events[bump + 1]), ("COMMIT", "COMMIT"))
+        with self.app.app_context():
+            self.assertEqual(get_data_versions(["request_dates"])["request_dates"], versions_before + 1)
+
+    def test_schedule_etags_change_every_day(self):
+        with self.app.app_context():
+            today = data_etag(["request_dates"], daily=True)
+            with patch("data_version.date") as mock_date:
+                mock_date.today.return_value = date.today() + timedelta(days=1)
+                self.assertNotEqual(data_etag(["request_dates"], daily=True), today)
+
+
+class TestCorsExposedHeaders(unittest.TestCase):
+    def test_each_service_exposes_the_headers_it_sets(self):
+        # run.py dispatches service routes to the services' own apps, so their CORS settings apply
+        for service, headers in [
+            (employee, {"ETag"}),
+            (view_schedule, {"ETag"}),
+            (view_requests, {"ETag", "X-Next-Cursor"}),
+            (request_service, {"X-Next-Cursor"}),
+        ]:
+            response = service.app.test_client().get("/", headers={"Origin": "http://localhost:5173"})
+            exposed = set(response.headers.get("Access-Control-Expose-Headers", "").split(", "))
+            self.assertLessEqual(headers, exposed, service.__name__)
+
+
+class TestEmployeeDirectory(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        with self.app.app_context():
+            db.session.add_all(
+                [
+                    make_employee(1, 1, position="Director", role=1),
+                    make_employee(2, 1),
+                    make_employee(3, 1, dept="Finance"),
+                ]
+            )
+            db.session.commit()
+
+    def get(self, view, *args):
+        with self.app.test_request_context():
+            return make_response(view(*args)).get_json()
+
+    def test_lookups_do_not_query_the_database(self):
+        with self.app.app_context():
+            get_employee_directory()
+        with count_queries(self.app) as queries:
+            details = self.get(employee.get_employee_details, 3)
+            everyone = self.get(employee.get_all_employees)
+            with self.app.app_context():
+                directory = get_employee_directory()
+        self.assertEqual(queries, [])
+
+        self.assertEqual(details["data"]["dept"], "Finance")
+        self.assertEqual(
+            everyone["data"][1],
+            {
+                "staff_id": 2,
+                "reporting_manager": 1,
+                "staff_name": "Staff 2",
+                "dept": "Sales",
+                "position": "Account Manager",
+            },
+        )
+        self.assertEqual(directory.by_manager[1], (1, 2, 3))
+        self.assertEqual(directory.by_dept["Sales"], (1, 2))
+        with self.assertRaises(TypeError):
+            directory.by_id[2]["dept"] = "Finance"
+
+    def test_snapshot_is_replaced_after_employee_changes(self):
+        with self.app.app_context():
+            before = get_employee_directory()
+            db.session.get(Employee, 2).dept = "Finance"
+            db.session.commit()
+            after = get_employee_directory()
+
+        self.assertEqual(before.by_dept["Finance"], (3,))
+        self.assertEqual(after.by_dept["Finance"], (2, 3))
+        response = self.get(employee.get_all_employees_by_dept)
+        self.assertEqual(sorted(response["data"]["Finance"]), ["2", "3"])
+
+    @patch.object(Config, "EMPLOYEE_DIRECTORY_CHECK_INTERVAL", 0)
+    def test_version_check_picks_up_changes_from_other_processes(self):
+        with self.app.app_context():
+            get_employee_directory()
+            # As another service would: a new version, without this process seeing the commit
+            with db.engine.begin() as connection:
+                connection.execute(update(Employee).where(Employee.staff_id == 2).values(dept="HR"))
+                connection.execute(update(DataVersion).values(version=DataVersion.version + 1))
+            self.assertEqual(get_employee_directory().details(2)["dept"], "HR")
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sqlite_app()
+        self.index_names = [
+            index.name
+            for model in (Employee, Request, RequestDates)
+            for index in model.__table__.indexes
+        ]
+        # Start from tables without secondary indexes, like a database created before them
+        with self.app.app_context():
+            for index_name in self.index_names:
+                db.session.execute(text(f"DROP INDEX {index_name}"))
+            db.session.commit()
+
+    def query_plan(self, query):
+        """The SQLite EXPLAIN QUERY PLAN output for an ORM query, as one string."""
+        statement = query.statement.compile(
+            dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+        return " | ".join(row[-1] for row in rows)
+
+    def test_migrations_are_applied_once_and_recorded(self):
+        with self.app.app_context():
+            DailyWfhCount.__table__.drop(db.engine)
+        self.assertEqual(apply_migrations(self.app), [version for version, _, _ in MIGRATIONS])
+        self.assertEqual(apply_migrations(self.app), [])
+
+        with self.app.app_context():
+            self.assertEqual(
+                [row.version for row in SchemaVersion.query.all()],
+                [version for version, _, _ in MIGRATIONS],
+            )
+            indexes = {
+                name
+                for (name,) in db.session.execute(
+                    text("SELECT name FROM sqlite_master WHERE type = 'index'")
+                )
+            }
+        self.assertTrue(set(self.index_names) <= indexes)
+        with self.app.app_context():
+            self.assertEqual(
+                {version.table_name for version in DataVersion.query.all()}, TRACKED_TABLES
+            )
+
+    def test_hot_queries_use_the_indexes(self):
+        apply_migrations(self.app)
+
+        with self.app.app_context():
+            plans = {
+                "ix_request_dates_request_id": RequestDates.query.filter_by(request_id=1),
+                "ix_request_dates_status_date": RequestDates.query.filter(
+                    RequestDates.request_status == "Pending Approval",
+                    RequestDates.request_date < date(2024, 9, 1),
+                ),
+                "ix_request_staff_id": Request.query.filter_by(staff_id=1),
+                "ix_employee_reporting_manager": Employee.query.filter_by(
+                    reporting_manager=1
+                ),
+                "ix_employee_dept_position_role": Employee.query.filter_by(
+                    dept="Sales", position="Account Manager", role=2
+                ),
+            }
+            for index_name, query in plans.items():
+                self.assertIn(f"USING INDEX {index_name}", self.query_plan(query))
+
+
+if __name__ == "__main__":
+    unittest.main()
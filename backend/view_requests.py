@@ -1,12 +1,15 @@
-from flask import Flask, jsonify
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 from os import environ
+from sqlalchemy.orm import selectinload
 from database import db
+from data_version import conditional_get
+from pagination import NEXT_CURSOR_HEADER, page_args, split_page
 
 app = Flask(__name__)
 app.config.from_object("config.Config")
 db.init_app(app)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=[NEXT_CURSOR_HEADER, "ETag"])
 
 from database import Employee, Request, RequestDates
 
@@ -24,6 +27,16 @@ def s_retrieve_requests(s_staff_id):
     Parameters:
     staff_id (int): The staff_id
 
+    Optional query parameters:
+    status (str, repeatable): Only include dates with this status, e.g. ?status=Approved&status=Pending Approval
+    date_from (str): Only include dates on or after this date, in YYYY-MM-DD format
+    date_to (str): Only include dates on or before this date, in YYYY-MM-DD format
+    limit (int): The most requests to return. When there are more, the X-Next-Cursor response
+        header holds the cursor for the next page
+    cursor (int): Return the requests after this cursor, taken from X-Next-Cursor
+
+    When any date filter is given, requests without a matching date are left out.
+
     Success response:
     [
         {
@@ -63,26 +76,39 @@ def s_retrieve_requests(s_staff_id):
     ]
     """
     try:
-        # Get all requests for this staff
-        requests = Request.query.filter_by(staff_id=s_staff_id).all()
+        try:
+            date_filters, limit, cursor = page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Get the requests for this staff, and all their dates in one more query
+        query = Request.query.filter(Request.staff_id == s_staff_id)
+        if date_filters:
+            query = query.filter(Request.request_dates.any(*date_filters)).options(
+                selectinload(Request.request_dates.and_(*date_filters))
+            )
+        else:
+            query = query.options(selectinload(Request.request_dates))
+        if cursor is not None:
+            query = query.filter(Request.request_id > cursor)
+        query = query.order_by(Request.request_id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        requests, next_cursor = split_page(query.all(), limit)
 
         # Format response
         requests_list = []
         for req in requests:
-            request_dates = RequestDates.query.filter_by(
-                request_id=req.request_id
-            ).all()
-
             wfh_dates = []
-            for date in request_dates:
+            for request_date in req.request_dates:
                 wfh_dates.append(
                     {
-                        "request_date_id": date.request_date_id,
-                        "request_date": str(date.request_date),
-                        "request_shift": date.request_shift,
-                        "request_status": date.request_status,
-                        "rescind_reason": date.rescind_reason,
-                        "withdraw_reason": date.withdraw_reason,
+                        "request_date_id": request_date.request_date_id,
+                        "request_date": str(request_date.request_date),
+                        "request_shift": request_date.request_shift,
+                        "request_status": request_date.request_status,
+                        "rescind_reason": request_date.rescind_reason,
+                        "withdraw_reason": request_date.withdraw_reason,
                     }
                 )
 
@@ -98,6 +124,8 @@ def s_retrieve_requests(s_staff_id):
             )
 
         response = jsonify(requests_list)
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
         return response
 
     except Exception as e:
@@ -105,8 +133,23 @@ def s_retrieve_requests(s_staff_id):
 
 
 @app.route("/view_requests/m_retrieve_requests/<int:m_staff_id>", methods=["GET"])
+@conditional_get("employee", "request", "request_dates")
 def m_retrieve_requests(m_staff_id):
     """
+    Parameters:
+    m_staff_id (int): The staff_id of the manager
+
+    Optional query parameters, as in s_retrieve_requests:
+    status (str, repeatable): Only include dates with this status
+    date_from (str): Only include dates on or after this date, in YYYY-MM-DD format
+    date_to (str): Only include dates on or before this date, in YYYY-MM-DD format
+    limit (int): The most requests to return. When there are more, the X-Next-Cursor response
+        header holds the cursor for the next page
+    cursor (int): Return the requests after this cursor, taken from X-Next-Cursor
+
+    Requests come in request_id order with all their (matching) dates, so a request is never
+    split across pages.
+
     Success response:
     [
         {
@@ -148,6 +191,28 @@ def m_retrieve_requests(m_staff_id):
     ]
     """
     try:
+        try:
+            date_filters, limit, cursor = page_args(request.args)
+        except ValueError as e:
+            return jsonify({"code": 400, "error": str(e)}), 400
+
+        request_filters = [Employee.reporting_manager == m_staff_id]
+        if cursor is not None:
+            request_filters.append(Request.request_id > cursor)
+        next_cursor = None
+        if limit is not None:
+            # Pick the page by request first, so that the dates of a request stay together
+            page = (
+                db.session.query(Request.request_id)
+                .join(Employee, Employee.staff_id == Request.staff_id)
+                .filter(*request_filters, Request.request_dates.any(*date_filters))
+                .order_by(Request.request_id)
+                .limit(limit + 1)
+                .all()
+            )
+            page, next_cursor = split_page(page, limit)
+            request_filters = [Request.request_id.in_([row.request_id for row in page])]
+
         # Query Employee, Request, and RequestDates
         results = (
             db.session.query(
@@ -167,7 +232,8 @@ def m_retrieve_requests(m_staff_id):
             )
             .join(Request, Employee.staff_id == Request.staff_id)
             .join(RequestDates, Request.request_id == RequestDates.request_id)
-            .filter(Employee.reporting_manager == m_staff_id)
+            .filter(*request_filters, *date_filters)
+            .order_by(Request.request_id, RequestDates.request_date_id)
             .all()
         )
 
@@ -219,7 +285,10 @@ def m_retrieve_requests(m_staff_id):
             request_dict["wfh_dates"].append(request_date_dict)
 
         # Return the data in JSON format
-        return jsonify({"code": 200, "data": request_list}), 200
+        response = jsonify({"code": 200, "data": request_list})
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+        return response, 200
 
     except Exception as e:
         return (
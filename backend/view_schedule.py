@@ -1,18 +1,22 @@
 from flask import Flask, request, jsonify
-import requests
 from os import environ
 from datetime import datetime, timedelta
 from input_validation import check_date_valid
 from flask_cors import CORS
 from invokes import invoke_http
-from datetime import datetime, timedelta
+from org_hierarchy import get_org_hierarchy
+from employee_directory import get_employee_directory
+from wfh_aggregate import wfh_entries, wfh_staff_by_date
+from attendance import AttendanceMatrix
+from data_version import conditional_get
+from response_cache import cached_response, get_response_cache
 from sqlalchemy import func
 from database import db, Employee, Request, RequestDates
 
 app = Flask(__name__)
 app.config.from_object("config.Config")
 db.init_app(app)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["ETag"])
 
 employee_URL = environ.get("EMPLOYEE_URL") or "http://localhost:5000/employee"
 request_URL = environ.get("REQUEST_URL") or "http://localhost:5001/request"
@@ -86,9 +90,9 @@ def view_weekly_schedule(staff_id, date_entered):
     # Query the requests submitted by the staff_id
     try:
         # This will get all the WFH requests made by the staff_id; check documentation in parent file for details
-        all_request_ids = requests.get(
-            f"{request_URL}/get_request_ids/{int(staff_id)}"
-        ).json()["data"]
+        all_request_ids = invoke_http(
+            f"{request_URL}/get_request_ids/{int(staff_id)}", method="GET"
+        )["data"]
 
         results = (
             db.session.query(Request, RequestDates)
@@ -145,17 +149,119 @@ def view_weekly_schedule(staff_id, date_entered):
         return jsonify({"error": f"Failed to fetch requests: {str(e)}"}), 500
 
 
-# Helper function to calculate date range
-def get_date_range():
-    today = datetime.today()
-    start_date = today - timedelta(days=60)
-    end_date = today + timedelta(days=90)
+def get_wfh_window():
+    """
+    The first and last days the schedule and WFH status endpoints report on: about 2 months
+    back and 3 months forward.
+    """
+    today = datetime.today().date()
+    return today - timedelta(days=60), today + timedelta(days=90)
+
+
+# Helper function to calculate date range, optionally narrowed to the dates between start_date and end_date
+def get_date_range(start_date=None, end_date=None):
+    window_start, window_end = get_wfh_window()
+    start_date = max(start_date, window_start) if start_date else window_start
+    end_date = min(end_date, window_end) if end_date else window_end
     return [
         (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
         for i in range((end_date - start_date).days + 1)
     ]
 
 
+SCHEDULE_FORMATS = ["nested", "columnar"]
+SHIFTS = ["AM", "PM", "Full"]
+
+
+def to_columnar(schedule):
+    """
+    Compact encoding of a schedule from o_get_org_schedule or m_get_team_schedule, for
+    ?format=columnar. Each staff member is sent once and only the non-empty shifts are listed.
+    ---
+    Parameters:
+        schedule (dict): {group: {"num_employee": int, date: {shift: [staff, ...]}}}, where
+            group is a department or a manager's staff_id
+
+    Returns:
+        {
+            "format": "columnar",
+            "staff": [{"staff_id": 140015, "name": "Oliver Tan", "position": "Account Manager", ...}],
+            "dates": ["2024-10-01", "2024-10-02", ...],
+            "groups": {
+                "Sales": {
+                    "num_employee": 10,
+                    "AM": [[0, [0, 3]], [5, [3]]],  # [index into dates, [indexes into staff]]
+                    "PM": [],
+                    "Full": [[1, [0]]]
+                }
+            }
+        }
+    """
+    staff = []
+    staff_index = {}
+    dates = sorted(
+        {date for group in schedule.values() for date in group if date != "num_employee"}
+    )
+    date_index = {date: i for i, date in enumerate(dates)}
+
+    groups = {}
+    for group_key, group in schedule.items():
+        columns = {"num_employee": group.get("num_employee")}
+        for shift in SHIFTS:
+            columns[shift] = []
+        for date, shifts in group.items():
+            if date == "num_employee":
+                continue
+            for shift in SHIFTS:
+                if not shifts.get(shift):
+                    continue
+                indexes = []
+                for staff_schedule in shifts[shift]:
+                    if staff_schedule["staff_id"] not in staff_index:
+                        staff_index[staff_schedule["staff_id"]] = len(staff)
+                        staff.append(staff_schedule)
+                    indexes.append(staff_index[staff_schedule["staff_id"]])
+                columns[shift].append([date_index[date], indexes])
+        for shift in SHIFTS:
+            columns[shift].sort()
+        groups[str(group_key)] = columns
+
+    return {"format": "columnar", "staff": staff, "dates": dates, "groups": groups}
+
+
+# Helper function to return a schedule in the format asked for with ?format=
+def schedule_response(schedule):
+    if request.args.get("format") == "columnar":
+        # Always compact: indenting would add a line per staff index
+        return (
+            app.response_class(
+                app.json.dumps(to_columnar(schedule), separators=(",", ":")),
+                mimetype="application/json",
+            ),
+            200,
+        )
+    return jsonify(schedule), 200
+
+
+# Helper function to reject an unknown ?format= before any work is done
+def invalid_format_response():
+    return (
+        jsonify(
+            {
+                "code": 400,
+                "message": f"format must be one of: {', '.join(SCHEDULE_FORMATS)}.",
+            }
+        ),
+        400,
+    )
+
+
+# Helper function to read an optional YYYY-MM-DD query parameter; raises ValueError if malformed
+def get_date_arg(name):
+    value = request.args.get(name)
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
 # Helper function to initialize department schedule structure
 def initialize_dept_schedule(dept, num_employees, all_dates):
     return {
@@ -195,38 +301,29 @@ def fetch_schedule_data(filter_conditions):
     )
 
 
-# Recursive function to get all team members for a given manager
-def get_team_members(staff_id, data, visited=None, staff_details=None):
-    if visited is None:
-        visited = set()
-    if staff_details is None:
-        staff_details = {}
-
-    if staff_id in visited:
-        return staff_details
-
-    visited.add(staff_id)
-
-    for member in data:
-        if member["reporting_manager"] == staff_id:
-            staff_details[member["staff_id"]] = {
-                "staff_name": member["staff_name"],
-                "dept": member["dept"],
-                "position": member["position"],
-            }
-            # Recursive call to find team members under this member
-            get_team_members(member["staff_id"], data, visited, staff_details)
-
-    return staff_details
+# Get all team members under a given manager from the org hierarchy index
+def get_team_members(staff_id):
+    return get_org_hierarchy().team_members(staff_id)
 
 
 # Endpoint to retrieve organizational schedule
 @app.route("/view_schedule/o_get_org_schedule", methods=["GET"])
+@conditional_get("employee", "request", "request_dates", daily=True)
+@cached_response()
 def o_get_org_schedule():
     """
+    Query parameters (all optional):
+        start (str): First date to return, YYYY-MM-DD; defaults to 2 months back
+        end (str): Last date to return, YYYY-MM-DD; defaults to 3 months forward
+        dept (str): Only return this department; can be repeated
+        format (str): "nested" (default) or "columnar", see to_columnar
+
+    Dates outside 2 months back and 3 months forward are never returned.
+    ---
     Success Response:
             {
             "department_name": {
+                "num_employee": 10,
                 "date": {
                     "shift": [
                         {
@@ -241,23 +338,46 @@ def o_get_org_schedule():
             }
         }
     """
+    if request.args.get("format", "nested") not in SCHEDULE_FORMATS:
+        return invalid_format_response()
     try:
-        all_dates = get_date_range()
+        start_date = get_date_arg("start")
+        end_date = get_date_arg("end")
+    except ValueError:
+        return (
+            jsonify({"code": 400, "message": "start and end must be in YYYY-MM-DD format."}),
+            400,
+        )
+    if start_date and end_date and start_date > end_date:
+        return jsonify({"code": 400, "message": "start must not be after end."}), 400
+    depts = request.args.getlist("dept")
+
+    try:
+        all_dates = get_date_range(start_date, end_date)
         dept_dict = {}
 
         # Fetch and initialize department data
-        num_employee = (
-            db.session.query(
-                Employee.dept, func.count(Employee.staff_id).label("staff_count")
-            )
-            .group_by(Employee.dept)
-            .all()
+        num_employee = db.session.query(
+            Employee.dept, func.count(Employee.staff_id).label("staff_count")
         )
-        for dept, staff_count in num_employee:
+        if depts:
+            num_employee = num_employee.filter(Employee.dept.in_(depts))
+        for dept, staff_count in num_employee.group_by(Employee.dept).all():
             dept_dict.update(initialize_dept_schedule(dept, staff_count, all_dates))
 
-        # Query and process schedule data
-        results = fetch_schedule_data([RequestDates.request_status.in_(["Approved"])])
+        # Query and process schedule data, only for the requested dates and departments
+        filter_conditions = [RequestDates.request_status.in_(["Approved"])]
+        if depts:
+            filter_conditions.append(Employee.dept.in_(depts))
+        results = []
+        if all_dates:
+            filter_conditions.append(
+                RequestDates.request_date.between(
+                    datetime.strptime(all_dates[0], "%Y-%m-%d").date(),
+                    datetime.strptime(all_dates[-1], "%Y-%m-%d").date(),
+                )
+            )
+            results = fetch_schedule_data(filter_conditions)
         for (
             staff_id,
             fname,
@@ -281,7 +401,7 @@ def o_get_org_schedule():
                     dept_dict, dept, date.strftime("%Y-%m-%d"), shift, staff_schedule
                 )
 
-        return jsonify(dept_dict), 200
+        return schedule_response(dept_dict)
 
     except Exception as e:
         return (
@@ -297,10 +417,13 @@ def o_get_org_schedule():
 
 # Endpoint to retrieve manager's team schedule
 @app.route("/view_schedule/m_get_team_schedule/<int:staff_id>", methods=["GET"])
+@conditional_get("employee", "request", "request_dates", daily=True)
+@cached_response(scope_arg="staff_id")
 def m_get_team_schedule(staff_id):
     """
     Parameters:
     staff_id (int)
+    format (str, query parameter): "nested" (default) or "columnar", see to_columnar
     ---
     Success Response:
         {
@@ -322,35 +445,34 @@ def m_get_team_schedule(staff_id):
     }
 
     """
+    if request.args.get("format", "nested") not in SCHEDULE_FORMATS:
+        return invalid_format_response()
     try:
         all_dates = get_date_range()
-        employee_details = invoke_http(
-            employee_URL + f"/get_details/{staff_id}", method="GET"
-        )
-        employee_dept = employee_details["data"]["dept"]
-        position = employee_details["data"]["position"]
-
-        response = invoke_http(employee_URL + "/get_all_employees", method="GET")
+        directory = get_employee_directory()
+        employee_details = directory.details(staff_id)
+        if employee_details is None:
+            return jsonify({"code": 404, "message": "Employee not found."}), 404
+        employee_dept = employee_details["dept"]
+        position = employee_details["position"]
 
-        all_team_members = get_team_members(staff_id, response["data"])
+        all_team_members = get_team_members(staff_id)
 
         # Edit this code
         if position == "Director":
             subordinate_dict = {}
             # Get the direct subordinates of the director
-            direct_subordinates = invoke_http(
-                employee_URL + f"/get_staff/{staff_id}", method="GET"
-            )
+            direct_subordinates = directory.reporting_to(staff_id)
 
             # For each subordinate under the director
-            if direct_subordinates["data"][0]["role"] == 3:
-                for subordinate in direct_subordinates["data"]:
+            if direct_subordinates and direct_subordinates[0]["role"] == 3:
+                for subordinate in direct_subordinates:
                     sub_id = subordinate["staff_id"]
                     sub_dept = subordinate["dept"]
                     sub_name = subordinate["staff_fname"] + subordinate["staff_lname"]
                     sub_position = subordinate["position"]
 
-                    all_team_members = get_team_members(sub_id, response["data"])
+                    all_team_members = get_team_members(sub_id)
                     # Initialize the department schedule structure for this subordinate
                     subordinate_schedule = initialize_dept_schedule(
                         sub_dept, len(all_team_members), get_date_range()
@@ -393,7 +515,7 @@ def m_get_team_schedule(staff_id):
                     # Add the subordinate's completed schedule to the overall dictionary
                     subordinate_dict[sub_id] = subordinate_schedule[sub_dept]
 
-                return jsonify(subordinate_dict), 200
+                return schedule_response(subordinate_dict)
 
             else:
                 # Initialize team schedule structure with staff_id as the only key
@@ -438,7 +560,7 @@ def m_get_team_schedule(staff_id):
                         )
 
                 # Return the team schedule nested under the manager's ID
-                return jsonify(team_schedule), 200
+                return schedule_response(team_schedule)
 
         else:
             # Initialize team schedule
@@ -477,7 +599,7 @@ def m_get_team_schedule(staff_id):
                         staff_schedule,
                     )
 
-            return jsonify(dept_dict), 200
+            return schedule_response(dept_dict)
 
     except Exception as e:
         return (
@@ -493,6 +615,9 @@ def m_get_team_schedule(staff_id):
 
 # Endpoint to retrieve specific employee's team schedule
 @app.route("/view_schedule/s_get_team_schedule/<int:staff_id>", methods=["GET"])
+# Covers staff with the same position and role anywhere in the organisation, so any approval
+# can change it; staff_id is still part of the cache key
+@cached_response()
 def s_get_team_schedule(staff_id):
     """
     Parameters:
@@ -516,13 +641,13 @@ def s_get_team_schedule(staff_id):
     """
     try:
         all_dates = get_date_range()
-        employee_details = invoke_http(
-            employee_URL + f"/get_details/{staff_id}", method="GET"
-        )
-        employee_dept = employee_details["data"]["dept"]
-        employee_position = employee_details["data"]["position"]
-        employee_role = employee_details["data"]["role"]
-        employee_reporting_manager = employee_details["data"]["reporting_manager"]
+        employee_details = get_employee_directory().details(staff_id)
+        if employee_details is None:
+            return jsonify({"code": 404, "message": "Employee not found."}), 404
+        employee_dept = employee_details["dept"]
+        employee_position = employee_details["position"]
+        employee_role = employee_details["role"]
+        employee_reporting_manager = employee_details["reporting_manager"]
 
         # Initialize employee-specific schedule
         num_employee = (
@@ -589,10 +714,15 @@ def s_get_team_schedule(staff_id):
 
 # Retrieve wfh count and total by department
 @app.route("/view_schedule/get_wfh_status", methods=["GET"])
+@cached_response()
 def get_wfh_status():
     """
+    Staff on approved WFH on each day from about 2 months back to 3 months forward, each listed
+    once, with the number of them per day in "counts".
+    ---
     {
     "code": 200,
+    "counts": {"2024-10-30": 0, "2024-10-31": 0, "2024-11-01": 2, ...},
     "data": {
         "2024-10-30": [],
         "2024-10-31": [],
@@ -606,57 +736,16 @@ def get_wfh_status():
         ],...
     }
     """
-    results = (
-        db.session.query(Employee.staff_id, RequestDates.request_date)
-        .join(Request, Request.request_id == RequestDates.request_id)
-        .join(Employee, Employee.staff_id == Request.staff_id)
-        .all()
-    )
     num_employee_in_dept = db.session.query(
         Employee.staff_id
     ).count()  # Count the number of employees in the department
-    status = {}
-    for result in results:
-        date_str = result[1].isoformat()  # Convert date to string in YYYY-MM-DD format
-        staff_id = result[0]  # staff_id
-        if date_str not in status:
-            status[date_str] = [staff_id]  # Initialize the list with the first staff_id
-        elif staff_id not in status[date_str]:
-            status[date_str].append(
-                staff_id
-            )  # Add staff_id to the existing list for this date
-    from datetime import datetime, timedelta
-    from dateutil.relativedelta import relativedelta
-
-    def get_date_ranges():
-        today = datetime.today().date()  # Get today's date as a date object
-        # Calculate the start date for 2 months ago
-        start_date_past = today - relativedelta(months=2)
-        # Calculate the end date for 3 months in the future
-        end_date_future = today + relativedelta(months=3)
-        # Generate list of past 2 months dates
-        date_list = []
-        for i in range(60):  # Approximately 60 days in 2 months
-            past_date = start_date_past + timedelta(days=i)
-            date_list.append(past_date.strftime("%Y-%m-%d"))  # Format to YYYY-MM-DD
-        # Generate list of next 3 months dates
-        for i in range(90):  # Approximately 90 days in 3 months
-            future_date = today + timedelta(days=i)
-            if future_date > today:  # Only include future dates
-                date_list.append(
-                    future_date.strftime("%Y-%m-%d")
-                )  # Format to YYYY-MM-DD
-        return date_list
-
-    date_list = get_date_ranges()
-    for date in date_list:
-        if date not in status:
-            status[date] = []
+    status, counts = wfh_staff_by_date(*get_wfh_window())
     # Return the result as JSON with employee count included
     return jsonify(
         {
             "code": 200,
             "data": status,
+            "counts": counts,
             "num_employee_in_dept": num_employee_in_dept,  # Include the count of employees in the response
         }
     )
@@ -664,6 +753,7 @@ def get_wfh_status():
 
 # Retrieve wfh count and total by department
 @app.route("/view_schedule/get_wfh_status_by_team/<int:staff_id>", methods=["GET"])
+@cached_response(scope_arg="staff_id")
 def get_wfh_status_by_team(staff_id):
     """
     Parameters:
@@ -671,6 +761,7 @@ def get_wfh_status_by_team(staff_id):
     ---
     {
     "code": 200,
+    "counts": {"2024-10-30": 0, "2024-10-31": 0, "2024-11-01": 2, ...},
     "data": {
         "2024-10-30": [],
         "2024-10-31": [],
@@ -684,92 +775,171 @@ def get_wfh_status_by_team(staff_id):
         ],...
     }
     """
-    response = invoke_http(employee_URL + "/get_all_employees", method="GET")
-
-    # Recursive function to get all team members for a given manager
-    def get_team_members(staff_id, data, visited=None, staff_details=None):
-        if visited is None:
-            visited = set()
-        if staff_details is None:
-            staff_details = {}
-
-        if staff_id in visited:
-            return staff_details
-
-        visited.add(staff_id)
-
-        for member in data:
-            if member["reporting_manager"] == staff_id:
-                staff_details[member["staff_id"]] = {
-                    "staff_name": member["staff_name"],
-                    "dept": member["dept"],
-                    "position": member["position"],
-                }
-                # Recursive call to find team members under this member
-                get_team_members(member["staff_id"], data, visited, staff_details)
-
-        return staff_details
+    hierarchy = get_org_hierarchy()
+    all_team_members = hierarchy.team_members(staff_id)
 
-    all_team_members = get_team_members(staff_id, response["data"])
-
-    results = (
-        db.session.query(Employee.staff_id, RequestDates.request_date)
-        .join(Request, Request.request_id == RequestDates.request_id)
-        .join(Employee, Employee.staff_id == Request.staff_id)
-        .filter(RequestDates.request_status == "Approved")
-        .all()
-    )
+    # Everyone in the team reports to staff_id or to someone under them
+    managers = [staff_id] + [
+        member_id for member_id in all_team_members if hierarchy.direct_reports(member_id)
+    ]
+    status, counts = wfh_staff_by_date(*get_wfh_window(), managers, all_team_members)
 
-    num_employee_in_dept = len(all_team_members)
-
-    status = {}
-    for result in results:
-        date_str = result[1].isoformat()
-        staff_id = result[0]
-        if staff_id in all_team_members.keys():
-            if date_str not in status:
-                status[date_str] = [
-                    staff_id
-                ]  # Initialize the list with the first staff_id
-            elif staff_id not in status[date_str]:
-                status[date_str].append(staff_id)
-
-    from datetime import datetime, timedelta
-    from dateutil.relativedelta import relativedelta
-
-    def get_date_ranges():
-        today = datetime.today().date()  # Get today's date as a date object
-        # Calculate the start date for 2 months ago
-        start_date_past = today - relativedelta(months=2)
-        # Calculate the end date for 3 months in the future
-        end_date_future = today + relativedelta(months=3)
-        # Generate list of past 2 months dates
-        date_list = []
-        for i in range(60):  # Approximately 60 days in 2 months
-            past_date = start_date_past + timedelta(days=i)
-            date_list.append(past_date.strftime("%Y-%m-%d"))  # Format to YYYY-MM-DD
-        # Generate list of next 3 months dates
-        for i in range(90):  # Approximately 90 days in 3 months
-            future_date = today + timedelta(days=i)
-            if future_date > today:  # Only include future dates
-                date_list.append(
-                    future_date.strftime("%Y-%m-%d")
-                )  # Format to YYYY-MM-DD
-        return date_list
-
-    date_list = get_date_ranges()
-    for date in date_list:
-        if date not in status:
-            status[date] = []
     # Return the result as JSON with employee count included
     return jsonify(
         {
             "code": 200,
             "data": status,
-            "num_employee_in_dept": num_employee_in_dept,
+            "counts": counts,
+            "num_employee_in_dept": len(all_team_members),
         }
     )
 
 
+ATTENDANCE_GROUPINGS = ["dept", "team", "org"]
+
+
+# Office attendance below a threshold, for the below-50% alerts
+@app.route("/view_schedule/attendance_rates", methods=["GET"])
+def attendance_rates():
+    """
+    The departments, teams or days on which the share of staff in the office is below a
+    threshold, per half-day (a Full day of WFH counts for both the AM and the PM).
+    ---
+    Query parameters (all optional):
+        threshold (float): Office attendance rate to alert below, from 0 to 1; defaults to 0.5
+        group_by (str): "dept" (default), "team" (staff grouped by reporting manager) or
+            "org" (the whole organisation)
+        start (str), end (str): Dates to check, YYYY-MM-DD; default to about 2 months back
+            and 3 months forward
+        staff_id (int): Only count the staff under this manager or director
+
+    Success response:
+        {
+            "code": 200,
+            "threshold": 0.5,
+            "group_by": "dept",
+            "data": [
+                {
+                    "group": "Sales",
+                    "date": "2024-10-01",
+                    "shift": "AM",
+                    "in_office": 4,
+                    "total": 10,
+                    "office_rate": 0.4
+                }
+            ]
+        }
+    """
+    group_by = request.args.get("group_by", "dept")
+    try:
+        threshold = float(request.args.get("threshold", 0.5))
+        window_start, window_end = get_wfh_window()
+        start_date = get_date_arg("start") or window_start
+        end_date = get_date_arg("end") or window_end
+        staff_id = request.args.get("staff_id", type=int)
+    except ValueError:
+        return (
+            jsonify(
+                {
+                    "code": 400,
+                    "message": "threshold must be a number and start and end must be in YYYY-MM-DD format.",
+                }
+            ),
+            400,
+        )
+    if not 0 <= threshold <= 1 or group_by not in ATTENDANCE_GROUPINGS or start_date > end_date:
+        return (
+            jsonify(
+                {
+                    "code": 400,
+                    "message": f"threshold must be between 0 and 1, group_by one of {', '.join(ATTENDANCE_GROUPINGS)}, and start not after end.",
+                }
+            ),
+            400,
+        )
+
+    try:
+        team_members = None
+        reporting_managers = None
+        if staff_id is not None:
+            hierarchy = get_org_hierarchy()
+            team_members = hierarchy.team_members(staff_id)
+            reporting_managers = [staff_id] + [
+                member_id for member_id in team_members if hierarchy.direct_reports(member_id)
+            ]
+
+        # Ordered by staff_id, the order of the matrix rows, so the labels line up with them
+        employees = [
+            (member_id, dept, manager)
+            for member_id, dept, manager in db.session.query(
+                Employee.staff_id, Employee.dept, Employee.reporting_manager
+            ).order_by(Employee.staff_id)
+            if team_members is None or member_id in team_members
+        ]
+        if group_by == "dept":
+            labels = [dept for _, dept, _ in employees]
+        elif group_by == "team":
+            labels = [
+                manager if manager is not None else member_id
+                for member_id, _, manager in employees
+            ]
+        else:
+            labels = ["Organisation"] * len(employees)
+
+        matrix = AttendanceMatrix(
+            [member_id for member_id, _, _ in employees], start_date, end_date
+        )
+        wfh_dates, staff_ids, shifts = wfh_entries(start_date, end_date, reporting_managers)
+        matrix.mark_wfh(staff_ids, wfh_dates, shifts)
+        breaches = matrix.breaches(labels, threshold)
+
+        return (
+            jsonify(
+                {
+                    "code": 200,
+                    "threshold": threshold,
+                    "group_by": group_by,
+                    "data": breaches,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        return (
+            jsonify(
+                {
+                    "message": "An error occurred while calculating attendance rates.",
+                    "error": str(e),
+                }
+            ),
+            500,
+        )
+
+
+@app.route("/view_schedule/cache_stats", methods=["GET"])
+def cache_stats():
+    """
+    Hits, misses and evictions of the view_schedule response cache
+    ---
+    Success response:
+        {
+            "code": 200,
+            "data": {
+                "entries": 12,
+                "max_entries": 1024,
+                "ttl": 60.0,
+                "hits": 40,
+                "misses": 12,
+                "evictions": 0,
+                "expirations": 2,
+                "invalidations": 3,
+                "hit_rate": 0.7692
+            }
+        }
+    """
+    return jsonify({"code": 200, "data": get_response_cache().stats()}), 200
+
+
 if __name__ == "__main__":
     app.run(port=5100, debug=True)
@@ -0,0 +1,232 @@
+"""
+Approved WFH per (date, dept, reporting manager, shift), kept in the daily_wfh_count table.
+
+Every change to request_dates.request_status goes through record_status_changes in the same
+transaction, so the WFH status endpoints read a few rows per day instead of the whole request
+history. The table only follows status changes: if staff move to another department or
+manager, rebuild it from request_dates with:
+
+python wfh_aggregate.py
+"""
+
+import logging
+from flask import Flask
+from sqlalchemy import JSON, cast, delete, func, insert, literal_column, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from attendance import staff_by_day
+from database import db, DailyWfhCount, Employee, Request, RequestDates
+from response_cache import note_schedule_changes
+
+APPROVED = "Approved"
+KEY_COLUMNS = ["wfh_date", "dept", "reporting_manager", "shift"]
+
+logger = logging.getLogger(__name__)
+
+
+def _group_of(staff_id, dept, reporting_manager):
+    return dept, reporting_manager if reporting_manager is not None else staff_id
+
+
+def _upsert_new_rows(rows):
+    """
+    Insert daily_wfh_count rows for keys that had none when they were read. If another
+    transaction inserted the same key in the meantime, its row is added to instead of the
+    insert failing on the primary key.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(DailyWfhCount).values(rows)
+        statement = statement.on_duplicate_key_update(
+            wfh_count=DailyWfhCount.wfh_count + statement.inserted.wfh_count,
+            staff_ids=func.json_merge_preserve(DailyWfhCount.staff_ids, statement.inserted.staff_ids),
+        )
+    elif dialect == "postgresql":
+        statement = postgresql.insert(DailyWfhCount).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=KEY_COLUMNS,
+            set_={
+                "wfh_count": DailyWfhCount.wfh_count + statement.excluded.wfh_count,
+                "staff_ids": cast(
+                    cast(DailyWfhCount.staff_ids, postgresql.JSONB).op("||")(
+                        cast(statement.excluded.staff_ids, postgresql.JSONB)
+                    ),
+                    JSON,
+                ),
+            },
+        )
+    elif dialect == "sqlite":
+        statement = sqlite.insert(DailyWfhCount).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=KEY_COLUMNS,
+            set_={
+                "wfh_count": DailyWfhCount.wfh_count + statement.excluded.wfh_count,
+                "staff_ids": literal_column(
+                    "(SELECT json_group_array(value) FROM ("
+                    "SELECT value FROM json_each(daily_wfh_count.staff_ids) "
+                    "UNION ALL SELECT value FROM json_each(excluded.staff_ids)))"
+                ),
+            },
+        )
+    else:
+        statement = insert(DailyWfhCount).values(rows)
+    db.session.execute(statement)
+
+
+def record_status_changes(changes):
+    """
+    Update daily_wfh_count for request dates whose status changed. Must be called before the
+    caller commits the status change, so that both are in one transaction.
+
+    Parameters:
+        changes (iterable): (request_id, request_date, request_shift, old_status, new_status)
+            tuples, with old_status None for new request dates
+    """
+    deltas = [
+        (request_id, request_date, request_shift, 1 if new_status == APPROVED else -1)
+        for request_id, request_date, request_shift, old_status, new_status in changes
+        if (old_status == APPROVED) != (new_status == APPROVED)
+    ]
+    if not deltas:
+        return
+
+    staff_of = {
+        request_id: (staff_id, dept, reporting_manager)
+        for request_id, staff_id, dept, reporting_manager in db.session.query(
+            Request.request_id, Employee.staff_id, Employee.dept, Employee.reporting_manager
+        )
+        .join(Employee, Employee.staff_id == Request.staff_id)
+        .filter(Request.request_id.in_({delta[0] for delta in deltas}))
+    }
+    changes_by_key = {}
+    schedule_changes = []
+    for request_id, request_date, request_shift, delta in deltas:
+        if request_id not in staff_of:
+            logger.error("Request %s or its employee does not exist; not counted as WFH", request_id)
+            continue
+        staff_id, dept, reporting_manager = staff_of[request_id]
+        key = (request_date, *_group_of(staff_id, dept, reporting_manager), request_shift)
+        changes_by_key.setdefault(key, []).append((staff_id, delta))
+        schedule_changes.append((staff_id, reporting_manager, request_date))
+    # The cached schedules showing these dates are dropped once the change is committed
+    note_schedule_changes(db.session, schedule_changes)
+
+    # Lock the affected rows so concurrent changes to the same day and group queue up
+    rows = {
+        (row.wfh_date, row.dept, row.reporting_manager, row.shift): row
+        for row in DailyWfhCount.query.filter(
+            DailyWfhCount.wfh_date.in_({key[0] for key in changes_by_key}),
+            DailyWfhCount.dept.in_({key[1] for key in changes_by_key}),
+            DailyWfhCount.reporting_manager.in_({key[2] for key in changes_by_key}),
+        ).with_for_update()
+    }
+    new_rows = []
+    for key, staff_changes in changes_by_key.items():
+        row = rows.get(key)
+        staff_ids = list(row.staff_ids) if row else []
+        for staff_id, delta in staff_changes:
+            if delta > 0:
+                staff_ids.append(staff_id)
+            elif staff_id in staff_ids:
+                staff_ids.remove(staff_id)
+        staff_ids.sort()
+
+        if row is None:
+            if staff_ids:
+                new_rows.append(
+                    {**dict(zip(KEY_COLUMNS, key)), "wfh_count": len(staff_ids), "staff_ids": staff_ids}
+                )
+        elif staff_ids:
+            row.staff_ids = staff_ids
+            row.wfh_count = len(staff_ids)
+        else:
+            db.session.delete(row)
+    if new_rows:
+        _upsert_new_rows(new_rows)
+
+
+def wfh_staff_by_date(start_date, end_date, reporting_managers=None, only_staff=None):
+    """
+    Staff with approved WFH on each day from start_date to end_date, optionally only those
+    reporting to one of reporting_managers or listed in only_staff.
+
+    Returns:
+        tuple(
+            {"2024-11-01": [140015, 140025], "2024-11-02": [], ...} for every day,
+            {"2024-11-01": 2, "2024-11-02": 0, ...}
+        )
+    """
+    wfh_dates, staff_ids, _ = wfh_entries(start_date, end_date, reporting_managers)
+    return staff_by_day(wfh_dates, staff_ids, start_date, end_date, only_staff)
+
+
+def wfh_entries(start_date, end_date, reporting_managers=None):
+    """
+    Every approved WFH entry from start_date to end_date, optionally only for staff reporting
+    to one of reporting_managers, as three parallel lists.
+
+    Returns:
+        tuple(
+            wfh_dates (list): [date(2024, 11, 1), ...],
+            staff_ids (list): [140015, ...],
+            shifts (list): ["AM", ...]
+        )
+    """
+    query = db.session.query(
+        DailyWfhCount.wfh_date, DailyWfhCount.shift, DailyWfhCount.staff_ids
+    ).filter(DailyWfhCount.wfh_date.between(start_date, end_date))
+    if reporting_managers is not None:
+        query = query.filter(DailyWfhCount.reporting_manager.in_(reporting_managers))
+
+    wfh_dates = []
+    staff_ids = []
+    shifts = []
+    for wfh_date, shift, row_staff_ids in query:
+        wfh_dates.extend([wfh_date] * len(row_staff_ids))
+        staff_ids.extend(row_staff_ids)
+        shifts.extend([shift] * len(row_staff_ids))
+    return wfh_dates, staff_ids, shifts
+
+
+def rebuild_wfh_aggregate(connection):
+    """Recompute daily_wfh_count from the approved request dates; returns the rows written."""
+    staff_by_key = {}
+    for staff_id, dept, reporting_manager, request_date, request_shift in connection.execute(
+        select(
+            Employee.staff_id,
+            Employee.dept,
+            Employee.reporting_manager,
+            RequestDates.request_date,
+            RequestDates.request_shift,
+        )
+        .join(Request, Request.request_id == RequestDates.request_id)
+        .join(Employee, Employee.staff_id == Request.staff_id)
+        .where(RequestDates.request_status == APPROVED)
+    ):
+        key = (request_date, *_group_of(staff_id, dept, reporting_manager), request_shift)
+        staff_by_key.setdefault(key, []).append(staff_id)
+
+    connection.execute(delete(DailyWfhCount))
+    rows = [
+        {
+            "wfh_date": wfh_date,
+            "dept": dept,
+            "reporting_manager": reporting_manager,
+            "shift": shift,
+            "wfh_count": len(staff_ids),
+            "staff_ids": sorted(staff_ids),
+        }
+        for (wfh_date, dept, reporting_manager, shift), staff_ids in staff_by_key.items()
+    ]
+    if rows:
+        connection.execute(insert(DailyWfhCount), rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    app = Flask(__name__)
+    app.config.from_object("config.Config")
+    db.init_app(app)
+    with app.app_context():
+        DailyWfhCount.__table__.create(db.engine, checkfirst=True)
+        with db.engine.begin() as connection:
+            print(f"Rebuilt daily_wfh_count: {rebuild_wfh_aggregate(connection)} rows")